@@ -1,6 +1,7 @@
 from sqlmodel import Session
 from ..core.db import engine
 from ..services.mapping import map_news_to_syllabus
+from ..services.pyq_links import ensure_pyq_topic_links
 from .base import Agent, AgentResult
 
 
@@ -10,5 +11,7 @@ class MappingAgent(Agent):
     def run(self) -> AgentResult:
         with Session(engine) as session:
             created = map_news_to_syllabus(session)
+            # Cheap fingerprint check; relinks PYQs only after seed data changed
+            ensure_pyq_topic_links(session)
         return AgentResult(self.name, True, f"Created {created} mappings")
 
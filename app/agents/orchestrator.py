@@ -10,7 +10,8 @@ from .reporter_agent import ReporterAgent
 from ..core.db import engine
 from ..models.user import User
 from ..services.capsules import build_daily_capsule
-from ..services.notifier import send_bulk_capsule_emails
+from ..services.outbox import drain_outbox, enqueue_capsule
+from ..services.tests import pregenerate_daily_quiz
 
 logger = logging.getLogger(__name__)
 
@@ -29,7 +30,10 @@ def run_full_agentic_pipeline() -> None:
     # Generate and send daily capsules
     with Session(engine) as session:
         # Build today's capsule
-        capsule = build_daily_capsule(session)
+        capsule = build_daily_capsule(session, refresh=True)
+        # Have the day's quiz ready before anyone asks for it (may call the LLM)
+        quiz = pregenerate_daily_quiz(session, capsule.get("date"))
+        logger.info("Daily quiz ready: %s with %d questions", quiz["name"], len(quiz["questions"]))
 
         # Get all subscribed users
         subscribers = session.exec(
@@ -40,13 +44,17 @@ def run_full_agentic_pipeline() -> None:
         ).all()
 
         if subscribers and capsule["items"]:
-            # Send emails to all subscribers
-            results = send_bulk_capsule_emails(list(subscribers), capsule)
-            logger.info("Emails sent: %s, failed: %s", results['sent'], results['failed'])
+            # Queue emails for all subscribers; already-queued recipients are skipped
+            queued = enqueue_capsule(session, capsule, list(subscribers))
+            logger.info("Emails queued: %s, already queued: %s", queued['queued'], queued['skipped'])
             logger.info("Capsule items: %s", len(capsule['items']))
         else:
             logger.info("No subscribers or no content to send")
 
+    # Deliver everything due in the outbox (also resumes any earlier interrupted run)
+    results = drain_outbox()
+    logger.info("Emails sent: %s, failed: %s, retrying: %s", results['sent'], results['failed'], results['retrying'])
+
     logger.info("Autonomous pipeline completed.")
 
 
@@ -1,6 +1,6 @@
 from sqlmodel import Session
 from ..core.db import engine
-from ..services.planner import generate_plan_for_default_user
+from ..services.planner import generate_plan_for_default_user, generate_plans_for_all_users
 from .base import Agent, AgentResult
 
 
@@ -9,6 +9,15 @@ class PlannerAgent(Agent):
 
     def run(self) -> AgentResult:
         with Session(engine) as session:
-            generate_plan_for_default_user(session)
-        return AgentResult(self.name, True, "Plan generated/updated")
+            stats = generate_plans_for_all_users(session)
+            if not stats["users"]:
+                # Fresh install: bootstrap the default student plan
+                generate_plan_for_default_user(session)
+                return AgentResult(self.name, True, "Plan generated/updated")
+        return AgentResult(
+            self.name,
+            True,
+            f"Plans generated/updated for {stats['users']} users "
+            f"({stats['created']} new, {stats['adapted']} re-adapted, {stats['users_per_second']} users/s)",
+        )
 
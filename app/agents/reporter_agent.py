@@ -1,7 +1,7 @@
 from sqlmodel import Session, select
 from ..core.db import engine
 from ..services.capsules import build_daily_capsule
-from ..services.notifier import send_bulk_capsule_emails
+from ..services.outbox import enqueue_capsule
 from ..models.user import User
 from .base import Agent, AgentResult
 
@@ -20,12 +20,12 @@ class ReporterAgent(Agent):
             ).all()
             
             if subscribers:
-                # Send emails to subscribers
-                results = send_bulk_capsule_emails(list(subscribers), cap)
+                # Queue emails for subscribers; the outbox workers deliver them
+                results = enqueue_capsule(session, cap, list(subscribers))
                 return AgentResult(
                     self.name, 
                     True, 
-                    f"Built capsule for {cap.get('date')}. Emails sent: {results['sent']}, failed: {results['failed']}"
+                    f"Built capsule for {cap.get('date')}. Emails queued: {results['queued']}, already queued: {results['skipped']}"
                 )
             else:
                 return AgentResult(
@@ -1,15 +1,136 @@
-from fastapi import APIRouter
-from sqlmodel import Session
+import json
+from datetime import date
+from typing import Optional
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlmodel import Session, select
+from ...core.config import get_settings
 from ...core.db import engine
+from ...core.http_cache import cached_json_response, cached_response
+from ...models.content import Capsule, CapsuleArtifact
 from ...schemas.news import CapsuleOut
+from ...services.artifacts import get_capsule_artifact
+from ...services.capsule_store import capsule_versions
 from ...services.capsules import build_daily_capsule
+from ...services.events import CAPSULE_CHANNEL, get_broker
 
 router = APIRouter()
 
 
 @router.get("/daily", response_model=CapsuleOut)
-def daily_capsule():
+def daily_capsule(request: Request, day: Optional[str] = None):
+    """Today's capsule (short max-age), or a stored past capsule (immutable) via ?day=YYYY-MM-DD"""
+    today = str(date.today())
+    if day and day != today:
+        if day > today:
+            raise HTTPException(status_code=404, detail="No capsule for a future date")
+        with Session(engine) as session:
+            artifact = get_capsule_artifact(session, day, "json")
+            if artifact:
+                return _artifact_response(request, artifact, immutable=True)
+            items_json = session.exec(select(Capsule.items_json).where(Capsule.date == day)).first()
+        if items_json is None:
+            raise HTTPException(status_code=404, detail="Capsule not found")
+        body = f'{{"date":{json.dumps(day)},"items":{items_json or "[]"}}}'.encode("utf-8")
+        return cached_response(request, body, immutable=True)
     with Session(engine) as session:
-        capsule = build_daily_capsule(session)
-        return capsule
+        artifact = get_capsule_artifact(session, today, "json")
+        if artifact is None:
+            capsule = build_daily_capsule(session, wait_seconds=get_settings().capsule_request_wait_seconds)
+            artifact = get_capsule_artifact(session, today, "json")
+            if artifact is None and capsule.get("building") and not capsule["items"]:
+                # Someone else is building today's capsule: serve the last one rather than wait for it
+                latest = session.exec(
+                    select(CapsuleArtifact)
+                    .where(CapsuleArtifact.kind == "json", CapsuleArtifact.capsule_date < today)
+                    .order_by(CapsuleArtifact.capsule_date.desc())
+                ).first()
+                if latest:
+                    return _artifact_response(request, latest)
+                return JSONResponse({"date": today, "items": [], "building": True}, status_code=202, headers={"Retry-After": "5"})
+    if artifact:
+        return _artifact_response(request, artifact, max_age=get_settings().capsule_cache_max_age)
+    payload = {"date": capsule["date"], "items": capsule["items"]}
+    return cached_json_response(request, payload, max_age=get_settings().capsule_cache_max_age)
+
+
+@router.get("/stream")
+async def capsule_stream(request: Request):
+    """Server-Sent Events: `capsule-version` whenever today's capsule gains a version.
+
+    Comment heartbeats keep idle connections open; reconnecting clients
+    send Last-Event-ID and get what they missed, or a `reset` event when
+    it is no longer buffered (or predates a server restart).
+    """
+    broker = get_broker()
+    heartbeat = get_settings().events_heartbeat_seconds
+    resume_from = request.headers.get("last-event-id")
+
+    async def events():
+        last_id = resume_from
+        yield "retry: 5000\n\n"
+        if last_id:
+            missed = broker.since(CAPSULE_CHANNEL, last_id)
+            if missed is None:
+                yield "event: reset\ndata: {}\n\n"
+                last_id = None
+            else:
+                for ev in missed:
+                    last_id = ev.id
+                    yield ev.to_sse()
+        if not last_id:
+            last_id = broker.latest_id(CAPSULE_CHANNEL) or "0"
+        while not await request.is_disconnected():
+            batch = await broker.wait(CAPSULE_CHANNEL, last_id, heartbeat)
+            if batch is None:
+                # Our position is gone (fell out of the buffer); re-base on the newest event
+                yield "event: reset\ndata: {}\n\n"
+                last_id = broker.latest_id(CAPSULE_CHANNEL) or "0"
+                continue
+            if not batch:
+                yield ": ping\n\n"
+                continue
+            for ev in batch:
+                last_id = ev.id
+                yield ev.to_sse()
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@router.get("/versions")
+def capsule_version_history(day: Optional[str] = None):
+    """Version history of a day's capsule with the items added, changed or removed in each"""
+    with Session(engine) as session:
+        return {"date": day or str(date.today()), "versions": capsule_versions(session, day or str(date.today()))}
+
+
+@router.get("/daily/{kind}")
+def daily_capsule_rendered(kind: str, request: Request, day: Optional[str] = None):
+    """Pre-rendered email html or plain text of a stored capsule"""
+    if kind not in ("html", "text"):
+        raise HTTPException(status_code=404, detail="Unknown format")
+    today = str(date.today())
+    target = day or today
+    with Session(engine) as session:
+        artifact = get_capsule_artifact(session, target, kind)
+    if artifact is None:
+        raise HTTPException(status_code=404, detail="Capsule not found")
+    if target < today:
+        return _artifact_response(request, artifact, immutable=True)
+    return _artifact_response(request, artifact, max_age=get_settings().capsule_cache_max_age)
+
+
+def _artifact_response(request: Request, artifact: CapsuleArtifact, max_age: int = 0, immutable: bool = False):
+    return cached_response(
+        request,
+        artifact.body,
+        media_type=artifact.content_type,
+        max_age=max_age,
+        immutable=immutable,
+        etag=f'"{artifact.version}"',
+    )
 
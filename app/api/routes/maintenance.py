@@ -65,4 +65,27 @@ def rebuild_capsule(_: User = Depends(require_admin), session: Session = Depends
         session.delete(cap)
         session.commit()
     new_cap = build_daily_capsule(session)
-    return {"date": new_cap.get("date"), "items": len(new_cap.get("items", []))}
+    return {"date": new_cap.get("date"), "items": len(new_cap.get("items", [])), "degraded": new_cap.get("degraded", [])}
+
+
+@router.post("/refresh-capsule")
+def refresh_capsule(_: User = Depends(require_admin), session: Session = Depends(get_session)):
+    """Bring today's capsule up to date, rebuilding only new or changed items"""
+    from datetime import date
+    from ...services.capsule_store import capsule_versions
+    from ...services.capsules import build_daily_capsule
+    cap = build_daily_capsule(session, refresh=True)
+    versions = capsule_versions(session, str(date.today()))
+    return {
+        "date": cap.get("date"),
+        "items": len(cap.get("items", [])),
+        "degraded": cap.get("degraded", []),
+        "latest": versions[-1] if versions else None,
+    }
+
+
+@router.post("/relink-pyqs")
+def relink_pyqs(_: User = Depends(require_admin), session: Session = Depends(get_session)):
+    """Recompute the PYQ -> syllabus topic links (normally automatic when seed data changes)"""
+    from ...services.pyq_links import rebuild_pyq_topic_links
+    return {"links": rebuild_pyq_topic_links(session)}
@@ -0,0 +1,22 @@
+from fastapi import APIRouter, Depends
+from sqlmodel import Session
+from ...core.db import get_session
+from ...core.deps import require_admin
+from ...models.user import User
+from ...services.outbox import kick_outbox, outbox_status
+
+
+router = APIRouter(prefix="/outbox", tags=["outbox"])
+
+
+@router.get("/status")
+def status(_: User = Depends(require_admin), session: Session = Depends(get_session)):
+    """Delivery backlog, per-status counts and recent throughput"""
+    return outbox_status(session)
+
+
+@router.post("/drain")
+def drain(_: User = Depends(require_admin)):
+    """Wake the background sender to deliver due emails now"""
+    kick_outbox()
+    return {"message": "Outbox drain requested"}
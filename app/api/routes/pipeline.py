@@ -4,7 +4,7 @@ from ...core.db import get_session
 from ...models.user import User
 from ...services.ingest import fetch_and_parse_feeds, save_news_items
 from ...services.capsules import build_daily_capsule
-from ...services.notifier import send_bulk_capsule_emails
+from ...services.outbox import enqueue_capsule, kick_outbox
 from ...core.deps import require_admin
 import json
 
@@ -19,25 +19,28 @@ def run_full_pipeline(session: Session = Depends(get_session), _: User = Depends
     saved = save_news_items(session, fetched)
     
     # Step 2: Build capsule
-    capsule = build_daily_capsule(session)
+    capsule = build_daily_capsule(session, refresh=True)
     
-    # Step 3: Send emails to subscribers
+    # Step 3: Queue emails to subscribers (delivered by the outbox workers)
     subscribers = session.exec(
         select(User.email).where(User.daily_capsule_subscribed == True)
     ).all()
     
     if subscribers:
-        results = send_bulk_capsule_emails(list(subscribers), capsule)
+        results = enqueue_capsule(session, capsule, list(subscribers))
+        kick_outbox()
         return {
             "message": "Pipeline completed successfully",
             "news_items": len(saved),
             "capsule_items": len(capsule["items"]),
-            "emails_sent": results["sent"],
-            "emails_failed": results["failed"]
+            "capsule_items_degraded": len(capsule.get("degraded", [])),
+            "emails_queued": results["queued"],
+            "emails_already_queued": results["skipped"]
         }
     else:
         return {
             "message": "Pipeline completed, no subscribers to email",
             "news_items": len(saved),
-            "capsule_items": len(capsule["items"])
+            "capsule_items": len(capsule["items"]),
+            "capsule_items_degraded": len(capsule.get("degraded", []))
         }
@@ -2,8 +2,11 @@ from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session, select
 from ...core.db import get_session
 from ...core.deps import get_current_user
-from ...models.user import User, StudyPlan, TestResult
+from ...models.user import User, StudyPlan
+from ...services.plan_queue import plan_queue_status, queue_plan_adaptation
 from ...services.planner import adapt_plan_with_feedback, generate_plan_for_user
+from ...services.revision import track_test_topics
+from ...services.user_stats import record_result
 import json
 
 
@@ -26,11 +29,17 @@ def get_my_plan(user: User = Depends(get_current_user), session: Session = Depen
 def submit_test_result(payload: dict, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
     name = (payload.get("test_name") or "Mock Test").strip()
     score = float(payload.get("score") or 0)
-    tr = TestResult(user_id=user.id, test_name=name, score=score, date=payload.get("date") or "")
-    session.add(tr)
+    record_result(session, user.id, name, score, payload.get("date") or "")
+    track_test_topics(session, user.id, name, score)
     session.commit()
-    adapt_plan_with_feedback(session, user.id)
-    return {"message": "Recorded", "score": score}
+    # Plan rewrite happens in the background, once per burst of submissions
+    queued = queue_plan_adaptation(session, user.id)
+    return {"message": "Recorded", "score": score, "plan_update": "queued" if queued else "pending"}
+
+
+@router.get("/adaptation-queue")
+def adaptation_queue(user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    return plan_queue_status(session)
 
 
 @router.post("/recompute")
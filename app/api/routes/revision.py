@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Depends, HTTPException
+from sqlmodel import Session
+from ...core.db import get_session
+from ...core.deps import get_current_user
+from ...models.user import User
+from ...services.revision import due_cards, ensure_topic_cards, review_card, revision_summary
+
+
+router = APIRouter(prefix="/revision", tags=["revision"])
+
+
+@router.get("/today")
+def revise_today(limit: int = 20, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    return {"cards": due_cards(session, user.id, limit=min(max(limit, 1), 200)), **revision_summary(session, user.id)}
+
+
+@router.post("/review")
+def review(payload: dict, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    try:
+        card_id = int(payload.get("card_id"))
+        quality = int(payload.get("quality"))
+    except (TypeError, ValueError):
+        raise HTTPException(status_code=400, detail="card_id and quality (0-5) are required")
+    if not 0 <= quality <= 5:
+        raise HTTPException(status_code=400, detail="quality must be between 0 and 5")
+    card = review_card(session, user.id, card_id, quality)
+    if not card:
+        raise HTTPException(status_code=404, detail="Card not found")
+    return card
+
+
+@router.post("/topics")
+def add_topics(payload: dict, user: User = Depends(get_current_user), session: Session = Depends(get_session)):
+    topics = [str(t).strip() for t in (payload.get("topics") or []) if str(t).strip()]
+    if not topics:
+        raise HTTPException(status_code=400, detail="Missing topics")
+    added = ensure_topic_cards(session, user.id, topics)
+    session.commit()
+    return {"added": added}
@@ -1,10 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request
+from sqlalchemy import func
 from sqlmodel import Session, select
 from datetime import date, datetime, timedelta
+from typing import Dict
 from ...core.db import get_session
+from ...core.http_cache import cached_response, seconds_until_midnight
 from ...models.user import User
-from ...models.content import Capsule
-from ...services.notifier import send_daily_capsule_email
+from ...models.content import Capsule, CapsuleArtifact, CapsuleItem
+from ...models.outbox import EmailCampaign
+from ...services.capsule_store import load_capsule_items
+from ...services.notifier import generate_digest_html
+from ...services.outbox import enqueue_campaign, kick_outbox
 from ...schemas.users import UserOut
 import json
 
@@ -12,7 +18,7 @@ router = APIRouter()
 
 @router.post("/subscribe/{email}")
 def subscribe_to_daily_capsule(email: str, session: Session = Depends(get_session)):
-    """Subscribe an email to daily capsule and send missed capsules"""
+    """Subscribe an email to daily capsule and queue a digest of missed capsules"""
     user = session.exec(select(User).where(User.email == email)).first()
     
     # Create user if doesn't exist
@@ -32,12 +38,14 @@ def subscribe_to_daily_capsule(email: str, session: Session = Depends(get_sessio
     was_subscribed = user.daily_capsule_subscribed
     
     if not was_subscribed:
-        # New subscription - send missed capsules from last 7 days
-        sent_count = send_missed_capsules(session, email, 7)
+        # New subscription - one digest of the last 7 days, delivered in the background
         user.daily_capsule_subscribed = True
         session.add(user)
         session.commit()
-        return {"message": f"Successfully subscribed {email} to daily capsule. Sent {sent_count} missed capsules."}
+        digest = queue_missed_capsules_digest(session, email, 7)
+        if digest["skipped"]:
+            return {"message": f"Successfully subscribed {email} to daily capsule. A digest of {digest['included']} missed capsules was already queued."}
+        return {"message": f"Successfully subscribed {email} to daily capsule. Queued a digest of {digest['included']} missed capsules."}
     else:
         return {"message": f"{email} is already subscribed to daily capsule"}
 
@@ -53,29 +61,45 @@ def unsubscribe_from_daily_capsule(email: str, session: Session = Depends(get_se
     session.commit()
     return {"message": f"Successfully unsubscribed {email} from daily capsule"}
 
-def send_missed_capsules(session: Session, email: str, days_back: int = 7):
-    """Send missed capsules to new subscriber"""
+def queue_missed_capsules_digest(session: Session, email: str, days_back: int = 7) -> Dict[str, int]:
+    """Queue one digest email merging the missed capsules.
+
+    Returns how many capsules it includes and whether it was queued now or
+    already queued for this email (skipped).
+    """
     end_date = date.today()
     start_date = end_date - timedelta(days=days_back)
     
-    # Get capsules from the last N days
-    capsules = session.exec(
-        select(Capsule).where(
-            Capsule.date >= str(start_date),
-            Capsule.date < str(end_date)
-        ).order_by(Capsule.date.desc())
-    ).all()
-    
-    sent_count = 0
-    for capsule in capsules:
-        capsule_data = {
-            "date": capsule.date,
-            "items": json.loads(capsule.items_json)
-        }
-        if send_daily_capsule_email(email, capsule_data):
-            sent_count += 1
-    
-    return sent_count
+    # One campaign per day and window, shared by every subscriber and rendered once;
+    # the outbox skips recipients it already holds, so a double-submit never sends two digests
+    key = f"missed:{end_date}:{days_back}"
+    campaign = session.exec(select(EmailCampaign).where(EmailCampaign.key == key)).first()
+    if campaign:
+        result = enqueue_campaign(session, key, campaign.subject, campaign.html, [email])
+        included = session.exec(
+            select(func.count(func.distinct(CapsuleItem.capsule_date))).where(
+                CapsuleItem.capsule_date >= str(start_date),
+                CapsuleItem.capsule_date < str(end_date)
+            )
+        ).one()
+    else:
+        # First request for this window: render from the stored capsule items (newest first)
+        days = [str(end_date - timedelta(days=i)) for i in range(1, days_back + 1)]
+        by_day = load_capsule_items(session, days)
+        digest = [{"date": day, "items": by_day[day]} for day in days if by_day.get(day)]
+        if not digest:
+            return {"included": 0, "queued": 0, "skipped": 0}
+        result = enqueue_campaign(
+            session,
+            key,
+            f"Your missed UPSC capsules ({digest[-1]['date']} to {digest[0]['date']})",
+            generate_digest_html(digest),
+            [email],
+        )
+        included = len(digest)
+    if result["queued"]:
+        kick_outbox()
+    return {"included": included, **result}
 
 
 @router.get("/subscribers")
@@ -121,33 +145,44 @@ def get_weekly_subscribers(session: Session = Depends(get_session)):
 
 @router.post("/send-missed/{email}")
 def send_missed_capsules_manual(email: str, days: int = 7, session: Session = Depends(get_session)):
-    """Manually send missed capsules to a subscriber"""
+    """Manually queue a digest of missed capsules for a subscriber"""
     user = session.exec(select(User).where(User.email == email)).first()
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
     
-    sent_count = send_missed_capsules(session, email, days)
-    return {"message": f"Sent {sent_count} missed capsules to {email}"}
+    digest = queue_missed_capsules_digest(session, email, days)
+    if digest["skipped"]:
+        return {"message": f"A digest of {digest['included']} missed capsules was already queued for {email}"}
+    return {"message": f"Queued a digest of {digest['included']} missed capsules to {email}"}
 
 
 @router.get("/missed-capsules/{days}")
-def get_missed_capsules(days: int = 7, session: Session = Depends(get_session)):
-    """Get missed capsules for viewing"""
+def get_missed_capsules(request: Request, days: int = 7, session: Session = Depends(get_session)):
+    """Get missed capsules for viewing (past days only, so cacheable until midnight)"""
     end_date = date.today()
     start_date = end_date - timedelta(days=days)
     
-    capsules = session.exec(
-        select(Capsule).where(
+    rows = session.exec(
+        select(Capsule.date, Capsule.items_json).where(
             Capsule.date >= str(start_date),
             Capsule.date < str(end_date)
         ).order_by(Capsule.date.desc())
     ).all()
+    rendered = {
+        a.capsule_date: a.body
+        for a in session.exec(
+            select(CapsuleArtifact).where(
+                CapsuleArtifact.kind == "json",
+                CapsuleArtifact.capsule_date >= str(start_date),
+                CapsuleArtifact.capsule_date < str(end_date)
+            )
+        ).all()
+    }
     
-    result = []
-    for capsule in capsules:
-        result.append({
-            "date": capsule.date,
-            "items": json.loads(capsule.items_json)
-        })
-    
-    return {"capsules": result}
+    # Everything is already serialized; splice the bytes rather than decoding and re-encoding
+    parts = [
+        rendered.get(day) or f'{{"date":{json.dumps(day)},"items":{items_json or "[]"}}}'.encode("utf-8")
+        for day, items_json in rows
+    ]
+    body = b'{"capsules":[' + b",".join(parts) + b"]}"
+    return cached_response(request, body, max_age=seconds_until_midnight())
@@ -2,22 +2,36 @@ from typing import List, Dict, Any
 from fastapi import APIRouter, Depends, HTTPException
 from sqlmodel import Session
 from ...core.db import get_session
-from ...core.deps import get_current_user_optional
+from ...core.deps import get_current_user_optional, require_admin
 from ...models.user import User
-from ...services.tests import generate_daily_quiz, record_test_result, get_progress_summary, get_test_history
+from ...services.tests import (
+    generate_daily_quiz,
+    get_item_analysis,
+    get_progress_summary,
+    get_test_history,
+    get_test_review,
+    quiz_for_user,
+    record_test_result,
+)
 
 
 router = APIRouter(prefix="/tests", tags=["tests"])
 
 
 @router.post("/generate/daily")
-def generate_daily(force: bool = False, session: Session = Depends(get_session)) -> Dict[str, Any]:
+def generate_daily(
+    force: bool = False, session: Session = Depends(get_session), _: User = Depends(require_admin)
+) -> Dict[str, Any]:
+    # Admin only: the payload carries the answer key, and force replaces a quiz users may be answering
     return generate_daily_quiz(session, force=force)
 
 
 @router.get("/today")
-def get_today(session: Session = Depends(get_session)) -> Dict[str, Any]:
-    return generate_daily_quiz(session)
+def get_today(
+    session: Session = Depends(get_session), user: User | None = Depends(get_current_user_optional)
+) -> Dict[str, Any]:
+    # Options come in the caller's own order; answers are graded back through it
+    return quiz_for_user(session, user.id if user else None)
 
 
 @router.post("/submit")
@@ -32,7 +46,33 @@ def submit_answers(
     answers: List[int] = payload.get("answers", [])
     if not name:
         raise HTTPException(status_code=400, detail="Missing test name")
-    return record_test_result(session, user.id or 0, name, answers)
+    # score_only skips the review payload; GET /tests/review serves it on demand
+    return record_test_result(session, user.id or 0, name, answers, review=not payload.get("score_only"))
+
+
+@router.get("/review")
+def review(
+    name: str,
+    session: Session = Depends(get_session),
+    user: User | None = Depends(get_current_user_optional),
+) -> Dict[str, Any]:
+    if not user:
+        raise HTTPException(status_code=401, detail="Authentication required")
+    result = get_test_review(session, user.id or 0, name)
+    if not result.get("success"):
+        raise HTTPException(status_code=404, detail=result.get("detail"))
+    return result
+
+
+@router.get("/item-analysis")
+def item_analysis(
+    name: str, day: str | None = None, session: Session = Depends(get_session), _: User = Depends(require_admin)
+) -> Dict[str, Any]:
+    # Admin only: distractor and difficulty data would hint at the answer key
+    result = get_item_analysis(session, name, day)
+    if not result.get("success"):
+        raise HTTPException(status_code=404, detail=result.get("detail"))
+    return result
 
 
 @router.get("/progress")
@@ -21,13 +21,52 @@ class Settings(BaseModel):
     schedule_cron_daily: str = os.getenv("SCHEDULE_CRON_DAILY", "0 6 * * *")
     schedule_cron_quiz: str = os.getenv("SCHEDULE_CRON_QUIZ", "0 7 * * *")
     schedule_cron_weekly_report: str = os.getenv("SCHEDULE_CRON_WEEKLY_REPORT", "0 8 * * 0")
+    # Intra-day ingest + incremental capsule update; empty disables it
+    schedule_cron_capsule_refresh: str = os.getenv("SCHEDULE_CRON_CAPSULE_REFRESH", "0 13,18 * * *")
     openai_api_key: str = os.getenv("OPENAI_API_KEY", "")
+    capsule_cache_max_age: int = int(os.getenv("CAPSULE_CACHE_MAX_AGE", "60"))
+    capsule_build_lease_seconds: int = int(os.getenv("CAPSULE_BUILD_LEASE_SECONDS", "300"))
+    capsule_build_wait_seconds: int = int(os.getenv("CAPSULE_BUILD_WAIT_SECONDS", "300"))
+    # How long GET /capsule/daily waits on a build already in progress before answering without it
+    capsule_request_wait_seconds: float = float(os.getenv("CAPSULE_REQUEST_WAIT_SECONDS", "3"))
+    # Wall-clock budget for one capsule build; slow paths are dropped as it runs low
+    capsule_build_budget_seconds: float = float(os.getenv("CAPSULE_BUILD_BUDGET_SECONDS", "45"))
+    capsule_extract_min_seconds: float = float(os.getenv("CAPSULE_EXTRACT_MIN_SECONDS", "15"))
+    capsule_llm_min_seconds: float = float(os.getenv("CAPSULE_LLM_MIN_SECONDS", "25"))
+    # Live updates (/capsule/stream): "memory" (single process) or "redis" (shared across workers)
+    events_backend: str = os.getenv("EVENTS_BACKEND", "memory").lower()
+    redis_url: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+    events_heartbeat_seconds: float = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+    # Nightly bulk planner: users loaded and written per chunk
+    plan_batch_size: int = int(os.getenv("PLAN_BATCH_SIZE", "500"))
     
     # Email settings
     smtp_server: str = os.getenv("SMTP_SERVER", "")
     smtp_port: int = int(os.getenv("SMTP_PORT", "587"))
     smtp_username: str = os.getenv("SMTP_USERNAME", "")
     smtp_password: str = os.getenv("SMTP_PASSWORD", "")
+    smtp_starttls: bool = os.getenv("SMTP_STARTTLS", "1") == "1"
+    smtp_timeout: float = float(os.getenv("SMTP_TIMEOUT", "30"))
+    smtp_pool_size: int = int(os.getenv("SMTP_POOL_SIZE", "4"))
+    smtp_max_messages_per_connection: int = int(os.getenv("SMTP_MAX_MESSAGES_PER_CONNECTION", "100"))
+
+    # Email outbox (durable queue drained by sender workers)
+    outbox_dispatcher: bool = os.getenv("OUTBOX_DISPATCHER", "1") == "1"
+    outbox_workers: int = int(os.getenv("OUTBOX_WORKERS", "4"))
+    outbox_rate_per_second: float = float(os.getenv("OUTBOX_RATE_PER_SECOND", "10"))
+    outbox_max_attempts: int = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "5"))
+    outbox_retry_base_seconds: int = int(os.getenv("OUTBOX_RETRY_BASE_SECONDS", "30"))
+    outbox_lease_seconds: int = int(os.getenv("OUTBOX_LEASE_SECONDS", "600"))
+    outbox_poll_seconds: float = float(os.getenv("OUTBOX_POLL_SECONDS", "15"))
+
+    # Plan adaptation after test submissions: coalesced per user, run by a background worker
+    plan_adapt_worker: bool = os.getenv("PLAN_ADAPT_WORKER", "1") == "1"
+    plan_adapt_debounce_seconds: float = float(os.getenv("PLAN_ADAPT_DEBOUNCE_SECONDS", "30"))
+    plan_adapt_poll_seconds: float = float(os.getenv("PLAN_ADAPT_POLL_SECONDS", "5"))
+
+    # Per-question quiz responses: buffered and written in one transaction per batch
+    quiz_response_batch: int = int(os.getenv("QUIZ_RESPONSE_BATCH", "200"))
+    quiz_response_flush_seconds: float = float(os.getenv("QUIZ_RESPONSE_FLUSH_SECONDS", "1"))
 
 
 @lru_cache()
@@ -1,4 +1,7 @@
-from sqlmodel import create_engine, Session
+import threading
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError, OperationalError
+from sqlmodel import SQLModel, create_engine, Session
 from .config import get_settings
 
 settings = get_settings()
@@ -11,3 +14,46 @@ def get_session():
     with Session(engine) as session:
         yield session
 
+_schema_ready = False
+_schema_lock = threading.Lock()
+
+
+def add_missing_columns() -> None:
+    """Add nullable model columns that an existing table predates.
+
+    create_all never alters existing tables; this covers the additive case
+    (new optional fields) without a migration tool.
+    """
+    insp = inspect(engine)
+    existing_tables = set(insp.get_table_names())
+    with engine.begin() as conn:
+        for table in SQLModel.metadata.sorted_tables:
+            if table.name not in existing_tables:
+                continue
+            present = {c["name"] for c in insp.get_columns(table.name)}
+            for col in table.columns:
+                if col.name in present or not col.nullable or col.primary_key:
+                    continue
+                col_type = col.type.compile(dialect=engine.dialect)
+                conn.execute(text(f'ALTER TABLE "{table.name}" ADD COLUMN "{col.name}" {col_type}'))
+
+
+def ensure_schema() -> None:
+    """Create missing tables (and nullable columns) once per process.
+
+    Lets entrypoints that skip app startup (agents, scripts) use tables
+    added after their database was created.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    with _schema_lock:
+        if _schema_ready:
+            return
+        try:
+            SQLModel.metadata.create_all(engine)
+        except (OperationalError, IntegrityError):
+            # Another process created the same table (or index) concurrently
+            SQLModel.metadata.create_all(engine)
+        add_missing_columns()
+        _schema_ready = True
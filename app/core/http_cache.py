@@ -0,0 +1,64 @@
+import hashlib
+import json
+from datetime import datetime, timedelta
+from typing import Any, Optional
+from fastapi import Request, Response
+
+# Suffixes CompressionMiddleware appends to an ETag for encoded representations
+_ENCODING_SUFFIXES = ("-br", "-gzip")
+
+
+def etag_for(body: bytes) -> str:
+    """Strong ETag derived from the content hash of the response body."""
+    return '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+
+
+def _normalize_etag(tag: str) -> str:
+    tag = tag.strip()
+    if tag.startswith("W/"):
+        tag = tag[2:]
+    for suffix in _ENCODING_SUFFIXES:
+        if tag.endswith(suffix + '"'):
+            return tag[: -len(suffix) - 1] + '"'
+    return tag
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(_normalize_etag(t) == etag for t in if_none_match.split(","))
+
+
+def seconds_until_midnight(now: Optional[datetime] = None) -> int:
+    now = now or datetime.now()
+    midnight = datetime.combine(now.date() + timedelta(days=1), datetime.min.time())
+    return max(1, int((midnight - now).total_seconds()))
+
+
+def cache_control(max_age: int = 0, immutable: bool = False) -> str:
+    if immutable:
+        return "public, max-age=31536000, immutable"
+    return f"public, max-age={max(0, int(max_age))}, must-revalidate"
+
+
+def cached_response(
+    request: Request,
+    body: bytes,
+    media_type: str = "application/json",
+    max_age: int = 0,
+    immutable: bool = False,
+    etag: Optional[str] = None,
+) -> Response:
+    """Serve `body` with ETag/Cache-Control, answering 304 when the client copy is current."""
+    tag = etag or etag_for(body)
+    headers = {"ETag": tag, "Cache-Control": cache_control(max_age, immutable)}
+    if etag_matches(request.headers.get("if-none-match"), tag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type=media_type, headers=headers)
+
+
+def cached_json_response(request: Request, payload: Any, max_age: int = 0, immutable: bool = False) -> Response:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return cached_response(request, body, max_age=max_age, immutable=immutable)
@@ -3,9 +3,9 @@ import logging
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from sqlmodel import SQLModel
 from .core.config import Settings, get_settings
-from .core.db import engine
+from .core.db import ensure_schema
+from .core.compression import CompressionMiddleware
 from .api.routes.health import router as health_router
 from .api.routes.news import router as news_router
 from .api.routes.capsule import router as capsule_router
@@ -22,6 +22,8 @@ from .api.routes.password import router as password_router
 from .api.routes.tests import router as tests_router
 from .api.routes.maintenance import router as maintenance_router
 from .api.routes.plan import router as plan_router
+from .api.routes.outbox import router as outbox_router
+from .api.routes.revision import router as revision_router
 
 logger = logging.getLogger(__name__)
 
@@ -36,6 +38,7 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(CompressionMiddleware, minimum_size=1024)
 
 app.include_router(frontend_router)
 app.include_router(health_router)
@@ -53,6 +56,8 @@ app.include_router(password_router)
 app.include_router(maintenance_router)
 app.include_router(plan_router)
 app.include_router(tests_router)
+app.include_router(outbox_router)
+app.include_router(revision_router)
 
 
 @app.on_event("startup")
@@ -64,16 +69,46 @@ def on_startup() -> None:
         from .models import user as _mu  # noqa: F401
         from .models import content as _mc  # noqa: F401
         from .models import tests as _mt  # noqa: F401
+        from .models import outbox as _mo  # noqa: F401
+        from .models import lease as _ml  # noqa: F401
     except Exception:
         # Safe to continue; create_all will handle present models
         pass
-    SQLModel.metadata.create_all(engine)
+    ensure_schema()
+    from .services.bootstrap import (
+        aggregate_user_stats,
+        build_distractor_pools,
+        ensure_precomputed_links,
+        ensure_unique_capsule_dates,
+        normalize_stored_capsules,
+    )
+    ensure_unique_capsule_dates()
+    normalize_stored_capsules()
+    ensure_precomputed_links()
+    aggregate_user_stats()
+    build_distractor_pools()
+    if settings.outbox_dispatcher:
+        from .services.outbox import start_outbox_dispatcher
+        start_outbox_dispatcher()
+    if settings.plan_adapt_worker:
+        from .services.plan_queue import start_plan_worker
+        start_plan_worker()
 
 
 def _init_db() -> None:
-    from .services.bootstrap import seed_basics
-    SQLModel.metadata.create_all(engine)
+    from .services.bootstrap import (
+        aggregate_user_stats,
+        ensure_precomputed_links,
+        ensure_unique_capsule_dates,
+        normalize_stored_capsules,
+        seed_basics,
+    )
+    ensure_schema()
+    ensure_unique_capsule_dates()
+    normalize_stored_capsules()
     seed_basics()
+    ensure_precomputed_links()
+    aggregate_user_stats()
 
 
 if __name__ == "__main__":
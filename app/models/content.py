@@ -1,4 +1,6 @@
 from typing import Optional
+from datetime import datetime
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 
@@ -36,6 +38,92 @@ class Mapping(SQLModel, table=True):
 
 class Capsule(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
-    date: str = Field(index=True)
+    date: str = Field(index=True, unique=True)
     items_json: str  # serialized capsule with links to news + topics + pyqs
 
+
+class CapsuleItem(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    capsule_date: str = Field(index=True)
+    position: int
+    news_id: Optional[int] = Field(default=None, index=True, foreign_key="newsitem.id")
+    title: str
+    url: str
+    summary: str = ""
+    relevance_score: float = 0.0
+    source_hash: Optional[str] = None  # fingerprint of the news row the item was built from
+
+
+class CapsuleItemTopic(SQLModel, table=True):
+    __table_args__ = (Index("ix_capsuleitemtopic_date_topic", "capsule_date", "topic"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    item_id: int = Field(index=True, foreign_key="capsuleitem.id")
+    capsule_date: str  # denormalized so trend windows need no join
+    topic_id: Optional[int] = Field(default=None, index=True, foreign_key="syllabustopic.id")
+    paper: str
+    topic: str
+    score: float = 0.0
+
+
+class CapsuleItemPyq(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    item_id: int = Field(index=True, foreign_key="capsuleitem.id")
+    pyq_id: int = Field(index=True, foreign_key="pyqquestion.id")
+    score: float = 0.0
+
+
+class CapsuleArtifact(SQLModel, table=True):
+    """Pre-rendered form of a capsule (email html, api json, plain text)."""
+
+    __table_args__ = (UniqueConstraint("capsule_date", "kind"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    capsule_date: str = Field(index=True)
+    kind: str  # html|json|text
+    version: str  # content hash of the items it was rendered from
+    content_type: str
+    body: bytes
+    created_at: str = Field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+
+class CapsuleVersion(SQLModel, table=True):
+    """One row per saved revision of a day's capsule, with the item-level diff."""
+
+    __table_args__ = (UniqueConstraint("capsule_date", "version"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    capsule_date: str = Field(index=True)
+    version: int  # 1, 2, ... within the day
+    content_hash: str  # matches CapsuleArtifact.version
+    item_count: int = 0
+    diff_json: str = "{}"  # {"added": [...], "changed": [...], "removed": [...]}
+    created_at: str = Field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+
+class TopicTrend(SQLModel, table=True):
+    """How many capsule items of one day mapped to a syllabus topic (maintained by capsule_store)."""
+
+    __table_args__ = (UniqueConstraint("day", "topic"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    day: str  # capsule date; leads the unique index used by rolling-window sums
+    topic: str
+    count: int = 0
+
+
+class PyqTopicLink(SQLModel, table=True):
+    """Offline link from a PYQ to its closest syllabus topics (see services/pyq_links)."""
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    topic_id: int = Field(index=True, foreign_key="syllabustopic.id")
+    pyq_id: int = Field(index=True, foreign_key="pyqquestion.id")
+    score: float = 0.0
+
+
+class PrecomputeState(SQLModel, table=True):
+    """Fingerprint of the inputs an offline table was last built from."""
+
+    name: str = Field(primary_key=True)
+    fingerprint: str
+    updated_at: str = Field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
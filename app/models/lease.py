@@ -0,0 +1,7 @@
+from sqlmodel import Field, SQLModel
+
+
+class BuildLease(SQLModel, table=True):
+    key: str = Field(primary_key=True)  # e.g. capsule:2025-10-14
+    owner: str
+    expires_at: str
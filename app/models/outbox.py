@@ -0,0 +1,28 @@
+from typing import Optional
+from sqlalchemy import UniqueConstraint
+from sqlmodel import Field, SQLModel
+from datetime import datetime
+
+
+class EmailCampaign(SQLModel, table=True):
+    id: Optional[int] = Field(default=None, primary_key=True)
+    key: str = Field(index=True, unique=True)  # e.g. capsule:2025-10-14, weekly:2025-10-19
+    subject: str
+    html: str
+    text: Optional[str] = None  # plain-text alternative part
+    created_at: str = Field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"))
+
+
+class EmailOutbox(SQLModel, table=True):
+    __table_args__ = (UniqueConstraint("campaign_id", "recipient"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    campaign_id: int = Field(index=True, foreign_key="emailcampaign.id")
+    recipient: str
+    status: str = Field(default="pending", index=True)  # pending, sending, sent, failed
+    attempts: int = 0
+    next_attempt_at: str = Field(default_factory=lambda: datetime.now().isoformat(timespec="seconds"), index=True)
+    claim_token: Optional[str] = Field(default=None, index=True)
+    claimed_at: Optional[str] = None
+    sent_at: Optional[str] = Field(default=None, index=True)
+    last_error: Optional[str] = None
@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import Index
 from sqlmodel import Field, SQLModel
 
 
@@ -7,4 +8,42 @@ class GeneratedTest(SQLModel, table=True):
     date: str = Field(index=True)
     name: str = Field(index=True)
     questions_json: str  # serialized list of questions with options/answers if available
+    version: Optional[str] = None  # set per generation; keys cached answer keys
 
+
+class QuizResponse(SQLModel, table=True):
+    """One answered question of a quiz submission (written in batches by services/quiz_responses)."""
+
+    __table_args__ = (Index("ix_quizresponse_user_test", "user_id", "test_id"),)
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    result_id: int  # TestResult of the submission
+    user_id: int = Field(foreign_key="user.id")
+    test_id: int
+    question: int
+    chosen: int  # index in the stored option order, -1 if unanswered
+    ok: bool = False
+
+
+class QuestionStats(SQLModel, table=True):
+    """Running item-analysis sums for one quiz question (maintained by services/item_stats).
+
+    score_* are over each attempt's whole-quiz score (fraction correct), enough
+    for difficulty and the point-biserial discrimination without rescanning.
+    """
+
+    test_id: int = Field(primary_key=True)
+    question: int = Field(primary_key=True)
+    attempts: int = 0
+    correct: int = 0
+    score_sum: float = 0.0
+    score_sq_sum: float = 0.0
+    correct_score_sum: float = 0.0  # score_sum over attempts that got this question right
+
+
+class DistractorStats(SQLModel, table=True):
+    """How often a wrong option text was shown and picked, across all quizzes."""
+
+    option: str = Field(primary_key=True)
+    shown: int = 0
+    picked: int = 0
@@ -1,4 +1,5 @@
 from typing import Optional
+from sqlalchemy import Index, UniqueConstraint
 from sqlmodel import Field, SQLModel
 
 
@@ -23,6 +24,47 @@ class TestResult(SQLModel, table=True):
     date: str
 
 
+class UserStats(SQLModel, table=True):
+    """Running aggregates of a user's TestResult rows (maintained by services/user_stats)."""
+
+    user_id: int = Field(primary_key=True, foreign_key="user.id")
+    tests_count: int = 0
+    score_sum: float = 0.0
+    recent_json: str = "[]"  # latest results, oldest first
+    weak_json: str = "{}"  # topic -> weakness weight over the latest results
+    updated_at: Optional[str] = None
+
+
+class PlanAdaptation(SQLModel, table=True):
+    """Pending plan re-adaptation for a user; repeated submissions coalesce into this one row."""
+
+    user_id: int = Field(primary_key=True, foreign_key="user.id")
+    requested_at: str
+    due_at: str = Field(index=True)  # first request + debounce window
+    requests: int = 1
+
+
+class RevisionCard(SQLModel, table=True):
+    """One spaced-repetition item for a user: a syllabus topic or a missed quiz question (SM-2 state)."""
+
+    __table_args__ = (
+        UniqueConstraint("user_id", "kind", "ref"),
+        Index("ix_revisioncard_user_due", "user_id", "due"),
+    )
+
+    id: Optional[int] = Field(default=None, primary_key=True)
+    user_id: int = Field(foreign_key="user.id")
+    kind: str  # "topic" or "question"
+    ref: str  # topic name, or "<GeneratedTest.id>:<question index>"
+    label: str = ""
+    ease: int = 250  # SM-2 easiness factor x100
+    interval: int = 0  # days until the next review
+    reps: int = 0  # consecutive successful reviews
+    lapses: int = 0
+    due: str  # ISO date of the next review
+    last_review: Optional[str] = None
+
+
 class StudyPlan(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     user_id: int = Field(index=True, foreign_key="user.id")
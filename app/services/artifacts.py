@@ -0,0 +1,62 @@
+import hashlib
+import json
+from typing import Any, Dict, List, Optional
+from sqlmodel import Session, select
+from ..core.db import ensure_schema
+from ..models.content import Capsule, CapsuleArtifact
+from .notifier import generate_capsule_html, generate_capsule_text
+
+CONTENT_TYPES = {
+    "html": "text/html; charset=utf-8",
+    "json": "application/json",
+    "text": "text/plain; charset=utf-8",
+}
+
+
+def capsule_version(items_json: str) -> str:
+    """Content hash of a capsule's serialized items; doubles as the HTTP ETag."""
+    return hashlib.sha256(items_json.encode("utf-8")).hexdigest()[:32]
+
+
+def render_capsule_artifacts(capsule: Dict[str, Any]) -> Dict[str, bytes]:
+    return {
+        "html": generate_capsule_html(capsule).encode("utf-8"),
+        "json": json.dumps(capsule, ensure_ascii=False, separators=(",", ":")).encode("utf-8"),
+        "text": generate_capsule_text(capsule).encode("utf-8"),
+    }
+
+
+def store_capsule_artifacts(session: Session, day: str, items: List[Dict], items_json: str) -> None:
+    """Render and store every artifact of a capsule unless this version exists; the caller commits."""
+    ensure_schema()
+    version = capsule_version(items_json)
+    existing = {a.kind: a for a in session.exec(select(CapsuleArtifact).where(CapsuleArtifact.capsule_date == day)).all()}
+    if len(existing) == len(CONTENT_TYPES) and all(a.version == version for a in existing.values()):
+        return
+    for kind, body in render_capsule_artifacts({"date": day, "items": items}).items():
+        row = existing.get(kind) or CapsuleArtifact(capsule_date=day, kind=kind, version=version, content_type=CONTENT_TYPES[kind], body=b"")
+        row.version = version
+        row.body = body
+        session.add(row)
+
+
+def get_capsule_artifact(session: Session, day: str, kind: str) -> Optional[CapsuleArtifact]:
+    """Stored artifact for a non-empty capsule, rendered on first use for capsules saved before artifacts existed."""
+    ensure_schema()
+    row = session.exec(
+        select(CapsuleArtifact).where(CapsuleArtifact.capsule_date == day, CapsuleArtifact.kind == kind)
+    ).first()
+    if row:
+        return row
+    items_json = session.exec(select(Capsule.items_json).where(Capsule.date == day)).first()
+    try:
+        items = json.loads(items_json) if items_json else []
+    except Exception:
+        items = []
+    if not items:
+        return None
+    store_capsule_artifacts(session, day, items, items_json)
+    session.commit()
+    return session.exec(
+        select(CapsuleArtifact).where(CapsuleArtifact.capsule_date == day, CapsuleArtifact.kind == kind)
+    ).first()
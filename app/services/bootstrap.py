@@ -1,5 +1,6 @@
 import json
 import os
+from sqlalchemy import inspect, text
 from sqlmodel import Session, select
 from ..core.db import engine
 from ..models.content import SyllabusTopic, PyqQuestion
@@ -38,3 +39,46 @@ def seed_basics() -> None:
                     hashed_password = get_password_hash(password)
                     session.add(User(**u, hashed_password=hashed_password))
         session.commit()
+
+
+def ensure_unique_capsule_dates() -> None:
+    """Keep one capsule per date on databases created before the unique constraint."""
+    insp = inspect(engine)
+    if "capsule" not in insp.get_table_names():
+        return
+    unique = any(ix.get("unique") and ix["column_names"] == ["date"] for ix in insp.get_indexes("capsule"))
+    unique = unique or any(uc["column_names"] == ["date"] for uc in insp.get_unique_constraints("capsule"))
+    if unique:
+        return
+    with engine.begin() as conn:
+        # The newest row for a date is the one readers have been seeing last
+        conn.execute(text("DELETE FROM capsule WHERE id NOT IN (SELECT MAX(id) FROM capsule GROUP BY date)"))
+        conn.execute(text("CREATE UNIQUE INDEX IF NOT EXISTS ux_capsule_date ON capsule (date)"))
+
+
+def normalize_stored_capsules() -> None:
+    """Fill the relational capsule tables for capsules saved as JSON only."""
+    from .capsule_store import backfill_capsule_items
+    with Session(engine) as session:
+        backfill_capsule_items(session)
+
+
+def ensure_precomputed_links() -> None:
+    """Rebuild offline lookup tables whose seed inputs changed."""
+    from .pyq_links import ensure_pyq_topic_links
+    with Session(engine) as session:
+        ensure_pyq_topic_links(session)
+
+
+def aggregate_user_stats() -> None:
+    """Build UserStats for users whose test results were recorded before it existed."""
+    from .user_stats import backfill_user_stats
+    with Session(engine) as session:
+        backfill_user_stats(session)
+
+
+def build_distractor_pools() -> None:
+    """Precompute the quiz distractor pools so requests only read them."""
+    from .tests import warm_distractor_pools
+    with Session(engine) as session:
+        warm_distractor_pools(session)
@@ -0,0 +1,244 @@
+from collections import Counter
+from datetime import datetime
+import json
+import uuid
+from typing import Dict, Iterable, List, Optional
+from sqlalchemy import delete, func, insert
+from sqlmodel import Session, select
+from ..core.db import ensure_schema
+from ..models.content import (
+    Capsule,
+    CapsuleItem,
+    CapsuleItemPyq,
+    CapsuleItemTopic,
+    CapsuleVersion,
+    PrecomputeState,
+    PyqQuestion,
+    SyllabusTopic,
+    TopicTrend,
+)
+from .artifacts import capsule_version
+
+TREND_STATE = "topic_trends"
+
+
+def _delete_day(session: Session, day: str) -> None:
+    item_ids = select(CapsuleItem.id).where(CapsuleItem.capsule_date == day)
+    session.exec(delete(CapsuleItemTopic).where(CapsuleItemTopic.item_id.in_(item_ids)))
+    session.exec(delete(CapsuleItemPyq).where(CapsuleItemPyq.item_id.in_(item_ids)))
+    session.exec(delete(CapsuleItem).where(CapsuleItem.capsule_date == day))
+
+
+def store_capsule_items(
+    session: Session, day: str, items: List[Dict], fingerprints: Optional[Dict[int, str]] = None
+) -> None:
+    """Replace the relational rows of one capsule; the caller commits.
+
+    Capsule.items_json stays the render cache, these rows are what trend,
+    report and quiz queries read. `fingerprints` maps news ids to the
+    source hash used to detect changed news on the next refresh.
+    """
+    ensure_schema()
+    _delete_day(session, day)
+    if not items:
+        _store_topic_trends(session, day, [])
+        return
+    fingerprints = fingerprints or {}
+    rows = [
+        CapsuleItem(
+            capsule_date=day,
+            position=pos,
+            news_id=it.get("news_id"),
+            title=str(it.get("title") or ""),
+            url=str(it.get("url") or ""),
+            summary=str(it.get("summary") or ""),
+            relevance_score=float(it.get("relevance_score") or 0.0),
+            source_hash=fingerprints.get(it.get("news_id")),
+        )
+        for pos, it in enumerate(items)
+    ]
+    session.add_all(rows)
+    session.flush()  # assigns ids for the link rows
+
+    topic_ids = {(t.paper, t.topic): t.id for t in session.exec(select(SyllabusTopic)).all()}
+    topic_rows = []
+    pyq_rows = []
+    for row, it in zip(rows, items):
+        for tp in it.get("topics") or []:
+            paper, name = str(tp.get("paper") or ""), str(tp.get("topic") or "").strip()
+            if not name:
+                continue
+            topic_rows.append({
+                "item_id": row.id,
+                "capsule_date": day,
+                "topic_id": topic_ids.get((paper, name)),
+                "paper": paper,
+                "topic": name,
+                "score": float(tp.get("score") or 0.0),
+            })
+        for pq in it.get("pyqs") or []:
+            if pq.get("id") is None:
+                continue
+            pyq_rows.append({"item_id": row.id, "pyq_id": int(pq["id"]), "score": float(pq.get("score") or 0.0)})
+    if topic_rows:
+        session.exec(insert(CapsuleItemTopic), params=topic_rows)
+    if pyq_rows:
+        session.exec(insert(CapsuleItemPyq), params=pyq_rows)
+    _store_topic_trends(session, day, topic_rows)
+
+
+def _store_topic_trends(session: Session, day: str, topic_rows: List[Dict]) -> None:
+    """Replace the day's TopicTrend counts and bump the trend version readers cache against."""
+    session.exec(delete(TopicTrend).where(TopicTrend.day == day))
+    counts = Counter(r["topic"] for r in topic_rows)
+    if counts:
+        session.exec(insert(TopicTrend), params=[{"day": day, "topic": t, "count": n} for t, n in counts.items()])
+    _bump_trend_version(session)
+
+
+def _bump_trend_version(session: Session) -> None:
+    state = session.get(PrecomputeState, TREND_STATE) or PrecomputeState(name=TREND_STATE, fingerprint="")
+    state.fingerprint = uuid.uuid4().hex
+    state.updated_at = datetime.now().isoformat(timespec="seconds")
+    session.add(state)
+
+
+def trend_version(session: Session) -> str:
+    """Changes whenever any day's topic counts change; empty before the first capsule."""
+    ensure_schema()
+    return session.exec(select(PrecomputeState.fingerprint).where(PrecomputeState.name == TREND_STATE)).first() or ""
+
+
+def item_fingerprints(session: Session, day: str) -> Dict[int, str]:
+    """news_id -> source hash of the items stored for `day`."""
+    ensure_schema()
+    rows = session.exec(
+        select(CapsuleItem.news_id, CapsuleItem.source_hash).where(
+            CapsuleItem.capsule_date == day, CapsuleItem.news_id.is_not(None)
+        )
+    ).all()
+    return {news_id: h for news_id, h in rows if h}
+
+
+def record_capsule_version(
+    session: Session, day: str, items: List[Dict], items_json: str, diff: Dict[str, List[Dict]]
+) -> int:
+    """Append the next version number for `day` with its item diff; the caller commits."""
+    ensure_schema()
+    last = session.exec(select(func.max(CapsuleVersion.version)).where(CapsuleVersion.capsule_date == day)).one()
+    brief = {
+        k: [{"news_id": it.get("news_id"), "title": it.get("title"), "url": it.get("url")} for it in v]
+        for k, v in diff.items()
+    }
+    row = CapsuleVersion(
+        capsule_date=day,
+        version=(last or 0) + 1,
+        content_hash=capsule_version(items_json),
+        item_count=len(items),
+        diff_json=json.dumps(brief),
+    )
+    session.add(row)
+    return row.version
+
+
+def capsule_versions(session: Session, day: str) -> List[Dict]:
+    ensure_schema()
+    rows = session.exec(
+        select(CapsuleVersion).where(CapsuleVersion.capsule_date == day).order_by(CapsuleVersion.version)
+    ).all()
+    return [
+        {
+            "version": r.version,
+            "content_hash": r.content_hash,
+            "item_count": r.item_count,
+            "created_at": r.created_at,
+            **json.loads(r.diff_json or "{}"),
+        }
+        for r in rows
+    ]
+
+
+def backfill_capsule_items(session: Session) -> int:
+    """Normalize capsules stored before the relational tables existed; returns how many."""
+    ensure_schema()
+    done = select(CapsuleItem.capsule_date).distinct()
+    pending = session.exec(select(Capsule).where(Capsule.date.not_in(done))).all()
+    count = 0
+    for cap in pending:
+        try:
+            items = json.loads(cap.items_json) or []
+        except Exception:
+            continue
+        if items:
+            store_capsule_items(session, cap.date, items)
+            count += 1
+    # Days normalized before TopicTrend existed get their counts from the item rows
+    counted = select(TopicTrend.day).distinct()
+    missing = session.exec(
+        select(CapsuleItemTopic.capsule_date, CapsuleItemTopic.topic, func.count())
+        .where(CapsuleItemTopic.capsule_date.not_in(counted))
+        .group_by(CapsuleItemTopic.capsule_date, CapsuleItemTopic.topic)
+    ).all()
+    if missing:
+        session.exec(insert(TopicTrend), params=[{"day": d, "topic": t, "count": int(n)} for d, t, n in missing])
+        _bump_trend_version(session)
+    session.commit()
+    return count
+
+
+def load_capsule_items(
+    session: Session, days: Iterable[str], per_day_limit: Optional[int] = None
+) -> Dict[str, List[Dict]]:
+    """Capsule items for `days` rebuilt from the relational rows, keyed by date."""
+    ensure_schema()
+    days = list(days)
+    if not days:
+        return {}
+    query = select(CapsuleItem).where(CapsuleItem.capsule_date.in_(days))
+    if per_day_limit is not None:
+        query = query.where(CapsuleItem.position < per_day_limit)
+    rows = session.exec(query.order_by(CapsuleItem.capsule_date.desc(), CapsuleItem.position)).all()
+    if not rows:
+        return {}
+    ids = [r.id for r in rows]
+
+    topics: Dict[int, List[Dict]] = {}
+    for t in session.exec(
+        select(CapsuleItemTopic).where(CapsuleItemTopic.item_id.in_(ids)).order_by(CapsuleItemTopic.score.desc())
+    ).all():
+        topics.setdefault(t.item_id, []).append({"paper": t.paper, "topic": t.topic, "score": t.score})
+
+    pyqs: Dict[int, List[Dict]] = {}
+    for link, q in session.exec(
+        select(CapsuleItemPyq, PyqQuestion)
+        .join(PyqQuestion, PyqQuestion.id == CapsuleItemPyq.pyq_id)
+        .where(CapsuleItemPyq.item_id.in_(ids))
+        .order_by(CapsuleItemPyq.score.desc())
+    ).all():
+        pyqs.setdefault(link.item_id, []).append(
+            {"id": q.id, "year": q.year, "paper": q.paper, "question": q.question, "score": link.score}
+        )
+
+    out: Dict[str, List[Dict]] = {}
+    for r in rows:
+        out.setdefault(r.capsule_date, []).append({
+            "news_id": r.news_id,
+            "title": r.title,
+            "url": r.url,
+            "summary": r.summary,
+            "topics": topics.get(r.id, []),
+            "pyqs": pyqs.get(r.id, []),
+            "relevance_score": r.relevance_score,
+        })
+    return out
+
+
+def topic_counts(session: Session, start: str, end: str) -> Counter:
+    """How often each syllabus topic was mapped in capsules dated start..end (inclusive)."""
+    ensure_schema()
+    rows = session.exec(
+        select(TopicTrend.topic, func.sum(TopicTrend.count))
+        .where(TopicTrend.day >= start, TopicTrend.day <= end)
+        .group_by(TopicTrend.topic)
+    ).all()
+    return Counter({name: int(n) for name, n in rows})
@@ -1,95 +1,301 @@
-from datetime import date
-import json
-import os
-from sqlmodel import Session, select
-from ..models.content import NewsItem, Capsule, Mapping, SyllabusTopic
-from .mapping import find_related_pyqs
-from .summarizer import summarize_text, summarize_news_article
+from datetime import date
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from typing import Optional
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from ..core.config import get_settings
+from ..models.content import NewsItem, Capsule, Mapping, SyllabusTopic
+from .artifacts import store_capsule_artifacts
+from .capsule_store import item_fingerprints, record_capsule_version, store_capsule_items
+from .events import CAPSULE_CHANNEL, publish
+from .leases import acquire_lease, release_lease
+from .mapping import find_related_pyqs
+from .pyq_links import related_pyqs
+from .summarizer import summarize_text, summarize_news_article, uses_llm
 
+logger = logging.getLogger(__name__)
 
-def build_daily_capsule(session: Session):
+
+_build_locks: dict[str, threading.Lock] = {}
+_build_locks_guard = threading.Lock()
+
+
+def _date_lock(day: str) -> threading.Lock:
+    with _build_locks_guard:
+        return _build_locks.setdefault(day, threading.Lock())
+
+
+def _stored_items(session: Session, day: str) -> list:
+    raw = session.exec(select(Capsule.items_json).where(Capsule.date == day)).first()
+    try:
+        return json.loads(raw) if raw else []
+    except Exception:
+        return []
+
+
+def build_daily_capsule(session: Session, refresh: bool = False, wait_seconds: Optional[float] = None):
+    """Return today's capsule, building it at most once across threads and processes.
+
+    Callers in one process queue on a per-date lock; across processes the
+    first caller takes a DB lease (BuildLease) and the others wait for the
+    capsule it stores instead of repeating the summarization work. Waiting
+    callers give up after `wait_seconds` (CAPSULE_BUILD_WAIT_SECONDS by
+    default) and get what is stored so far with building=True.
+
+    With refresh=True an existing capsule is brought up to date with news
+    ingested since its last version; only new or changed items are rebuilt.
+    """
     today = str(date.today())
-    existing = session.exec(select(Capsule).where(Capsule.date == today)).first()
-    if existing:
-        items = json.loads(existing.items_json)
-        if items:  # Only return if capsule has content
-            return {"date": today, "items": items}
+    items = _stored_items(session, today)
+    if items and not refresh:
+        return {"date": today, "items": items}
+    settings = get_settings()
+    key = f"capsule:{today}"
+    wait = max(0.0, settings.capsule_build_wait_seconds if wait_seconds is None else wait_seconds)
+    deadline = time.monotonic() + wait
+    lock = _date_lock(today)
+    if not lock.acquire(timeout=wait):
+        # This process is still building it
+        return {"date": today, "items": _stored_items(session, today), "building": True}
+    try:
+        while True:
+            items = _stored_items(session, today)
+            if items and not refresh:
+                return {"date": today, "items": items}
+            token = acquire_lease(key, settings.capsule_build_lease_seconds)
+            if token:
+                try:
+                    return _build_daily_capsule(session, refresh=refresh)
+                finally:
+                    release_lease(key, token)
+            if time.monotonic() >= deadline:
+                # Another process is still building; don't duplicate its work
+                return {"date": today, "items": items, "building": True}
+            time.sleep(0.5)
+    finally:
+        lock.release()
+
+
+def _store_derived(session: Session, day: str, items: list, items_json: str, fingerprints: dict) -> None:
+    """Relational rows and pre-rendered artifacts that accompany items_json."""
+    store_capsule_items(session, day, items, fingerprints)
+    if items:
+        store_capsule_artifacts(session, day, items, items_json)
+
+
+class BuildBudget:
+    """Wall-clock budget shared by the items of one capsule build."""
+
+    def __init__(self, seconds: float):
+        self.deadline = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return self.deadline - time.monotonic()
+
+
+def _fallback_summary(n: NewsItem) -> str:
+    text = (n.summary or n.content or "").strip()
+    return text[:600] if text else "No summary available."
+
+
+def _build_item(session: Session, n: NewsItem, budget: BuildBudget) -> tuple[dict, list[str]]:
+    """Build one capsule item; the second value lists what was skipped to stay within budget."""
+    settings = get_settings()
+    degraded: list[str] = []
+    # Get mappings for this news item (deduplicate by topic, keep top score)
+    maps = session.exec(select(Mapping).where(Mapping.news_id == (n.id or 0))).all()
+    topic_scores = {}
+    mapped_ids = {}
+    for m in maps:
+        mapped_ids[m.topic_id] = max(mapped_ids.get(m.topic_id, 0.0), float(m.score))
+        topic = session.get(SyllabusTopic, m.topic_id)
+        if not topic:
+            continue
+        key = (topic.paper, topic.topic)
+        prev = topic_scores.get(key, 0.0)
+        if float(m.score) > prev:
+            topic_scores[key] = float(m.score)
+    topics = [
+        {"paper": p, "topic": t, "score": s}
+        for (p, t), s in sorted(topic_scores.items(), key=lambda x: x[1], reverse=True)[:3]
+    ]
     
-    # Get latest 15 news items
-    news = session.exec(select(NewsItem)).all()[-15:]
-    items = []
+    # Get related PYQs with better context
+    search_text = f"{n.title} {n.summary or n.content or ''}"
+    # Add topic keywords for better matching
+    try:
+        topic_keywords = " ".join([t.get("topic", "") for t in topics]) if topics else ""
+        enhanced_search = f"{search_text} {topic_keywords}"
+    except:
+        enhanced_search = search_text
+    if budget.remaining() > 0:
+        # Candidates via news -> topic -> PYQ links; full scan only for unmapped news
+        pyqs = related_pyqs(session, enhanced_search, mapped_ids)
+        if pyqs is None:
+            pyqs = find_related_pyqs(session, enhanced_search)
+    else:
+        pyqs = []
+        degraded.append("pyqs_skipped")
     
-    for n in news:
-        # Get mappings for this news item (deduplicate by topic, keep top score)
-        maps = session.exec(select(Mapping).where(Mapping.news_id == (n.id or 0))).all()
-        topic_scores = {}
-        for m in maps:
-            topic = session.get(SyllabusTopic, m.topic_id)
-            if not topic:
-                continue
-            key = (topic.paper, topic.topic)
-            prev = topic_scores.get(key, 0.0)
-            if float(m.score) > prev:
-                topic_scores[key] = float(m.score)
-        topics = [
-            {"paper": p, "topic": t, "score": s}
-            for (p, t), s in sorted(topic_scores.items(), key=lambda x: x[1], reverse=True)[:3]
-        ]
-        
-        # Get related PYQs with better context
-        search_text = f"{n.title} {n.summary or n.content or ''}"
-        # Add topic keywords for better matching
-        try:
-            topic_keywords = " ".join([t.get("topic", "") for t in topics]) if topics else ""
-            enhanced_search = f"{search_text} {topic_keywords}"
-        except:
-            enhanced_search = search_text
-        pyqs = find_related_pyqs(session, enhanced_search)
-        
-        # Build a clean, bullet-style summary at render time (always bulletize)
-        base_text = (n.content or n.summary or "").strip()
-        # If too short, try on-the-fly extraction for better summary
-        if len(base_text) < 120:
+    # Build a clean, bullet-style summary at render time (always bulletize)
+    base_text = (n.content or n.summary or "").strip()
+    # If too short, try on-the-fly extraction for better summary
+    if len(base_text) < 120:
+        if budget.remaining() >= settings.capsule_extract_min_seconds:
             try:
                 from .content_extract import extract_article_text
-                extracted = extract_article_text(n.url)
+                extracted = extract_article_text(n.url, timeout=min(10.0, budget.remaining() / 2))
                 if extracted and len(extracted) > 160:
                     base_text = extracted
             except Exception:
                 pass
-        if base_text:
-            try:
-                summary = summarize_news_article(n.title, base_text, url=n.url)
-            except Exception:
-                summary = summarize_text(base_text, max_sentences=8)
         else:
-            summary = "No summary available."
-        # Drop heading line if it duplicates the title for cleaner display
+            degraded.append("live_extract_skipped")
+    if budget.remaining() <= 0:
+        summary = _fallback_summary(n)
+        degraded.append("stored_summary")
+    elif base_text:
+        allow_llm = budget.remaining() >= settings.capsule_llm_min_seconds
+        if not allow_llm and uses_llm():
+            degraded.append("llm_skipped")
         try:
-            lines = [ln for ln in summary.splitlines() if ln.strip()]
-            if lines and (n.title.lower() in lines[0].lower()) and ("key points" in lines[0].lower()):
-                summary = "\n".join(lines[1:]).strip() or summary
+            summary = summarize_news_article(
+                n.title, base_text, url=n.url, allow_llm=allow_llm, timeout=min(20.0, max(1.0, budget.remaining() / 2))
+            )
         except Exception:
-            pass
-        
-        items.append({
-            "title": n.title,
-            "url": n.url,
-            "summary": summary,
-            "topics": topics,
-            "pyqs": [dict(t) for i, t in enumerate(pyqs) if t not in pyqs[:i]],
-            "pyq_count": len([dict(t) for i, t in enumerate(pyqs) if t not in pyqs[:i]]),
-            "relevance_score": max([p["score"] for p in pyqs]) if pyqs else 0.0
-        })
+            summary = summarize_text(base_text, max_sentences=8)
+    else:
+        summary = "No summary available."
+    # Drop heading line if it duplicates the title for cleaner display
+    try:
+        lines = [ln for ln in summary.splitlines() if ln.strip()]
+        if lines and (n.title.lower() in lines[0].lower()) and ("key points" in lines[0].lower()):
+            summary = "\n".join(lines[1:]).strip() or summary
+    except Exception:
+        pass
+    
+    return {
+        "news_id": n.id,
+        "title": n.title,
+        "url": n.url,
+        "summary": summary,
+        "topics": topics,
+        "pyqs": [dict(t) for i, t in enumerate(pyqs) if t not in pyqs[:i]],
+        "pyq_count": len([dict(t) for i, t in enumerate(pyqs) if t not in pyqs[:i]]),
+        "relevance_score": max([p["score"] for p in pyqs]) if pyqs else 0.0
+    }, degraded
+
+
+def _mapping_priority(session: Session, news_ids: list) -> dict:
+    if not news_ids:
+        return {}
+    rows = session.exec(
+        select(Mapping.news_id, func.max(Mapping.score)).where(Mapping.news_id.in_(news_ids)).group_by(Mapping.news_id)
+    ).all()
+    return {news_id: float(score or 0.0) for news_id, score in rows}
+
+
+def _news_fingerprint(n: NewsItem) -> str:
+    raw = "\x1f".join([n.title or "", n.url or "", n.summary or "", n.content or ""])
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()
+
+
+def _build_daily_capsule(session: Session, refresh: bool = False):
+    today = str(date.today())
+    existing = session.exec(select(Capsule).where(Capsule.date == today)).first()
+    previous = []
+    if existing:
+        try:
+            previous = json.loads(existing.items_json) or []
+        except Exception:
+            previous = []
+        if previous and not refresh:  # Only return if capsule has content
+            return {"date": today, "items": previous}
+    
+    # Get latest 15 news items
+    news = list(reversed(session.exec(select(NewsItem).order_by(NewsItem.id.desc()).limit(15)).all()))
+    
+    # Reuse items whose news is unchanged since the last version; build only the delta
+    known = item_fingerprints(session, today)
+    prev_by_news = {it.get("news_id"): it for it in previous if it.get("news_id") is not None}
+    fingerprints = {}
+    built = {}
+    pending = []
+    for n in news:
+        fp = _news_fingerprint(n)
+        prev = prev_by_news.get(n.id)
+        if prev is not None and known.get(n.id) == fp:
+            built[n.id] = prev
+            fingerprints[n.id] = fp
+        else:
+            pending.append((n, fp))
+    
+    # Most syllabus-relevant (then newest) items first, so a tight budget degrades the tail
+    priority = _mapping_priority(session, [n.id for n, _ in pending])
+    pending.sort(key=lambda x: (priority.get(x[0].id, 0.0), x[0].id or 0), reverse=True)
+    budget = BuildBudget(get_settings().capsule_build_budget_seconds)
+    added, changed, degraded = [], [], []
+    for n, fp in pending:
+        item, skipped = _build_item(session, n, budget)
+        built[n.id] = item
+        if skipped:
+            # No fingerprint, so the next refresh rebuilds it with full quality
+            degraded.append({"news_id": n.id, "title": n.title, "skipped": skipped})
+        else:
+            fingerprints[n.id] = fp
+        (changed if n.id in prev_by_news else added).append(n.id)
+    if degraded:
+        logger.warning("Capsule %s: %d items degraded to fit the build budget", today, len(degraded))
+    items = [built[n.id] for n in news]
+    current = {n.id for n in news}
+    removed = [it for it in previous if it.get("news_id") not in current]
+    if previous and not (added or changed or removed) and [it.get("news_id") for it in previous] == [n.id for n in news]:
+        return {"date": today, "items": previous}
     
     # Save new capsule
+    items_json = json.dumps(items)
     if existing:
-        existing.items_json = json.dumps(items)
+        existing.items_json = items_json
         session.add(existing)
     else:
-        cap = Capsule(date=today, items_json=json.dumps(items))
+        cap = Capsule(date=today, items_json=items_json)
         session.add(cap)
     
-    session.commit()
-    return {"date": today, "items": items}
+    diff = {
+        "added": [it for it in items if it.get("news_id") in added],
+        "changed": [it for it in items if it.get("news_id") in changed],
+        "removed": removed,
+    }
+    try:
+        _store_derived(session, today, items, items_json, fingerprints)
+        version = record_capsule_version(session, today, items, items_json, diff)
+        session.commit()
+    except IntegrityError:
+        # A writer outside the lease stored today's capsule first; keep the single row
+        session.rollback()
+        row = session.exec(select(Capsule).where(Capsule.date == today)).one()
+        row.items_json = items_json
+        session.add(row)
+        _store_derived(session, today, items, items_json, fingerprints)
+        version = record_capsule_version(session, today, items, items_json, diff)
+        session.commit()
+    publish(
+        CAPSULE_CHANNEL,
+        "capsule-version",
+        {
+            "date": today,
+            "version": version,
+            "item_count": len(items),
+            "added": [{"news_id": it.get("news_id"), "title": it.get("title")} for it in diff["added"]],
+            "changed": len(diff["changed"]),
+            "removed": len(diff["removed"]),
+        },
+    )
+    return {"date": today, "items": items, "degraded": degraded}
 
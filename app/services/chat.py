@@ -3,7 +3,7 @@ import httpx
 from sqlmodel import Session, select
 from ..models.content import PyqQuestion, NewsItem
 from ..models.chat import ChatMessage
-from .semantic import tfidf_similarity
+from .semantic import cached_index, top_k_similar
 
 
 def get_pyq_answer(session: Session, question_id: int) -> Optional[Dict]:
@@ -82,15 +82,20 @@ def _build_context_from_history(history: List[ChatMessage]) -> str:
 
 def _retrieve_relevant_facts(session: Session, question: str, top_k: int = 3):
     news = session.exec(select(NewsItem)).all() or []
+    # Indexes are rebuilt only when the stored news / PYQs change
     corpus = [f"{n.title} {n.summary or ''} {n.content or ''}" for n in news]
-    ranked = tfidf_similarity(question, corpus)[:top_k]
+    index = cached_index("chat-news", tuple(zip((n.id for n in news), corpus)), lambda: (range(len(news)), corpus))
+    ranked = top_k_similar(question, index, top_k)
     facts = []
     for idx, score in ranked:
         n = news[idx]
         facts.append({"title": n.title, "summary": (n.summary or n.content or "")[:300], "url": n.url, "score": float(score)})
     pyqs_all = session.exec(select(PyqQuestion)).all() or []
     pyq_corpus = [f"{p.paper} {p.year} {p.question} {p.keywords or ''}" for p in pyqs_all]
-    pyq_ranked = tfidf_similarity(question, pyq_corpus)[:top_k]
+    pyq_index = cached_index(
+        "chat-pyq", tuple(zip((p.id for p in pyqs_all), pyq_corpus)), lambda: (range(len(pyqs_all)), pyq_corpus)
+    )
+    pyq_ranked = top_k_similar(question, pyq_index, top_k)
     pyqs = []
     for idx, score in pyq_ranked:
         p = pyqs_all[idx]
@@ -35,9 +35,9 @@ def extract_with_trafilatura(url: str, html: Optional[str]) -> Optional[str]:
     return None
 
 
-def extract_article_text(url: str) -> Optional[str]:
+def extract_article_text(url: str, timeout: float = 10.0) -> Optional[str]:
     """Attempt to extract the main article text for a URL. Returns None on failure."""
-    html = fetch_html(url)
+    html = fetch_html(url, timeout=timeout)
     # Try robust extractor
     text = extract_with_trafilatura(url, html)
     if text and len(text) > 300:
@@ -0,0 +1,134 @@
+import hashlib
+import random
+import threading
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+from .semantic import SimilarityIndex, rank_top_k
+
+NEIGHBOURS = 8  # nearest syllabus topics kept per topic
+SAME_PAPER_BONUS = 0.1  # similarity credit for sharing the correct option's paper
+DEFAULT_RATE = 0.25  # sampling weight of an option without pick statistics
+
+
+def topic_option(paper: str, topic: str) -> str:
+    p = (paper or "GS").strip()
+    t = (topic or "Syllabus").strip()
+    return f"{p}: {t}"
+
+
+def _paper_of(option: str) -> str:
+    return option.split(":", 1)[0].strip()
+
+
+@dataclass(frozen=True)
+class DistractorPools:
+    """Plausible wrong options per syllabus topic, precomputed once per syllabus version.
+
+    neighbours holds each topic's nearest other topics (tf-idf over paper,
+    topic and keywords, same paper preferred); by_paper covers correct
+    options that are not syllabus topics themselves.
+    """
+
+    options: Tuple[str, ...]
+    neighbours: Dict[str, Tuple[str, ...]]
+    by_paper: Dict[str, Tuple[str, ...]]
+
+    def candidates(self, correct: str) -> Tuple[str, ...]:
+        near = self.neighbours.get(correct)
+        if near is not None:
+            return near
+        return self.by_paper.get(_paper_of(correct)) or self.options
+
+    def pick(
+        self, correct: str, rng: random.Random, k: int = 3, rates: Optional[Dict[str, float]] = None
+    ) -> List[str]:
+        """k distinct distractors sampled from the correct option's pool, weighted by pick rate."""
+        pool = [o for o in self.candidates(correct) if o != correct]
+        if len(pool) < k:
+            pool += [o for o in self.options if o != correct and o not in pool][: k - len(pool)]
+        # Weighted sampling without replacement (Efraimidis-Spirakis keys)
+        keyed = []
+        for o in pool:
+            w = max((rates or {}).get(o, DEFAULT_RATE), 1e-6)
+            keyed.append((rng.random() ** (1.0 / w), o))
+        keyed.sort(reverse=True)
+        return [o for _, o in keyed[:k]]
+
+
+def build_pools(topics: Sequence[Dict[str, str]]) -> DistractorPools:
+    docs: Dict[str, List[str]] = {}
+    for t in topics:
+        option = topic_option(t.get("paper", "GS"), t.get("topic", ""))
+        docs.setdefault(option, []).append(f"{t.get('paper', '')} {t.get('topic', '')} {t.get('keywords') or ''}")
+    options = tuple(docs)
+    texts = [" ".join(parts) for parts in docs.values()]
+    papers = [_paper_of(o) for o in options]
+    by_paper: Dict[str, List[str]] = {}
+    for o, p in zip(options, papers):
+        by_paper.setdefault(p, []).append(o)
+    index = SimilarityIndex(texts)
+    neighbours: Dict[str, Tuple[str, ...]] = {}
+    for i, option in enumerate(options):
+        scores = index.scores(texts[i])
+        adjusted = [
+            -1.0 if j == i else float(s) + (SAME_PAPER_BONUS if papers[j] == papers[i] else 0.0)
+            for j, s in enumerate(scores)
+        ]
+        neighbours[option] = tuple(options[j] for j, _ in rank_top_k(adjusted, NEIGHBOURS, min_score=-1.0))
+    return DistractorPools(options, neighbours, {p: tuple(os) for p, os in by_paper.items()})
+
+
+_cache: Optional[Tuple[object, DistractorPools]] = None
+_cache_lock = threading.Lock()
+
+
+def _pools_key(topics: Sequence[Dict[str, str]]) -> tuple:
+    return tuple((t.get("paper", ""), t.get("topic", ""), t.get("keywords") or "") for t in topics)
+
+
+def paper_pools(topics: Sequence[Dict[str, str]]) -> DistractorPools:
+    """Pools without topic neighbours (same-paper options only); linear in the syllabus size."""
+    by_paper: Dict[str, List[str]] = {}
+    for t in topics:
+        option = topic_option(t.get("paper", "GS"), t.get("topic", ""))
+        options = by_paper.setdefault(_paper_of(option), [])
+        if option not in options:
+            options.append(option)
+    options = tuple(dict.fromkeys(o for os in by_paper.values() for o in os))
+    return DistractorPools(options, {}, {p: tuple(os) for p, os in by_paper.items()})
+
+
+def refresh_distractor_pools(topics: Sequence[Dict[str, str]]) -> DistractorPools:
+    """Build the pools for this syllabus unless they are already current.
+
+    Quadratic in the syllabus size, so it runs at startup and in the scheduler
+    jobs, never on the request path.
+    """
+    global _cache
+    key = _pools_key(topics)
+    with _cache_lock:
+        if _cache and _cache[0] == key:
+            return _cache[1]
+    pools = build_pools(topics)
+    with _cache_lock:
+        _cache = (key, pools)
+    return pools
+
+
+def distractor_pools(topics: Sequence[Dict[str, str]]) -> DistractorPools:
+    """The pools last built by refresh_distractor_pools, without building any.
+
+    A changed syllabus keeps using the previous pools until the next refresh;
+    before the first one, options come from the correct option's paper.
+    """
+    with _cache_lock:
+        cached = _cache
+    if cached:
+        return cached[1]
+    return paper_pools(topics)
+
+
+def seeded_rng(*parts: object) -> random.Random:
+    """Deterministic generator for one question (same capsule item -> same options)."""
+    digest = hashlib.blake2b(":".join(str(p) for p in parts).encode(), digest_size=8).digest()
+    return random.Random(int.from_bytes(digest, "big"))
@@ -0,0 +1,189 @@
+import asyncio
+import json
+import logging
+import threading
+import uuid
+from collections import deque
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+CAPSULE_CHANNEL = "capsule"
+
+
+@dataclass
+class Event:
+    id: str
+    event: str
+    data: Dict[str, Any]
+
+    def to_sse(self) -> str:
+        return f"id: {self.id}\nevent: {self.event}\ndata: {json.dumps(self.data, separators=(',', ':'))}\n\n"
+
+
+class InMemoryBroker:
+    """Single-process pub/sub with a replay buffer for Last-Event-ID resume.
+
+    publish() may be called from worker threads; waiting SSE handlers are
+    woken on their own event loops, so an idle client holds no thread.
+    Event ids are "<boot>-<seq>": an id from before a restart (or one this
+    process never issued) is detected instead of being compared as a number.
+    """
+
+    def __init__(self, buffer_size: int = 256):
+        self._buffers: Dict[str, deque] = {}
+        self._buffer_size = buffer_size
+        self._boot = uuid.uuid4().hex[:12]
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._waiters: Dict[str, set] = {}
+
+    def publish(self, channel: str, event: str, data: Dict[str, Any]) -> str:
+        with self._lock:
+            self._seq += 1
+            ev = Event(f"{self._boot}-{self._seq}", event, data)
+            self._buffers.setdefault(channel, deque(maxlen=self._buffer_size)).append(ev)
+            waiters = list(self._waiters.get(channel, ()))
+        for loop, flag in waiters:
+            try:
+                loop.call_soon_threadsafe(flag.set)
+            except RuntimeError:
+                pass  # loop already closed
+        return ev.id
+
+    def _seq_of(self, event_id: str) -> Optional[int]:
+        """Sequence number of an id issued by this process ("0" is the start), else None."""
+        if event_id == "0":
+            return 0
+        boot, _, seq = event_id.rpartition("-")
+        if boot != self._boot or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def since(self, channel: str, last_id: Optional[str]) -> Optional[List[Event]]:
+        """Events after last_id; None when last_id fell out of the replay buffer,
+        comes from another boot of the process, or is ahead of the newest event."""
+        if not last_id:
+            return []
+        with self._lock:
+            buf = list(self._buffers.get(channel, ()))
+            newest = self._seq
+        last = self._seq_of(last_id)
+        if last is None or last > newest:
+            return None
+        if buf and last < self._seq_of(buf[0].id) - 1:
+            return None
+        return [e for e in buf if self._seq_of(e.id) > last]
+
+    async def wait(self, channel: str, last_id: Optional[str], timeout: float) -> Optional[List[Event]]:
+        """Events after last_id, waiting up to `timeout` for one; None as in since()."""
+        events = self.since(channel, last_id)
+        if events is None or events:
+            return events
+        flag = asyncio.Event()
+        waiter = (asyncio.get_running_loop(), flag)
+        with self._lock:
+            self._waiters.setdefault(channel, set()).add(waiter)
+        try:
+            # Re-check after registering so a publish in between is not missed
+            events = self.since(channel, last_id)
+            if events is not None and not events:
+                try:
+                    await asyncio.wait_for(flag.wait(), timeout)
+                except asyncio.TimeoutError:
+                    return []
+                events = self.since(channel, last_id)
+            return events
+        finally:
+            with self._lock:
+                self._waiters.get(channel, set()).discard(waiter)
+
+    def latest_id(self, channel: str) -> Optional[str]:
+        with self._lock:
+            buf = self._buffers.get(channel)
+            return buf[-1].id if buf else None
+
+
+class RedisBroker:
+    """Cross-process pub/sub on Redis streams (XADD/XREAD); stream ids double as SSE ids."""
+
+    def __init__(self, url: str, maxlen: int = 1000):
+        import redis  # type: ignore
+
+        self._url = url
+        self._client = redis.Redis.from_url(url, decode_responses=True)
+        self._async = None  # redis.asyncio client, created on the serving loop
+        self._maxlen = maxlen
+
+    @staticmethod
+    def _key(channel: str) -> str:
+        return f"civicbriefs:events:{channel}"
+
+    @staticmethod
+    def _event(entry_id: str, fields: Dict[str, str]) -> Event:
+        return Event(entry_id, fields.get("event", "message"), json.loads(fields.get("data") or "{}"))
+
+    def publish(self, channel: str, event: str, data: Dict[str, Any]) -> str:
+        return self._client.xadd(
+            self._key(channel), {"event": event, "data": json.dumps(data)}, maxlen=self._maxlen, approximate=True
+        )
+
+    def since(self, channel: str, last_id: Optional[str]) -> Optional[List[Event]]:
+        if not last_id:
+            return []
+        key = self._key(channel)
+        first = self._client.xrange(key, count=1)
+        if first and _stream_id_lt(last_id, first[0][0]):
+            return None
+        return [self._event(i, f) for i, f in self._client.xrange(key, min=f"({last_id}", max="+")]
+
+    async def wait(self, channel: str, last_id: Optional[str], timeout: float) -> List[Event]:
+        if self._async is None:
+            import redis.asyncio as aioredis  # type: ignore
+
+            self._async = aioredis.Redis.from_url(self._url, decode_responses=True)
+        # Blocking XREAD on the async client: an idle subscriber holds no thread
+        resp = await self._async.xread({self._key(channel): last_id or "$"}, block=max(1, int(timeout * 1000)))
+        return [self._event(i, f) for _, entries in (resp or []) for i, f in entries]
+
+    def latest_id(self, channel: str) -> Optional[str]:
+        last = self._client.xrevrange(self._key(channel), count=1)
+        return last[0][0] if last else None
+
+
+def _stream_id_lt(a: str, b: str) -> bool:
+    try:
+        return tuple(int(x) for x in a.split("-")) < tuple(int(x) for x in b.split("-"))
+    except ValueError:
+        return True
+
+
+_broker = None
+_broker_lock = threading.Lock()
+
+
+def get_broker():
+    """Process-wide broker: Redis when EVENTS_BACKEND=redis, otherwise in-memory."""
+    global _broker
+    if _broker is None:
+        with _broker_lock:
+            if _broker is None:
+                settings = get_settings()
+                if settings.events_backend == "redis":
+                    try:
+                        _broker = RedisBroker(settings.redis_url)
+                    except Exception as exc:
+                        logger.warning("Redis event broker unavailable (%s); using in-memory broker", exc)
+                if _broker is None:
+                    _broker = InMemoryBroker()
+    return _broker
+
+
+def publish(channel: str, event: str, data: Dict[str, Any]) -> None:
+    """Fire-and-forget publish; delivery problems never fail the caller."""
+    try:
+        get_broker().publish(channel, event, data)
+    except Exception as exc:
+        logger.warning("Event publish failed on %s: %s", channel, exc)
@@ -0,0 +1,140 @@
+import json
+import math
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional
+from sqlalchemy import bindparam, insert, update
+from sqlalchemy.engine import Connection
+from sqlmodel import Session, select
+from ..core.db import ensure_schema
+from ..models.tests import DistractorStats, GeneratedTest, QuestionStats
+
+DISTRACTOR_PRIOR = 4.0  # pseudo-showings behind the prior pick rate of an option
+DISTRACTOR_PRIOR_RATE = 0.25  # an unseen distractor counts as picked at chance (4 options)
+
+
+def point_biserial(attempts: int, correct: int, score_sum: float, score_sq_sum: float, correct_score_sum: float) -> Optional[float]:
+    """Correlation between getting the item right and the quiz score, from running sums."""
+    if attempts < 2 or correct in (0, attempts):
+        return None
+    mean = score_sum / attempts
+    var = score_sq_sum / attempts - mean * mean
+    if var <= 1e-12:
+        return None
+    p = correct / attempts
+    mean_right = correct_score_sum / correct
+    mean_wrong = (score_sum - correct_score_sum) / (attempts - correct)
+    return (mean_right - mean_wrong) / math.sqrt(var) * math.sqrt(p * (1 - p))
+
+
+def _ensure_rows(conn: Connection, model, key_cols: List[str], keys: Iterable[tuple]) -> None:
+    keys = set(keys)
+    if not keys:
+        return
+    cols = [getattr(model, c) for c in key_cols]
+    first = {k[0] for k in keys}
+    existing = {tuple(r) for r in conn.execute(select(*cols).where(cols[0].in_(first))).all()}
+    missing = [dict(zip(key_cols, k)) for k in keys if k not in existing]
+    if missing:
+        conn.execute(insert(model), missing)
+
+
+def apply_response_batch(conn: Connection, rows: List[Dict[str, Any]]) -> None:
+    """Fold a batch of QuizResponse rows into the item and distractor counters (inside the caller's transaction).
+
+    Every row of a submission arrives in the same batch, so each attempt's
+    quiz score is known here.
+    """
+    if not rows:
+        return
+    by_result: Dict[int, List[Dict[str, Any]]] = defaultdict(list)
+    for r in rows:
+        by_result[r["result_id"]].append(r)
+    test_ids = {r["test_id"] for r in rows}
+    options: Dict[int, List[List[str]]] = {}
+    answers: Dict[int, List[int]] = {}
+    for test_id, questions_json in conn.execute(
+        select(GeneratedTest.id, GeneratedTest.questions_json).where(GeneratedTest.id.in_(test_ids))
+    ).all():
+        questions = json.loads(questions_json or "[]")
+        options[test_id] = [[str(o) for o in q.get("options", [])] for q in questions]
+        answers[test_id] = [int(q.get("answer_index", 0)) for q in questions]
+
+    items: Dict[tuple, List[float]] = defaultdict(lambda: [0, 0, 0.0, 0.0, 0.0])
+    distractors: Dict[str, List[int]] = defaultdict(lambda: [0, 0])
+    for result_rows in by_result.values():
+        score = sum(1 for r in result_rows if r["ok"]) / len(result_rows)
+        for r in result_rows:
+            acc = items[(r["test_id"], r["question"])]
+            acc[0] += 1
+            acc[2] += score
+            acc[3] += score * score
+            if r["ok"]:
+                acc[1] += 1
+                acc[4] += score
+            opts = options.get(r["test_id"], [])
+            if r["question"] >= len(opts):
+                continue
+            ai = answers[r["test_id"]][r["question"]]
+            for j, text in enumerate(opts[r["question"]]):
+                if j != ai:
+                    d = distractors[text]
+                    d[0] += 1
+                    d[1] += int(r["chosen"] == j)
+
+    _ensure_rows(conn, QuestionStats, ["test_id", "question"], items)
+    conn.execute(
+        update(QuestionStats)
+        .where(QuestionStats.test_id == bindparam("k_test"), QuestionStats.question == bindparam("k_question"))
+        .values(
+            attempts=QuestionStats.attempts + bindparam("d_attempts"),
+            correct=QuestionStats.correct + bindparam("d_correct"),
+            score_sum=QuestionStats.score_sum + bindparam("d_sum"),
+            score_sq_sum=QuestionStats.score_sq_sum + bindparam("d_sq"),
+            correct_score_sum=QuestionStats.correct_score_sum + bindparam("d_correct_sum"),
+        ),
+        [
+            {"k_test": t, "k_question": q, "d_attempts": a[0], "d_correct": a[1], "d_sum": a[2], "d_sq": a[3], "d_correct_sum": a[4]}
+            for (t, q), a in items.items()
+        ],
+    )
+    if distractors:
+        _ensure_rows(conn, DistractorStats, ["option"], ((o,) for o in distractors))
+        conn.execute(
+            update(DistractorStats)
+            .where(DistractorStats.option == bindparam("k_option"))
+            .values(shown=DistractorStats.shown + bindparam("d_shown"), picked=DistractorStats.picked + bindparam("d_picked")),
+            [{"k_option": o, "d_shown": d[0], "d_picked": d[1]} for o, d in distractors.items()],
+        )
+
+
+def distractor_rates(session: Session, options: Iterable[str]) -> Dict[str, float]:
+    """Smoothed pick rate of each option when shown as a wrong answer (unseen ones get the prior)."""
+    ensure_schema()
+    options = list(dict.fromkeys(options))
+    if not options:
+        return {}
+    rows = session.exec(select(DistractorStats).where(DistractorStats.option.in_(options))).all()
+    seen = {d.option: d for d in rows}
+    rates: Dict[str, float] = {}
+    for o in options:
+        d = seen.get(o)
+        shown, picked = (d.shown, d.picked) if d else (0, 0)
+        rates[o] = (picked + DISTRACTOR_PRIOR * DISTRACTOR_PRIOR_RATE) / (shown + DISTRACTOR_PRIOR)
+    return rates
+
+
+def item_analysis(session: Session, test_id: int) -> List[Dict[str, Any]]:
+    """Difficulty (share correct) and point-biserial discrimination per question, from the counters."""
+    ensure_schema()
+    rows = session.exec(select(QuestionStats).where(QuestionStats.test_id == test_id).order_by(QuestionStats.question)).all()
+    out = []
+    for s in rows:
+        r_pb = point_biserial(s.attempts, s.correct, s.score_sum, s.score_sq_sum, s.correct_score_sum)
+        out.append({
+            "question": s.question,
+            "attempts": s.attempts,
+            "correct": s.correct,
+            "difficulty": round(s.correct / s.attempts, 4) if s.attempts else None,
+            "discrimination": round(r_pb, 4) if r_pb is not None else None,
+        })
+    return out
@@ -0,0 +1,103 @@
+import re
+import threading
+from typing import Dict, Iterable, List, Mapping, Sequence, Tuple
+
+
+_WORD_CHAR = re.compile(r"\w")
+
+
+def _normalize(keyword: str) -> str:
+    return " ".join(keyword.lower().split())
+
+
+def _bounded_spans(text: str) -> Iterable[str]:
+    """Substrings of `text` with no word character right before or after them (word-bounded spans)."""
+    starts = [i for i in range(len(text)) if i == 0 or not _WORD_CHAR.match(text[i - 1])]
+    ends = [j for j in range(1, len(text) + 1) if j == len(text) or not _WORD_CHAR.match(text[j])]
+    for i in starts:
+        for j in ends:
+            if j > i:
+                yield text[i:j]
+
+
+class KeywordMatcher:
+    """Tags text with labels in one regex pass over word-bounded keywords.
+
+    All keywords are compiled into a single alternation (longest first), so
+    "trade" no longer fires inside "trademark". Simple plurals still match
+    ("rights" for "right"). Matching is tried at every word start, so
+    overlapping keywords all fire, and a long phrase also credits shorter
+    keywords it contains ("fundamental rights" tags both its own label and
+    "rights"'s).
+    """
+
+    def __init__(self, table: Mapping[str, Iterable[str]]):
+        self.labels_order: List[str] = list(table)
+        by_keyword: Dict[str, set] = {}
+        for label, keywords in table.items():
+            for kw in keywords:
+                kw = _normalize(kw)
+                if kw:
+                    by_keyword.setdefault(kw, set()).add(label)
+        # Credit labels of keywords nested inside longer phrases: look up each
+        # word-bounded span of a keyword instead of searching it for every other one
+        self._labels: Dict[str, frozenset] = {}
+        for kw, labels in by_keyword.items():
+            nested = set(labels)
+            for other in _bounded_spans(kw):
+                if other != kw and other in by_keyword:
+                    nested |= by_keyword[other]
+            self._labels[kw] = frozenset(nested)
+        if by_keyword:
+            alternation = "|".join(
+                re.escape(kw).replace(r"\ ", r"\s+") for kw in sorted(by_keyword, key=len, reverse=True)
+            )
+            # Zero-width lookahead: one match per word-bounded start, so keywords
+            # sharing words ("climate change" / "change policy") are all found
+            self._pattern = re.compile(rf"(?<!\w)(?=({alternation})(?:e?s)?(?!\w))", re.IGNORECASE)
+        else:
+            self._pattern = None
+
+    def tags(self, text: str) -> set:
+        found: set = set()
+        if not text or self._pattern is None:
+            return found
+        for m in self._pattern.finditer(text):
+            found |= self._labels.get(_normalize(m.group(1)), frozenset())
+        return found
+
+    def labels(self, text: str) -> List[str]:
+        """Matched labels in table order."""
+        found = self.tags(text)
+        return [label for label in self.labels_order if label in found]
+
+
+_cache: Dict[str, Tuple[object, KeywordMatcher]] = {}
+_cache_lock = threading.Lock()
+
+
+def cached_matcher(name: str, key: object, table_factory) -> KeywordMatcher:
+    """Matcher for `name`, recompiled only when `key` (a hashable snapshot of its inputs) changes."""
+    with _cache_lock:
+        entry = _cache.get(name)
+        if entry and entry[0] == key:
+            return entry[1]
+    matcher = KeywordMatcher(table_factory())
+    with _cache_lock:
+        _cache[name] = (key, matcher)
+    return matcher
+
+
+def syllabus_matcher(syllabus: Sequence) -> KeywordMatcher:
+    """Topic-name + comma-separated keyword matcher over SyllabusTopic rows."""
+    key = tuple((t.id, t.topic or "", t.keywords or "") for t in syllabus)
+
+    def table() -> Dict[str, List[str]]:
+        out: Dict[str, List[str]] = {}
+        for t in syllabus:
+            if not t.topic:
+                continue
+            out.setdefault(t.topic, []).extend([t.topic] + (t.keywords or "").split(","))
+        return out
+
+    return cached_matcher("syllabus", key, table)
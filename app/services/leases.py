@@ -0,0 +1,45 @@
+import uuid
+from datetime import datetime, timedelta
+from typing import Optional
+from sqlalchemy import delete, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session
+from ..core.db import engine, ensure_schema
+from ..models.lease import BuildLease
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="seconds")
+
+
+def acquire_lease(key: str, ttl_seconds: int) -> Optional[str]:
+    """Try to become the single owner of `key` across processes.
+
+    Returns an owner token on success, or None while another live owner
+    holds it. Expired leases (owner crashed) are taken over.
+    """
+    ensure_schema()
+    token = uuid.uuid4().hex
+    now = datetime.now()
+    expires = _iso(now + timedelta(seconds=ttl_seconds))
+    with Session(engine) as session:
+        try:
+            session.add(BuildLease(key=key, owner=token, expires_at=expires))
+            session.commit()
+            return token
+        except IntegrityError:
+            session.rollback()
+        taken = session.exec(
+            update(BuildLease)
+            .where(BuildLease.key == key, BuildLease.expires_at < _iso(now))
+            .values(owner=token, expires_at=expires)
+        )
+        session.commit()
+        return token if taken.rowcount == 1 else None
+
+
+def release_lease(key: str, token: str) -> None:
+    with Session(engine) as session:
+        session.exec(delete(BuildLease).where(BuildLease.key == key, BuildLease.owner == token))
+        session.commit()
+
@@ -1,8 +1,10 @@
+from functools import lru_cache
 from typing import List, Dict
 from sqlmodel import Session, select
 from sqlalchemy import delete
 from ..models.content import NewsItem, SyllabusTopic, Mapping, PyqQuestion
-from .semantic import tfidf_similarity
+from .keywords import KeywordMatcher
+from .semantic import SimilarityIndex, cached_index, rank_top_k, top_k_similar
 from .summarizer import summarize_text
 
 
@@ -11,7 +13,7 @@ def map_news_to_syllabus(session: Session) -> int:
     topics = session.exec(select(SyllabusTopic)).all()
     if not news or not topics:
         return 0
-    topic_corpus = [f"{t.paper} {t.topic} {t.keywords or ''}" for t in topics]
+    topic_index = SimilarityIndex([f"{t.paper} {t.topic} {t.keywords or ''}" for t in topics])
     created = 0
     for n in news:
         if not n.summary:
@@ -25,7 +27,7 @@ def map_news_to_syllabus(session: Session) -> int:
                 session.commit()
         except Exception:
             pass
-        ranked = tfidf_similarity(f"{n.title} {n.summary}", topic_corpus)[:5]
+        ranked = top_k_similar(f"{n.title} {n.summary}", topic_index, 5)
         # Insert top unique topics above a small threshold
         inserted = 0
         seen_topics: set = set()
@@ -46,28 +48,37 @@ def map_news_to_syllabus(session: Session) -> int:
     return created
 
 
+# Simple keyword extraction based on common UPSC topics
+UPSC_KEYWORDS = {
+    'governance': ['government', 'policy', 'administration', 'bureaucracy', 'civil service'],
+    'economy': ['economic', 'gdp', 'inflation', 'fiscal', 'monetary', 'trade', 'investment'],
+    'international': ['foreign', 'diplomatic', 'bilateral', 'multilateral', 'treaty', 'agreement'],
+    'security': ['defense', 'military', 'border', 'terrorism', 'cyber', 'national security'],
+    'environment': ['climate', 'environment', 'pollution', 'renewable', 'biodiversity', 'conservation'],
+    'social': ['education', 'health', 'poverty', 'inequality', 'welfare', 'rights'],
+    'technology': ['digital', 'artificial intelligence', 'technology', 'innovation', 'startup'],
+    'constitution': ['constitutional', 'fundamental rights', 'duties', 'amendment', 'judiciary']
+}
+_UPSC_MATCHER = KeywordMatcher(UPSC_KEYWORDS)
+
+
+@lru_cache(maxsize=4096)
+def _key_entities(text: str) -> tuple:
+    return tuple(_UPSC_MATCHER.labels(text))
+
+
 def extract_key_entities(text: str) -> List[str]:
     """Extract key entities and topics from news text"""
-    # Simple keyword extraction based on common UPSC topics
-    upsc_keywords = {
-        'governance': ['government', 'policy', 'administration', 'bureaucracy', 'civil service'],
-        'economy': ['economic', 'gdp', 'inflation', 'fiscal', 'monetary', 'trade', 'investment'],
-        'international': ['foreign', 'diplomatic', 'bilateral', 'multilateral', 'treaty', 'agreement'],
-        'security': ['defense', 'military', 'border', 'terrorism', 'cyber', 'national security'],
-        'environment': ['climate', 'environment', 'pollution', 'renewable', 'biodiversity', 'conservation'],
-        'social': ['education', 'health', 'poverty', 'inequality', 'welfare', 'rights'],
-        'technology': ['digital', 'artificial intelligence', 'technology', 'innovation', 'startup'],
-        'constitution': ['constitutional', 'fundamental rights', 'duties', 'amendment', 'judiciary']
-    }
-    
-    text_lower = text.lower()
-    found_topics = []
-    
-    for topic, keywords in upsc_keywords.items():
-        if any(keyword in text_lower for keyword in keywords):
-            found_topics.append(topic)
-    
-    return found_topics
+    # PYQ texts repeat for every capsule item, so their tags come from the cache
+    return list(_key_entities(text or ""))
+
+def pyq_index(session: Session) -> SimilarityIndex:
+    """Question + keywords index over every PYQ (ids are PYQ ids), rebuilt only when a PYQ changes."""
+    rows = tuple(
+        session.exec(select(PyqQuestion.id, PyqQuestion.question, PyqQuestion.keywords).order_by(PyqQuestion.id)).all()
+    )
+    return cached_index("pyq", rows, lambda: ([r[0] for r in rows], [f"{q} {k or ''}" for _, q, k in rows]))
+
 
 def find_related_pyqs(session: Session, text: str, top_k: int = 3) -> List[Dict]:
     pyqs = session.exec(select(PyqQuestion)).all()
@@ -77,43 +88,39 @@ def find_related_pyqs(session: Session, text: str, top_k: int = 3) -> List[Dict]
     # Extract key topics from news
     news_topics = extract_key_entities(text)
     
-    # Enhanced matching with topic relevance
-    scored_pyqs = []
+    # Base similarity of each PYQ on its own against the news text, in one pass
+    index = pyq_index(session)
+    pair = index.pair_scores(text)
+    base_scores = [pair[index.positions[p.id]] if p.id in index.positions else 0.0 for p in pyqs]
     
-    for p in pyqs:
-        # Base similarity score
-        question_text = f"{p.question} {p.keywords or ''}"
-        base_scores = tfidf_similarity(text, [question_text])
-        base_score = base_scores[0][1] if base_scores else 0.0
-        
+    # Enhanced matching with topic relevance
+    final_scores = []
+    matched = []
+    for p, base_score in zip(pyqs, base_scores):
         # Topic relevance bonus
         topic_bonus = 0.0
         pyq_topics = extract_key_entities(p.question + ' ' + (p.keywords or ''))
         common_topics = set(news_topics) & set(pyq_topics)
         if common_topics:
             topic_bonus = len(common_topics) * 0.2  # Bonus for topic match
-        
-        final_score = base_score + topic_bonus
-        
-        scored_pyqs.append({
-            "id": p.id,
-            "year": p.year,
-            "paper": p.paper,
-            "question": p.question,
-            "score": float(final_score),
-            "topics_matched": list(common_topics)
-        })
-    
-    # Sort by score and return top matches
-    scored_pyqs.sort(key=lambda x: x['score'], reverse=True)
+        final_scores.append(float(base_score) + topic_bonus)
+        matched.append(common_topics)
     
     # Filter out very low scores (< 0.05)
-    relevant_pyqs = [p for p in scored_pyqs if p['score'] > 0.05][:top_k]
-    
+    ranked = rank_top_k(final_scores, top_k, min_score=0.05)
+    low_confidence = not ranked
     # If no relevant matches, return top 3 with warning
-    if not relevant_pyqs:
-        relevant_pyqs = scored_pyqs[:top_k]
-        for p in relevant_pyqs:
-            p['score'] = 0.01  # Low confidence score
+    if low_confidence:
+        ranked = rank_top_k(final_scores, top_k)
     
-    return relevant_pyqs
+    return [
+        {
+            "id": pyqs[i].id,
+            "year": pyqs[i].year,
+            "paper": pyqs[i].paper,
+            "question": pyqs[i].question,
+            "score": 0.01 if low_confidence else score,  # Low confidence score
+            "topics_matched": list(matched[i])
+        }
+        for i, score in ranked
+    ]
@@ -1,8 +1,22 @@
+import hashlib
+import json
 import smtplib
+import threading
+from collections import OrderedDict
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 from ..core.config import get_settings
+from .smtp_pool import SMTPConnectionPool
+
+def _send_single(msg: MIMEMultipart) -> None:
+    """Deliver one message on its own short-lived connection"""
+    settings = get_settings()
+    with smtplib.SMTP(settings.smtp_server, settings.smtp_port, timeout=settings.smtp_timeout) as server:
+        if settings.smtp_starttls:
+            server.starttls()
+        server.login(settings.smtp_username, settings.smtp_password)
+        server.send_message(msg)
 
 def send_daily_capsule_email(recipient_email: str, capsule_data: Dict[str, Any]) -> bool:
     """Send daily capsule via email"""
@@ -25,18 +39,28 @@ def send_daily_capsule_email(recipient_email: str, capsule_data: Dict[str, Any])
         msg.attach(html_part)
         
         # Send email
-        with smtplib.SMTP(settings.smtp_server, settings.smtp_port) as server:
-            server.starttls()
-            server.login(settings.smtp_username, settings.smtp_password)
-            server.send_message(msg)
+        _send_single(msg)
         
         return True
     except Exception as e:
         print(f"Failed to send email to {recipient_email}: {e}")
         return False
 
-def generate_capsule_html(capsule_data: Dict[str, Any]) -> str:
-    """Generate HTML content for daily capsule"""
+# Rendered item cards keyed by content hash, shared by daily emails and digests
+_ITEMS_HTML_CACHE: "OrderedDict[str, str]" = OrderedDict()
+_ITEMS_HTML_CACHE_SIZE = 32
+_items_html_lock = threading.Lock()
+
+def capsule_items_html(capsule_data: Dict[str, Any]) -> str:
+    """Render the item cards of a capsule, reusing the cached HTML for unchanged content"""
+    items = capsule_data.get('items', [])
+    key = hashlib.sha1(json.dumps(items, sort_keys=True, default=str).encode()).hexdigest()
+    with _items_html_lock:
+        cached = _ITEMS_HTML_CACHE.get(key)
+        if cached is not None:
+            _ITEMS_HTML_CACHE.move_to_end(key)
+            return cached
+
     items_html = ""
     
     for item in capsule_data.get('items', []):
@@ -64,21 +88,84 @@ def generate_capsule_html(capsule_data: Dict[str, Any]) -> str:
         </div>
         """
     
+    with _items_html_lock:
+        _ITEMS_HTML_CACHE[key] = items_html
+        if len(_ITEMS_HTML_CACHE) > _ITEMS_HTML_CACHE_SIZE:
+            _ITEMS_HTML_CACHE.popitem(last=False)
+    return items_html
+
+def generate_capsule_html(capsule_data: Dict[str, Any]) -> str:
+    """Generate HTML content for daily capsule"""
+    return _wrap_email(
+        "Daily UPSC Capsule",
+        capsule_data['date'],
+        "Here's your daily dose of UPSC-relevant news with syllabus mapping and related Previous Year Questions (PYQs):",
+        capsule_items_html(capsule_data),
+    )
+
+def generate_capsule_text(capsule_data: Dict[str, Any]) -> str:
+    """Plain-text alternative of the daily capsule email"""
+    lines = ["CivicBriefs.ai - Daily UPSC Capsule", capsule_data['date'], ""]
+    for n, item in enumerate(capsule_data.get('items', []), 1):
+        lines.append(f"{n}. {item['title']}")
+        lines.append(item.get('summary') or 'No summary available')
+        topics = "; ".join(f"{t['paper']}: {t['topic']}" for t in item.get('topics') or [])
+        if topics:
+            lines.append(f"Syllabus: {topics}")
+        for pyq in (item.get('pyqs') or [])[:3]:
+            lines.append(f"PYQ ({pyq['year']}): {pyq['question']}")
+        lines.append(f"Source: {item['url']}")
+        lines.append("")
+    lines.append("This is an automated email from CivicBriefs.ai")
+    return "\n".join(lines)
+
+def generate_weekly_report_html(report: Dict[str, Any]) -> str:
+    """Weekly highlights email, shared by the scheduler and the admin endpoint"""
+    items = "".join(
+        f"<li><a href='{h.get('url')}'>{h.get('title')}</a> <small>({h.get('date')})</small></li>"
+        for h in report.get("highlights", [])
+    )
+    return (
+        f"<h2>Weekly UPSC Highlights ({report['week_start']} to {report['week_end']})</h2>"
+        f"<p><strong>Tests recorded:</strong> {report['progress']['tests_recorded']} | "
+        f"<strong>Average score:</strong> {report['progress']['average_score']}</p>"
+        f"<ol>{items}</ol>"
+        f"<p>— CivicBriefs.ai</p>"
+    )
+
+def generate_digest_html(capsules: List[Dict[str, Any]]) -> str:
+    """Merge several capsules (newest first) into a single digest email"""
+    sections = ""
+    for capsule_data in capsules:
+        sections += f"""
+        <h2 style="color: #666; border-bottom: 2px solid #2c5aa0; padding-bottom: 4px;">{capsule_data['date']}</h2>
+        {capsule_items_html(capsule_data)}
+        """
+    dates = [c['date'] for c in capsules]
+    period = f"{min(dates)} to {max(dates)}" if dates else ""
+    return _wrap_email(
+        "Missed UPSC Capsules",
+        period,
+        "Welcome aboard! Here are the daily capsules you missed, in one email:",
+        sections,
+    )
+
+def _wrap_email(title: str, subtitle: str, intro: str, body_html: str) -> str:
     return f"""
     <!DOCTYPE html>
     <html>
     <head>
         <meta charset="utf-8">
-        <title>Daily UPSC Capsule</title>
+        <title>{title}</title>
     </head>
     <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333; max-width: 800px; margin: 0 auto; padding: 20px;">
-        <h1 style="color: #2c5aa0; text-align: center;">CivicBriefs.ai - Daily UPSC Capsule</h1>
-        <h2 style="color: #666; text-align: center;">{capsule_data['date']}</h2>
+        <h1 style="color: #2c5aa0; text-align: center;">CivicBriefs.ai - {title}</h1>
+        <h2 style="color: #666; text-align: center;">{subtitle}</h2>
         
         <p>Dear UPSC Aspirant,</p>
-        <p>Here's your daily dose of UPSC-relevant news with syllabus mapping and related Previous Year Questions (PYQs):</p>
+        <p>{intro}</p>
         
-        {items_html}
+        {body_html}
         
         <hr style="margin: 30px 0;">
         <p style="text-align: center; color: #666; font-size: 12px;">
@@ -89,17 +176,38 @@ def generate_capsule_html(capsule_data: Dict[str, Any]) -> str:
     </html>
     """
 
+def build_html_message(
+    recipient_email: str, subject: str, sender: str, html_part: MIMEText, text_part: Optional[MIMEText] = None
+) -> MIMEMultipart:
+    msg = MIMEMultipart('alternative')
+    msg['Subject'] = subject
+    msg['From'] = sender
+    msg['To'] = recipient_email
+    if text_part is not None:
+        msg.attach(text_part)  # alternatives go least preferred first
+    msg.attach(html_part)
+    return msg
+
+def _send_bulk(subscribers: List[str], subject: str, html_content: str) -> Dict[str, int]:
+    """Send one shared HTML body to many recipients over pooled SMTP connections"""
+    pool = SMTPConnectionPool.from_settings()
+    if pool is None:
+        print("SMTP not configured, skipping email")
+        return {"sent": 0, "failed": 0}
+    # Encode the body once; every message shares the same part
+    html_part = MIMEText(html_content, 'html')
+    sender = get_settings().smtp_username
+    messages = (build_html_message(email, subject, sender, html_part) for email in subscribers)
+    with pool:
+        return pool.send_many(messages)
+
 def send_bulk_capsule_emails(subscribers: List[str], capsule_data: Dict[str, Any]) -> Dict[str, int]:
     """Send capsule to multiple subscribers"""
-    results = {"sent": 0, "failed": 0}
-    
-    for email in subscribers:
-        if send_daily_capsule_email(email, capsule_data):
-            results["sent"] += 1
-        else:
-            results["failed"] += 1
-    
-    return results
+    if not subscribers:
+        return {"sent": 0, "failed": 0}
+    # Render once for the whole batch
+    html_content = generate_capsule_html(capsule_data)
+    return _send_bulk(subscribers, f"Daily UPSC Capsule - {capsule_data['date']}", html_content)
 
 def send_password_reset_email(recipient_email: str, reset_link: str) -> bool:
     """Send password reset email"""
@@ -132,10 +240,7 @@ def send_password_reset_email(recipient_email: str, reset_link: str) -> bool:
         html_part = MIMEText(html_content, 'html')
         msg.attach(html_part)
         
-        with smtplib.SMTP(settings.smtp_server, settings.smtp_port) as server:
-            server.starttls()
-            server.login(settings.smtp_username, settings.smtp_password)
-            server.send_message(msg)
+        _send_single(msg)
         
         return True
     except Exception as e:
@@ -145,24 +250,6 @@ def send_password_reset_email(recipient_email: str, reset_link: str) -> bool:
 
 def send_bulk_html_emails(subscribers: List[str], subject: str, html_content: str) -> Dict[str, int]:
     """Generic bulk HTML email sender using the same SMTP settings."""
-    settings = get_settings()
-    results = {"sent": 0, "failed": 0}
-    if not all([settings.smtp_server, settings.smtp_port, settings.smtp_username, settings.smtp_password]):
-        print("SMTP not configured, skipping weekly emails")
-        return results
-    try:
-        for email in subscribers:
-            msg = MIMEMultipart('alternative')
-            msg['Subject'] = subject
-            msg['From'] = settings.smtp_username
-            msg['To'] = email
-            msg.attach(MIMEText(html_content, 'html'))
-            with smtplib.SMTP(settings.smtp_server, settings.smtp_port) as server:
-                server.starttls()
-                server.login(settings.smtp_username, settings.smtp_password)
-                server.send_message(msg)
-            results["sent"] += 1
-    except Exception as e:
-        print(f"Weekly email error: {e}")
-        results["failed"] += 1
-    return results
+    if not subscribers:
+        return {"sent": 0, "failed": 0}
+    return _send_bulk(subscribers, subject, html_content)
@@ -0,0 +1,298 @@
+import logging
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+from email.mime.text import MIMEText
+from sqlalchemy import func, insert, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from ..core.config import get_settings
+from ..core.db import engine, ensure_schema
+from ..models.outbox import EmailCampaign, EmailOutbox
+from .artifacts import get_capsule_artifact, render_capsule_artifacts
+from .notifier import build_html_message
+from .smtp_pool import SMTPConnectionPool
+
+logger = logging.getLogger(__name__)
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="seconds")
+
+
+def enqueue_campaign(
+    session: Session, key: str, subject: str, html: str, recipients: Iterable[str], text: Optional[str] = None
+) -> Dict[str, int]:
+    """Queue one email per recipient for a campaign in a single bulk insert.
+
+    Idempotent per (campaign, recipient): recipients already queued or sent
+    for `key` are skipped, so re-running a pipeline never double-sends.
+    """
+    ensure_schema()
+    campaign = session.exec(select(EmailCampaign).where(EmailCampaign.key == key)).first()
+    if not campaign:
+        try:
+            campaign = EmailCampaign(key=key, subject=subject, html=html, text=text)
+            session.add(campaign)
+            session.commit()
+            session.refresh(campaign)
+        except IntegrityError:
+            # Another process created it first
+            session.rollback()
+            campaign = session.exec(select(EmailCampaign).where(EmailCampaign.key == key)).one()
+    wanted = list(dict.fromkeys(r.strip() for r in recipients if r and r.strip()))
+    for _ in range(2):
+        existing = set(session.exec(select(EmailOutbox.recipient).where(EmailOutbox.campaign_id == campaign.id)).all())
+        now = _iso(datetime.now())
+        rows = [
+            {"campaign_id": campaign.id, "recipient": r, "status": "pending", "attempts": 0, "next_attempt_at": now}
+            for r in wanted
+            if r not in existing
+        ]
+        if not rows:
+            break
+        try:
+            session.exec(insert(EmailOutbox), params=rows)
+            session.commit()
+            break
+        except IntegrityError:
+            # A concurrent enqueue inserted some of the same recipients; diff again
+            session.rollback()
+            rows = []
+    return {"queued": len(rows), "skipped": len(wanted) - len(rows)}
+
+
+def enqueue_capsule(session: Session, capsule: Dict[str, Any], recipients: Iterable[str]) -> Dict[str, int]:
+    """Queue the stored capsule renders; only capsules that were never saved get rendered here."""
+    html = get_capsule_artifact(session, capsule['date'], "html")
+    text = get_capsule_artifact(session, capsule['date'], "text")
+    if html and text:
+        bodies = {"html": html.body, "text": text.body}
+    else:
+        bodies = render_capsule_artifacts(capsule)
+    return enqueue_campaign(
+        session,
+        f"capsule:{capsule['date']}",
+        f"Daily UPSC Capsule - {capsule['date']}",
+        bodies["html"].decode("utf-8"),
+        recipients,
+        text=bodies["text"].decode("utf-8"),
+    )
+
+
+class RateLimiter:
+    """Token bucket shared by all sender workers; rate <= 0 disables limiting."""
+
+    def __init__(self, rate_per_second: float, burst: Optional[float] = None):
+        self.rate = float(rate_per_second)
+        self.burst = float(burst or max(1.0, self.rate))
+        self._tokens = self.burst
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        if self.rate <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.burst, self._tokens + (now - self._last) * self.rate)
+            self._last = now
+            # Reserve a token even if that drives the bucket negative, then wait it out
+            self._tokens -= 1
+            wait = -self._tokens / self.rate if self._tokens < 0 else 0.0
+        if wait > 0:
+            time.sleep(wait)
+
+
+def _recover_stale(session: Session, lease_seconds: int) -> None:
+    """Return rows stuck in 'sending' (worker crashed mid-batch) to the queue."""
+    cutoff = _iso(datetime.now() - timedelta(seconds=lease_seconds))
+    session.exec(
+        update(EmailOutbox)
+        .where(EmailOutbox.status == "sending", EmailOutbox.claimed_at < cutoff)
+        .values(status="pending", claim_token=None)
+    )
+    session.commit()
+
+
+def _claim_batch(session: Session, limit: int) -> list[EmailOutbox]:
+    now = _iso(datetime.now())
+    ids = session.exec(
+        select(EmailOutbox.id)
+        .where(EmailOutbox.status == "pending", EmailOutbox.next_attempt_at <= now)
+        .order_by(EmailOutbox.id)
+        .limit(limit)
+    ).all()
+    if not ids:
+        return []
+    token = uuid.uuid4().hex
+    # Only rows still pending are taken, so concurrent workers never share a row
+    session.exec(
+        update(EmailOutbox)
+        .where(EmailOutbox.id.in_(ids), EmailOutbox.status == "pending")
+        .values(status="sending", claim_token=token, claimed_at=now)
+    )
+    session.commit()
+    return list(session.exec(select(EmailOutbox).where(EmailOutbox.claim_token == token)).all())
+
+
+class _Sender:
+    def __init__(self, pool: SMTPConnectionPool, limiter: RateLimiter, batch_size: int):
+        settings = get_settings()
+        self.pool = pool
+        self.limiter = limiter
+        self.batch_size = batch_size
+        self.sender = settings.smtp_username
+        self.max_attempts = settings.outbox_max_attempts
+        self.retry_base = settings.outbox_retry_base_seconds
+        self.totals = {"sent": 0, "failed": 0, "retrying": 0}
+        self._campaigns: Dict[int, tuple[str, MIMEText, Optional[MIMEText]]] = {}
+        self._lock = threading.Lock()
+
+    def _campaign(self, session: Session, campaign_id: int) -> tuple[str, MIMEText, Optional[MIMEText]]:
+        with self._lock:
+            cached = self._campaigns.get(campaign_id)
+        if cached:
+            return cached
+        c = session.get(EmailCampaign, campaign_id)
+        entry = (
+            c.subject if c else "",
+            MIMEText(c.html if c else "", "html"),
+            MIMEText(c.text, "plain") if c and c.text else None,
+        )
+        with self._lock:
+            self._campaigns[campaign_id] = entry
+        return entry
+
+    def run(self) -> None:
+        with Session(engine) as session:
+            while True:
+                rows = _claim_batch(session, self.batch_size)
+                if not rows:
+                    return
+                counts = {"sent": 0, "failed": 0, "retrying": 0}
+                for row in rows:
+                    subject, html_part, text_part = self._campaign(session, row.campaign_id)
+                    self.limiter.acquire()
+                    result = self.pool.send(build_html_message(row.recipient, subject, self.sender, html_part, text_part))
+                    now = datetime.now()
+                    row.claim_token = None
+                    if result:
+                        row.status = "sent"
+                        row.sent_at = _iso(now)
+                        row.last_error = None
+                        counts["sent"] += 1
+                    else:
+                        row.attempts += 1
+                        row.last_error = f"attempt {row.attempts}: {result.error or 'delivery failed'}"[:1000]
+                        # 5xx is final (unknown mailbox, policy); only 4xx and connection errors are retried
+                        if result.permanent or row.attempts >= self.max_attempts:
+                            row.status = "failed"
+                            counts["failed"] += 1
+                        else:
+                            # Exponential backoff: base, 2*base, 4*base, ...
+                            delay = self.retry_base * (2 ** (row.attempts - 1))
+                            row.status = "pending"
+                            row.next_attempt_at = _iso(now + timedelta(seconds=delay))
+                            counts["retrying"] += 1
+                    session.add(row)
+                session.commit()
+                with self._lock:
+                    for k, v in counts.items():
+                        self.totals[k] += v
+
+
+def drain_outbox(workers: Optional[int] = None, rate_per_second: Optional[float] = None, batch_size: int = 50) -> Dict[str, Any]:
+    """Deliver every due outbox row using concurrent workers; returns delivery counts."""
+    settings = get_settings()
+    workers = max(1, workers or settings.outbox_workers)
+    pool = SMTPConnectionPool.from_settings(size=workers)
+    if pool is None:
+        logger.info("SMTP not configured; outbox left pending")
+        return {"sent": 0, "failed": 0, "retrying": 0, "elapsed": 0.0}
+    ensure_schema()
+    limiter = RateLimiter(settings.outbox_rate_per_second if rate_per_second is None else rate_per_second)
+    with Session(engine) as session:
+        _recover_stale(session, settings.outbox_lease_seconds)
+    start = time.perf_counter()
+    sender = _Sender(pool, limiter, batch_size)
+    threads = [threading.Thread(target=sender.run, name=f"outbox-{i}") for i in range(workers)]
+    with pool:
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    elapsed = time.perf_counter() - start
+    if any(sender.totals.values()):
+        logger.info("Outbox drained in %.1fs: %s", elapsed, sender.totals)
+    return {**sender.totals, "elapsed": round(elapsed, 3)}
+
+
+_wakeup = threading.Event()
+_dispatcher: Optional[threading.Thread] = None
+
+
+def _dispatch_loop(poll_seconds: float) -> None:
+    while True:
+        _wakeup.wait(poll_seconds)
+        _wakeup.clear()
+        try:
+            drain_outbox()
+        except Exception as exc:
+            logger.warning("Outbox dispatcher error: %s", exc)
+
+
+def start_outbox_dispatcher() -> None:
+    """Start the background thread that drains the outbox (idempotent)."""
+    global _dispatcher
+    if _dispatcher and _dispatcher.is_alive():
+        return
+    poll = get_settings().outbox_poll_seconds
+    _dispatcher = threading.Thread(target=_dispatch_loop, args=(poll,), name="outbox-dispatcher", daemon=True)
+    _dispatcher.start()
+
+
+def kick_outbox() -> None:
+    """Wake the dispatcher so freshly queued mail goes out without waiting for the next poll."""
+    _wakeup.set()
+
+
+def outbox_status(session: Session) -> Dict[str, Any]:
+    ensure_schema()
+    counts = {s: 0 for s in ("pending", "sending", "sent", "failed")}
+    for status, n in session.exec(select(EmailOutbox.status, func.count()).group_by(EmailOutbox.status)).all():
+        counts[status] = n
+    now = datetime.now()
+
+    def _sent_since(seconds: int) -> int:
+        since = _iso(now - timedelta(seconds=seconds))
+        return session.exec(
+            select(func.count()).select_from(EmailOutbox).where(EmailOutbox.status == "sent", EmailOutbox.sent_at >= since)
+        ).one()
+
+    last_minute = _sent_since(60)
+    last_hour = _sent_since(3600)
+    oldest = session.exec(select(func.min(EmailOutbox.next_attempt_at)).where(EmailOutbox.status == "pending")).one()
+    campaigns = session.exec(select(EmailCampaign).order_by(EmailCampaign.id.desc()).limit(5)).all()
+    recent = []
+    for c in campaigns:
+        per = dict(
+            session.exec(
+                select(EmailOutbox.status, func.count()).where(EmailOutbox.campaign_id == c.id).group_by(EmailOutbox.status)
+            ).all()
+        )
+        recent.append({"key": c.key, "created_at": c.created_at, **per})
+    return {
+        "counts": counts,
+        "backlog": counts["pending"] + counts["sending"],
+        "oldest_pending": oldest,
+        "throughput": {
+            "last_minute": last_minute,
+            "last_hour": last_hour,
+            "per_second": round(last_minute / 60.0, 2),
+        },
+        "dispatcher_running": bool(_dispatcher and _dispatcher.is_alive()),
+        "recent_campaigns": recent,
+    }
@@ -0,0 +1,120 @@
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+from sqlalchemy import delete, func, update
+from sqlalchemy.exc import IntegrityError
+from sqlmodel import Session, select
+from ..core.config import get_settings
+from ..core.db import engine, ensure_schema
+from ..models.user import PlanAdaptation
+from .planner import adapt_plan_with_feedback
+
+logger = logging.getLogger(__name__)
+
+
+def _iso(dt: datetime) -> str:
+    return dt.isoformat(timespec="seconds")
+
+
+def queue_plan_adaptation(session: Session, user_id: int) -> bool:
+    """Ask for the user's plan to be re-adapted after the debounce window; commits.
+
+    Returns False when a pending request already covers this submission.
+    With PLAN_ADAPT_DEBOUNCE_SECONDS=0 the plan is adapted inline instead.
+    """
+    debounce = get_settings().plan_adapt_debounce_seconds
+    if debounce <= 0:
+        adapt_plan_with_feedback(session, user_id)
+        return True
+    ensure_schema()
+    now = datetime.now()
+    # Atomic bump: the worker deletes the row only while `requests` still matches what it adapted
+    bumped = session.exec(
+        update(PlanAdaptation)
+        .where(PlanAdaptation.user_id == user_id)
+        .values(requests=PlanAdaptation.requests + 1)
+    )
+    session.commit()
+    if bumped.rowcount:
+        return False
+    session.add(
+        PlanAdaptation(user_id=user_id, requested_at=_iso(now), due_at=_iso(now + timedelta(seconds=debounce)))
+    )
+    try:
+        session.commit()
+    except IntegrityError:
+        # A concurrent submission queued it first; that run will see this score too
+        session.rollback()
+        return False
+    return True
+
+
+def run_due_adaptations(limit: int = 200) -> Dict[str, int]:
+    """Adapt the plans whose debounce window has passed."""
+    ensure_schema()
+    done = failed = 0
+    with Session(engine) as session:
+        due = session.exec(
+            select(PlanAdaptation)
+            .where(PlanAdaptation.due_at <= _iso(datetime.now()))
+            .order_by(PlanAdaptation.due_at)
+            .limit(limit)
+        ).all()
+        for user_id, requests in [(p.user_id, p.requests) for p in due]:
+            try:
+                adapt_plan_with_feedback(session, user_id)
+            except Exception as exc:
+                session.rollback()
+                failed += 1
+                logger.warning("Plan adaptation failed for user %s: %s", user_id, exc)
+                # Retry after another window rather than on every poll
+                retry_at = datetime.now() + timedelta(seconds=get_settings().plan_adapt_debounce_seconds)
+                session.exec(
+                    update(PlanAdaptation).where(PlanAdaptation.user_id == user_id).values(due_at=_iso(retry_at))
+                )
+                session.commit()
+                continue
+            # Submissions that arrived while adapting keep the row for one more run
+            session.exec(
+                delete(PlanAdaptation).where(PlanAdaptation.user_id == user_id, PlanAdaptation.requests == requests)
+            )
+            session.commit()
+            done += 1
+    return {"adapted": done, "failed": failed}
+
+
+def plan_queue_status(session: Session) -> Dict[str, Any]:
+    ensure_schema()
+    pending, requests, oldest = session.exec(
+        select(func.count(), func.sum(PlanAdaptation.requests), func.min(PlanAdaptation.requested_at))
+    ).one()
+    return {
+        "pending_users": pending,
+        "coalesced_requests": int(requests or 0),
+        "oldest_request": oldest,
+        "worker_running": bool(_worker and _worker.is_alive()),
+    }
+
+
+_worker: Optional[threading.Thread] = None
+
+
+def _work_loop(poll_seconds: float) -> None:
+    while True:
+        try:
+            run_due_adaptations()
+        except Exception as exc:
+            logger.warning("Plan adaptation worker error: %s", exc)
+        time.sleep(poll_seconds)
+
+
+def start_plan_worker() -> None:
+    """Start the background thread that applies queued plan adaptations (idempotent)."""
+    global _worker
+    if _worker and _worker.is_alive():
+        return
+    poll = get_settings().plan_adapt_poll_seconds
+    _worker = threading.Thread(target=_work_loop, args=(poll,), name="plan-adapter", daemon=True)
+    _worker.start()
@@ -0,0 +1,270 @@
+import heapq
+import math
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Union
+
+REVISION_GAP_WEEKS = 2  # a revision comes at least this many weeks after the first pass
+REVISION_SHARE = 0.25  # revision effort as a share of the topic's effort
+SWAP_CANDIDATES = 8  # lower-priority tasks examined per swap attempt
+_EPS = 1e-9
+
+
+@dataclass
+class StudyTask:
+    name: str
+    hours: float
+    priority: float = 1.0
+    after: tuple = ()  # task names that must land in the same or an earlier week
+    revise: bool = True
+    revision: bool = False
+    topic: str = ""  # topic a split part or revision belongs to; defaults to name
+
+
+@dataclass
+class WeekSlot:
+    week: int
+    capacity: float
+    tasks: List[StudyTask] = field(default_factory=list)
+    load: float = 0.0
+
+    @property
+    def free(self) -> float:
+        return self.capacity - self.load
+
+    def add(self, task: StudyTask) -> None:
+        self.tasks.append(task)
+        self.load += task.hours
+
+    def remove(self, task: StudyTask) -> None:
+        self.tasks.remove(task)
+        self.load -= task.hours
+
+
+@dataclass
+class Schedule:
+    weeks: List[WeekSlot]
+    backlog: List[StudyTask]
+    moves: int = 0
+    revisions_dropped: int = 0
+
+    def to_plan_weeks(self) -> List[Dict]:
+        out = []
+        for w in self.weeks:
+            ordered = sorted(w.tasks, key=lambda t: (t.revision, -t.priority))
+            out.append({
+                "week": w.week,
+                "hours": int(round(w.capacity)),
+                "load": round(w.load, 1),
+                "tasks": [t.name for t in ordered],
+            })
+        return out
+
+
+def revision_hours(hours: float, share: float = REVISION_SHARE) -> float:
+    """Hours for revising a topic that took `hours` to study, in half-hour steps."""
+    return max(0.5, math.ceil(hours * share * 2) / 2)
+
+
+def _split(tasks: Sequence[StudyTask], max_hours: float) -> List[StudyTask]:
+    """Break tasks larger than any week into chained parts that each fit one week."""
+    out: List[StudyTask] = []
+    for t in tasks:
+        if t.hours <= max_hours + _EPS or max_hours <= 0:
+            out.append(t)
+            continue
+        parts = math.ceil(t.hours / max_hours)
+        prev: Optional[str] = None
+        for p in range(parts):
+            name = f"{t.name} (part {p + 1}/{parts})"
+            out.append(StudyTask(
+                name=name,
+                hours=t.hours / parts,
+                priority=t.priority,
+                after=t.after if prev is None else (prev,),
+                revise=t.revise and p == parts - 1,
+                topic=t.topic or t.name,
+            ))
+            prev = name
+    return out
+
+
+def _priority_order(tasks: Sequence[StudyTask]) -> List[StudyTask]:
+    """Highest priority first, never before a task's prerequisites (input order breaks ties)."""
+    by_name = {t.name: t for t in tasks}
+    indegree = {t.name: 0 for t in tasks}
+    dependents: Dict[str, List[str]] = {}
+    for t in tasks:
+        for dep in t.after:
+            if dep in by_name and dep != t.name:
+                indegree[t.name] += 1
+                dependents.setdefault(dep, []).append(t.name)
+    index = {t.name: i for i, t in enumerate(tasks)}
+    ready = [(-t.priority, index[t.name], t.name) for t in tasks if indegree[t.name] == 0]
+    heapq.heapify(ready)
+    order: List[StudyTask] = []
+    while ready:
+        _, _, name = heapq.heappop(ready)
+        order.append(by_name[name])
+        for nxt in dependents.get(name, ()):
+            indegree[nxt] -= 1
+            if indegree[nxt] == 0:
+                heapq.heappush(ready, (-by_name[nxt].priority, index[nxt], nxt))
+    if len(order) < len(tasks):
+        # Dependency cycle: schedule the rest by priority alone
+        placed = {t.name for t in order}
+        order.extend(sorted((t for t in tasks if t.name not in placed), key=lambda t: (-t.priority, index[t.name])))
+    return order
+
+
+class _Packer:
+    def __init__(self, weeks: List[WeekSlot], tasks: Sequence[StudyTask]):
+        self.weeks = weeks
+        self.week_of: Dict[str, int] = {}
+        self.dependents: Dict[str, List[str]] = {}
+        for t in tasks:
+            for dep in t.after:
+                self.dependents.setdefault(dep, []).append(t.name)
+        self.moves = 0
+        self._max_free: Optional[float] = None  # largest free capacity of any week, cached
+        self._by_priority: Dict[int, List[StudyTask]] = {}  # week -> tasks, lowest priority first
+
+    def _shrunk(self, i: int, free_before: float) -> None:
+        # Only the week holding the maximum can lower it
+        if self._max_free is not None and free_before >= self._max_free - _EPS:
+            self._max_free = None
+        self._by_priority.pop(i, None)
+
+    def _grew(self, i: int) -> None:
+        if self._max_free is not None:
+            self._max_free = max(self._max_free, self.weeks[i].free)
+        self._by_priority.pop(i, None)
+
+    def max_free(self) -> float:
+        if self._max_free is None:
+            self._max_free = max(w.free for w in self.weeks)
+        return self._max_free
+
+    def by_priority(self, i: int) -> List[StudyTask]:
+        if i not in self._by_priority:
+            self._by_priority[i] = sorted(self.weeks[i].tasks, key=lambda t: t.priority)
+        return self._by_priority[i]
+
+    def earliest(self, task: StudyTask) -> int:
+        return max((self.week_of[d] for d in task.after if d in self.week_of), default=0)
+
+    def latest(self, task: StudyTask) -> int:
+        return min((self.week_of[d] for d in self.dependents.get(task.name, ()) if d in self.week_of), default=len(self.weeks) - 1)
+
+    def place(self, task: StudyTask, start: int) -> bool:
+        # Once weeks fill up, overflow tasks go to the backlog without a scan
+        if task.hours > self.max_free() + _EPS:
+            return False
+        for i in range(start, len(self.weeks)):
+            free = self.weeks[i].free
+            if free >= task.hours - _EPS:
+                self.weeks[i].add(task)
+                self.week_of[task.name] = i
+                self._shrunk(i, free)
+                return True
+        return False
+
+    def move(self, task: StudyTask, src: int, dst: int) -> None:
+        free = self.weeks[dst].free
+        self.weeks[src].remove(task)
+        self.weeks[dst].add(task)
+        self.week_of[task.name] = dst
+        self._grew(src)
+        self._shrunk(dst, free)
+        self.moves += 1
+
+    def pull_forward(self) -> bool:
+        """Move tasks into the earliest earlier week that has room for them."""
+        changed = False
+        for j in range(1, len(self.weeks)):
+            for task in sorted(self.weeks[j].tasks, key=lambda t: -t.priority):
+                for i in range(self.earliest(task), j):
+                    if self.weeks[i].free >= task.hours - _EPS:
+                        self.move(task, j, i)
+                        changed = True
+                        break
+        return changed
+
+    def swap_forward(self) -> bool:
+        """Swap a task with a lower-priority task sitting in an earlier week when both still fit."""
+        changed = False
+        for j in range(1, len(self.weeks)):
+            for b in sorted(self.weeks[j].tasks, key=lambda t: -t.priority):
+                if self.week_of.get(b.name) != j:
+                    continue
+                done = False
+                for i in range(self.earliest(b), j):
+                    wi, wj = self.weeks[i], self.weeks[j]
+                    for a in self.by_priority(i)[:SWAP_CANDIDATES]:
+                        if a.priority >= b.priority:
+                            break
+                        if (
+                            wi.free + a.hours >= b.hours - _EPS
+                            and wj.free + b.hours >= a.hours - _EPS
+                            and a.name not in b.after
+                            and self.latest(a) >= j
+                        ):
+                            self.move(a, i, j)
+                            self.move(b, j, i)
+                            changed = done = True
+                            break
+                    if done:
+                        break
+        return changed
+
+
+def schedule_tasks(
+    tasks: Sequence[StudyTask],
+    capacity: Union[float, Sequence[float]],
+    weeks: Optional[int] = None,
+    revision_gap: int = REVISION_GAP_WEEKS,
+    revision_share: float = REVISION_SHARE,
+    max_rounds: int = 3,
+) -> Schedule:
+    """Pack study tasks into weeks under per-week hour capacity.
+
+    Greedy first-fit in priority order (respecting `after`), then a few
+    rounds of local improvement that pull tasks into earlier free space and
+    swap them ahead of lower-priority work. Each topic then gets a revision
+    task at least `revision_gap` weeks after its first pass, where room is left.
+    """
+    if isinstance(capacity, (int, float)):
+        caps = [float(capacity)] * max(1, weeks or 8)
+    else:
+        caps = [float(c) for c in capacity] or [0.0]
+    slots = [WeekSlot(week=i + 1, capacity=c) for i, c in enumerate(caps)]
+    tasks = _split(tasks, max(caps))
+    packer = _Packer(slots, tasks)
+    backlog: List[StudyTask] = []
+    unplaced: set = set()
+    order = _priority_order(tasks)
+    for task in order:
+        # A task whose prerequisite did not fit waits with it
+        if any(d in unplaced for d in task.after) or not packer.place(task, packer.earliest(task)):
+            backlog.append(task)
+            unplaced.add(task.name)
+
+    for _ in range(max_rounds):
+        pulled = packer.pull_forward()
+        swapped = packer.swap_forward()
+        if not (pulled or swapped):
+            break
+
+    dropped = 0
+    for task in order:
+        if not task.revise or task.name not in packer.week_of:
+            continue
+        rev = StudyTask(
+            name=f"Revise: {task.topic or task.name}",
+            hours=revision_hours(task.hours, revision_share),
+            priority=task.priority,
+            revise=False,
+            revision=True,
+        )
+        if not packer.place(rev, packer.week_of[task.name] + revision_gap):
+            dropped += 1
+    return Schedule(weeks=slots, backlog=backlog, moves=packer.moves, revisions_dropped=dropped)
@@ -1,25 +1,94 @@
 import json
 import logging
+import threading
+import time
 from datetime import date, timedelta
 from collections import Counter
+from typing import Optional
+from sqlalchemy import insert, update
 from sqlmodel import Session, select
-from ..models.user import StudyPlan, User, TestResult
-from ..models.content import SyllabusTopic, Capsule
+from ..core.config import get_settings
+from ..models.user import StudyPlan, User, UserStats
+from ..models.content import SyllabusTopic
+from .capsule_store import topic_counts, trend_version
+from .plan_scheduler import StudyTask, revision_hours, schedule_tasks
+from .revision import ensure_topic_cards, topic_card_refs, topics_due_by_week
+from .user_stats import get_user_stats, weak_topic_weights
 
 logger = logging.getLogger(__name__)
 
-
-def _even_chunks(items, weeks: int) -> list[list[str]]:
-    chunks: list[list[str]] = [[] for _ in range(max(1, weeks))]
-    for i, it in enumerate(items):
-        chunks[i % len(chunks)].append(it)
-    return chunks
+# (window days, end date) -> (trend version, weights); see _topic_trend_weights
+_trend_cache: dict[tuple[int, str], tuple[str, dict[str, float]]] = {}
+_trend_cache_lock = threading.Lock()
 
 
 def _default_hours(user: User) -> int:
     return 10
 
 
+def _topic_effort(topic: SyllabusTopic) -> float:
+    """Study hours for a first pass over a topic: a base plus one per listed keyword."""
+    keywords = [k for k in (topic.keywords or "").split(",") if k.strip()]
+    return 4.0 + len(keywords)
+
+
+def _build_plan(
+    topics: list[SyllabusTopic],
+    hours,
+    priorities: Optional[dict[str, float]] = None,
+    weeks: int = 8,
+    revisions: Optional[dict[int, list[str]]] = None,
+    carded: frozenset = frozenset(),
+) -> dict:
+    """Pack the syllabus into weeks under `hours` (per week, or one value per week).
+
+    Topics in `carded` are revised on their spaced-repetition card's schedule
+    instead of the scheduler's: `revisions` (plan week -> topics due) get their
+    hours reserved in that week, and the scheduler adds no revision for them.
+    """
+    priorities = priorities or {}
+    tasks: dict[str, StudyTask] = {}
+    for t in topics:
+        if t.topic and t.topic not in tasks:
+            tasks[t.topic] = StudyTask(
+                t.topic, _topic_effort(t), priorities.get(t.topic, 1.0), revise=t.topic not in carded
+            )
+    if revisions is None:
+        schedule = schedule_tasks(list(tasks.values()), hours, weeks=weeks)
+        plan = {"generated_on": str(date.today()), "weeks": schedule.to_plan_weeks()}
+        if schedule.backlog:
+            plan["backlog"] = [t.name for t in schedule.backlog]
+        return plan
+    capacity_in = [float(h) for h in hours] if isinstance(hours, (list, tuple)) else [float(hours)] * weeks
+    capacity = list(capacity_in)
+    pinned: list[list[tuple[str, float]]] = []
+    for i in range(len(capacity)):
+        week = []
+        for name in dict.fromkeys(revisions.get(i + 1, [])):
+            need = revision_hours(tasks[name].hours if name in tasks else 4.0)
+            if need <= capacity[i]:
+                week.append((f"Revise: {name}", need))
+                capacity[i] -= need
+        pinned.append(week)
+    schedule = schedule_tasks(list(tasks.values()), capacity, weeks=len(capacity))
+    plan_weeks = schedule.to_plan_weeks()
+    first_pass: dict[str, int] = {}
+    for slot in schedule.weeks:
+        for t in slot.tasks:
+            first_pass.setdefault(t.topic or t.name, slot.week)
+    for w, week in zip(plan_weeks, pinned):
+        # A first pass in this week or later already covers the topic; its reserved hours stay free
+        week = [(n, h) for n, h in week if first_pass.get(n[len("Revise: "):], 0) < w["week"]]
+        extra = sum(h for _, h in week)
+        w["hours"] = int(round(capacity_in[w["week"] - 1]))
+        w["load"] = round(w["load"] + extra, 1)
+        w["tasks"] = [n for n, _ in week] + w["tasks"]
+    plan = {"generated_on": str(date.today()), "weeks": plan_weeks}
+    if schedule.backlog:
+        plan["backlog"] = [t.name for t in schedule.backlog]
+    return plan
+
+
 def generate_plan_for_default_user(session: Session) -> None:
     user = session.exec(select(User)).first()
     if not user:
@@ -28,14 +97,8 @@ def generate_plan_for_default_user(session: Session) -> None:
         session.commit()
         session.refresh(user)
     topics = session.exec(select(SyllabusTopic)).all()
-    topic_names = [t.topic for t in topics]
-    weeks = 8
-    hours = _default_hours(user)
-    buckets = _even_chunks(topic_names, weeks)
-    plan = {"generated_on": str(date.today()), "weeks": []}
-    for w_i in range(weeks):
-        plan["weeks"].append({"week": w_i + 1, "hours": hours, "tasks": buckets[w_i] + (["Weekly revision"] if w_i % 2 == 0 else [])})
     existing = session.exec(select(StudyPlan).where(StudyPlan.user_id == (user.id or 0))).first()
+    plan = _build_plan(topics, existing.available_hours_per_week if existing else _default_hours(user))
     if existing:
         existing.plan_json = json.dumps(plan)
         session.add(existing)
@@ -47,30 +110,18 @@ def generate_plan_for_default_user(session: Session) -> None:
 def generate_plan_for_user(session: Session, user_id: int) -> StudyPlan:
     """Generate a baseline multi-week study plan for a specific user.
 
-    Uses the syllabus topics to distribute tasks evenly across weeks and
-    sets a reasonable default for available hours.
+    Packs the syllabus topics into weeks within the user's available hours
+    (a reasonable default for new plans), trending topics first.
     """
     user = session.get(User, user_id)
     if not user:
         raise ValueError("User not found")
     topics = session.exec(select(SyllabusTopic)).all()
-    topic_names = [t.topic for t in topics]
     # Boost prioritization using recent capsule trends
     weights = _topic_trend_weights(session, days=14)
-    topic_names = _prioritize_topics(topic_names, weights)
-    weeks = 8
-    hours = _default_hours(user)
-    buckets = _even_chunks(topic_names, weeks)
-    plan = {"generated_on": str(date.today()), "weeks": []}
-    for w_i in range(weeks):
-        plan["weeks"].append(
-            {
-                "week": w_i + 1,
-                "hours": hours,
-                "tasks": buckets[w_i] + (["Weekly revision"] if w_i % 2 == 0 else []),
-            }
-        )
     existing = session.exec(select(StudyPlan).where(StudyPlan.user_id == user.id)).first()
+    hours = existing.available_hours_per_week if existing else _default_hours(user)
+    plan = _build_plan(topics, hours, weights)
     if existing:
         existing.plan_json = json.dumps(plan)
         session.add(existing)
@@ -88,90 +139,155 @@ def generate_plan_for_user(session: Session, user_id: int) -> StudyPlan:
     return sp
 
 
+def generate_plans_for_all_users(session: Session, chunk_size: Optional[int] = None) -> dict:
+    """Generate or refresh the baseline plan of every active user.
+
+    Same plan as generate_plan_for_user, but the syllabus and trend weights
+    are loaded once and users are processed in id-ordered chunks with one
+    bulk insert and one bulk update per chunk. Users with test results then
+    get their feedback re-applied on top of the fresh baseline, so the nightly
+    refresh does not wipe adapted hours, weak-topic priorities or the summary.
+    """
+    started = time.perf_counter()
+    chunk_size = max(1, chunk_size or get_settings().plan_batch_size)
+    topics = session.exec(select(SyllabusTopic)).all()
+    weights = _topic_trend_weights(session, days=14)
+    plans: dict[int, str] = {}  # serialized plan per weekly-hours value
+    users = created = updated = adapted = 0
+    last_id = 0
+    while True:
+        chunk = session.exec(
+            select(User).where(User.is_active == True, User.id > last_id).order_by(User.id).limit(chunk_size)  # noqa: E712
+        ).all()
+        if not chunk:
+            break
+        last_id = chunk[-1].id
+        existing: dict[int, tuple[int, int]] = {}
+        for plan_id, user_id, plan_hours in session.exec(
+            select(StudyPlan.id, StudyPlan.user_id, StudyPlan.available_hours_per_week)
+            .where(StudyPlan.user_id.in_([u.id for u in chunk]))
+            .order_by(StudyPlan.id)
+        ).all():
+            existing.setdefault(user_id, (plan_id, plan_hours))
+        inserts, updates = [], []
+        for user in chunk:
+            hours = existing[user.id][1] if user.id in existing else _default_hours(user)
+            if hours not in plans:
+                plans[hours] = json.dumps(_build_plan(topics, hours, weights))
+            if user.id in existing:
+                updates.append({"id": existing[user.id][0], "plan_json": plans[hours]})
+            else:
+                inserts.append({
+                    "user_id": user.id,
+                    "target_year": date.today().year,
+                    "available_hours_per_week": hours,
+                    "plan_json": plans[hours],
+                })
+        if updates:
+            session.exec(update(StudyPlan), params=updates)
+        if inserts:
+            session.exec(insert(StudyPlan), params=inserts)
+        session.commit()
+        tested = session.exec(
+            select(UserStats.user_id).where(UserStats.user_id.in_([u.id for u in chunk]), UserStats.tests_count > 0)
+        ).all()
+        session.expunge_all()
+        for user_id in tested:
+            try:
+                adapt_plan_with_feedback(session, user_id)
+                adapted += 1
+            except Exception as exc:
+                session.rollback()
+                logger.warning("Plan adaptation failed for user %s after bulk refresh: %s", user_id, exc)
+        users += len(chunk)
+        created += len(inserts)
+        updated += len(updates)
+    elapsed = time.perf_counter() - started
+    stats = {
+        "users": users,
+        "created": created,
+        "updated": updated,
+        "adapted": adapted,
+        "seconds": round(elapsed, 3),
+        "users_per_second": round(users / elapsed, 1) if elapsed > 0 else float(users),
+    }
+    logger.info("Bulk plan generation: %s", stats)
+    return stats
+
+
 def _topic_trend_weights(session: Session, days: int = 14) -> dict[str, float]:
-    """Compute simple frequency-based weights from recent capsules."""
+    """Compute simple frequency-based weights from recent capsules.
+
+    Cached per window until a capsule save changes the TopicTrend counts.
+    """
     try:
         end = date.today()
         start = end - timedelta(days=days)
-        caps = session.exec(
-            select(Capsule).where(Capsule.date >= str(start), Capsule.date <= str(end))
-        ).all() or []
-        counts: Counter[str] = Counter()
-        for c in caps:
-            try:
-                items = json.loads(c.items_json) or []
-            except Exception:
-                items = []
-            for it in items:
-                for tp in it.get("topics", []) or []:
-                    name = str(tp.get("topic") or "").strip()
-                    if name:
-                        counts[name] += 1
-        if not counts:
-            return {}
-        maxc = max(counts.values())
-        return {k: 1.0 + (v / maxc) for k, v in counts.items()}  # 1.0..2.0
+        key = (days, str(end))
+        version = trend_version(session)
+        with _trend_cache_lock:
+            cached = _trend_cache.get(key)
+        if cached and cached[0] == version:
+            return dict(cached[1])
+        counts = topic_counts(session, str(start), str(end))
+        weights: dict[str, float] = {}
+        if counts:
+            maxc = max(counts.values())
+            weights = {k: 1.0 + (v / maxc) for k, v in counts.items()}  # 1.0..2.0
+        with _trend_cache_lock:
+            _trend_cache.clear()  # older versions and past days are never read again
+            _trend_cache[key] = (version, weights)
+        return dict(weights)
     except Exception as exc:
         logger.debug("trend weights error: %s", exc)
         return {}
 
 
-def _prioritize_topics(names: list[str], weights: dict[str, float]) -> list[str]:
-    if not weights:
-        return names
-    return sorted(names, key=lambda n: weights.get(n, 1.0), reverse=True)
-
-
-def _infer_weak_topics(test_name: str, syllabus: list[SyllabusTopic]) -> list[str]:
-    n = (test_name or "").lower()
-    matched: list[str] = []
-    for t in syllabus:
-        k = (t.topic or "").lower()
-        if not k:
-            continue
-        # simple substring match
-        if k in n:
-            matched.append(t.topic)
-        else:
-            # split keywords field
-            kws = (t.keywords or "").lower().split(",")
-            if any(kw.strip() and kw.strip() in n for kw in kws):
-                matched.append(t.topic)
-    return matched
-
-
 def adapt_plan_with_feedback(session: Session, user_id: int) -> None:
-    tests = session.exec(select(TestResult).where(TestResult.user_id == user_id)).all()
-    if not tests:
+    stats = get_user_stats(session, user_id)
+    if not stats.tests_count:
         return
-    avg = sum(t.score for t in tests) / max(1, len(tests))
+    avg = stats.score_sum / stats.tests_count
     plan = session.exec(select(StudyPlan).where(StudyPlan.user_id == user_id)).first()
     if plan:
         obj = json.loads(plan.plan_json)
         # Hours scaling based on average score
-        for w in obj.get("weeks", []):
+        capacity = []
+        for w in obj.get("weeks", []) or [{"hours": plan.available_hours_per_week}] * 8:
             base = int(w.get("hours", 10))
             if avg >= 75:
-                w["hours"] = max(6, int(base * 0.9))
+                capacity.append(max(6, int(base * 0.9)))
             elif avg <= 60:
-                w["hours"] = min(18, int(base * 1.2))
+                capacity.append(min(18, int(base * 1.2)))
             else:
-                w["hours"] = base
-        # Weak-topic targeting based on recent tests names
-        syllabus = session.exec(select(SyllabusTopic)).all()
-        counts: Counter[str] = Counter()
-        for t in tests[-8:]:
-            for topic in _infer_weak_topics(t.test_name or "", syllabus):
-                weight = 1.5 if t.score < 50 else (1.0 if t.score < 70 else 0.5)
-                counts[topic] += weight
+                capacity.append(base)
+        # Weak-topic targeting based on recent tests names (kept current in UserStats)
+        counts: Counter[str] = weak_topic_weights(stats)
         weak = [tp for tp, _ in counts.most_common(8)]
         # Also bring in current trends from recent capsules
         trend_weights = _topic_trend_weights(session, days=14)
-        # Reorder each week's tasks to prioritize weak + trending topics first
+        # Re-pack the syllabus into the new weekly capacity, weak + trending topics first
+        priorities = dict(trend_weights)
+        for name in weak:
+            priorities[name] = priorities.get(name, 1.0) + 2.0
+        # Revision comes only from the spaced-repetition cards; the top weak topics always have one
+        ensure_topic_cards(session, user_id, weak[:2])
+        due_by_week = topics_due_by_week(session, user_id, len(capacity))
+        repacked = _build_plan(
+            session.exec(select(SyllabusTopic)).all(),
+            capacity,
+            priorities,
+            weeks=len(capacity),
+            revisions=due_by_week,
+            carded=frozenset(topic_card_refs(session, user_id)),
+        )
+        obj["weeks"] = repacked["weeks"]
+        if repacked.get("backlog"):
+            obj["backlog"] = repacked["backlog"]
+        else:
+            obj.pop("backlog", None)
         for w in obj.get("weeks", []):
             tasks = w.get("tasks", [])
-            # Inject targeted revision tasks early
-            inject = [f"Revise: {x}" for x in weak[:2] if f"Revise: {x}" not in tasks]
             # Add weekly CA practice anchor
             trending = sorted(trend_weights.items(), key=lambda kv: kv[1], reverse=True)
             ca_targets = [t for t, _ in trending[:2]]
@@ -185,7 +301,7 @@ def adapt_plan_with_feedback(session: Session, user_id: int) -> None:
                 base += trend_weights.get(name, 0)
                 return -base  # lower is earlier
 
-            merged = list(dict.fromkeys(inject + ca_tasks + tasks))
+            merged = list(dict.fromkeys(ca_tasks + tasks))
             # keep revision/current affairs labels together; others sorted by topic priority
             merged_sorted = merged[:]
             try:
@@ -194,7 +310,7 @@ def adapt_plan_with_feedback(session: Session, user_id: int) -> None:
                 pass
             w["tasks"] = merged_sorted
         obj["feedback_summary"] = {
-            "tests_considered": len(tests),
+            "tests_considered": stats.tests_count,
             "average_score": round(avg, 2),
             "weak_topics": weak,
         }
@@ -0,0 +1,107 @@
+import hashlib
+from typing import Dict, List, Optional
+from sqlalchemy import delete, insert
+from sqlmodel import Session, select
+from ..core.db import ensure_schema
+from ..models.content import PrecomputeState, PyqQuestion, PyqTopicLink, SyllabusTopic
+from .mapping import extract_key_entities, pyq_index
+from .semantic import SimilarityIndex, rank_top_k
+
+STATE_NAME = "pyq_topic_links"
+
+
+def _inputs_fingerprint(session: Session) -> str:
+    h = hashlib.sha1()
+    for t in session.exec(select(SyllabusTopic).order_by(SyllabusTopic.id)).all():
+        h.update(f"T{t.id}\x1f{t.paper}\x1f{t.topic}\x1f{t.keywords or ''}\x1e".encode("utf-8"))
+    for p in session.exec(select(PyqQuestion).order_by(PyqQuestion.id)).all():
+        h.update(f"Q{p.id}\x1f{p.paper}\x1f{p.question}\x1f{p.keywords or ''}\x1e".encode("utf-8"))
+    return h.hexdigest()
+
+
+def rebuild_pyq_topic_links(session: Session, per_pyq: int = 3, min_score: float = 0.05) -> int:
+    """Link every PYQ to its top syllabus topics; returns the number of links written."""
+    ensure_schema()
+    topics = session.exec(select(SyllabusTopic)).all()
+    pyqs = session.exec(select(PyqQuestion)).all()
+    session.exec(delete(PyqTopicLink))
+    # Same topic text the news mapper scores against
+    index = SimilarityIndex([f"{t.paper} {t.topic} {t.keywords or ''}" for t in topics])
+    rows = []
+    for p in pyqs if topics else []:
+        scores = index.scores(f"{p.paper} {p.question} {p.keywords or ''}")
+        kept = rank_top_k(scores, per_pyq, min_score)
+        if not kept:
+            # Keep the PYQ reachable through its own paper's closest topic
+            same_paper = [float(s) if t.paper == p.paper else float("-inf") for t, s in zip(topics, scores)]
+            kept = [(i, s) for i, s in rank_top_k(same_paper, 1) if s != float("-inf")]
+        rows.extend({"topic_id": topics[i].id, "pyq_id": p.id, "score": float(s)} for i, s in kept)
+    if rows:
+        session.exec(insert(PyqTopicLink), params=rows)
+    state = session.get(PrecomputeState, STATE_NAME) or PrecomputeState(name=STATE_NAME, fingerprint="")
+    state.fingerprint = _inputs_fingerprint(session)
+    session.add(state)
+    session.commit()
+    return len(rows)
+
+
+def ensure_pyq_topic_links(session: Session) -> bool:
+    """Rebuild the links when syllabus or PYQ seed data changed; returns whether it rebuilt."""
+    ensure_schema()
+    state = session.get(PrecomputeState, STATE_NAME)
+    if state and state.fingerprint == _inputs_fingerprint(session):
+        return False
+    rebuild_pyq_topic_links(session)
+    return True
+
+
+def related_pyqs(session: Session, text: str, topic_scores: Dict[int, float], top_k: int = 3) -> Optional[List[Dict]]:
+    """PYQs reached through the news item's mapped topics, re-ranked against its text.
+
+    Returns None when the item has no linked candidates so the caller can
+    fall back to scoring every PYQ.
+    """
+    if not topic_scores:
+        return None
+    ensure_schema()
+    rows = session.exec(
+        select(PyqTopicLink.topic_id, PyqTopicLink.score, PyqQuestion)
+        .join(PyqQuestion, PyqQuestion.id == PyqTopicLink.pyq_id)
+        .where(PyqTopicLink.topic_id.in_(list(topic_scores)))
+    ).all()
+    if not rows:
+        return None
+    candidates: Dict[int, PyqQuestion] = {}
+    prior: Dict[int, float] = {}
+    for topic_id, link_score, q in rows:
+        candidates[q.id] = q
+        prior[q.id] = prior.get(q.id, 0.0) + topic_scores[topic_id] * float(link_score)
+
+    # Same scoring as find_related_pyqs, applied to the small candidate set only
+    news_topics = set(extract_key_entities(text))
+    pool = list(candidates.values())
+    # Pair scores do not depend on the rest of the corpus, so the cached pool-wide index serves the subset
+    index = pyq_index(session)
+    pair = index.pair_scores(text)
+    base_scores = [pair[index.positions[p.id]] if p.id in index.positions else 0.0 for p in pool]
+    scores = []
+    matched = []
+    for p, base in zip(pool, base_scores):
+        common_topics = news_topics & set(extract_key_entities(p.question + ' ' + (p.keywords or '')))
+        scores.append(float(base) + len(common_topics) * 0.2 + 0.1 * prior[p.id])
+        matched.append(common_topics)
+    ranked = rank_top_k(scores, top_k, min_score=0.05)
+    low_confidence = not ranked
+    if low_confidence:
+        ranked = rank_top_k(scores, top_k)
+    return [
+        {
+            "id": pool[i].id,
+            "year": pool[i].year,
+            "paper": pool[i].paper,
+            "question": pool[i].question,
+            "score": 0.01 if low_confidence else score,  # Low confidence score
+            "topics_matched": list(matched[i]),
+        }
+        for i, score in ranked
+    ]
@@ -0,0 +1,133 @@
+import atexit
+import logging
+import threading
+from typing import Dict, List, Optional, Sequence
+from sqlalchemy import delete, func, insert
+from sqlmodel import Session, select
+from ..core.config import get_settings
+from ..core.db import engine, ensure_schema
+from ..models.tests import QuestionStats, QuizResponse
+from .item_stats import apply_response_batch
+
+logger = logging.getLogger(__name__)
+
+MAX_PENDING = 100_000  # rows kept for retry when the database is unavailable
+
+
+class _ResponseWriter:
+    """Collects per-question rows from submissions and inserts them in one transaction per batch.
+
+    A flusher thread writes whatever is pending every QUIZ_RESPONSE_FLUSH_SECONDS,
+    or as soon as QUIZ_RESPONSE_BATCH rows are waiting. Rows live in this process
+    until flushed; reads of a user's responses flush first.
+    """
+
+    def __init__(self):
+        self._rows: List[Dict] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, rows: List[Dict]) -> None:
+        settings = get_settings()
+        if settings.quiz_response_flush_seconds <= 0:
+            self._write(rows)
+            return
+        with self._lock:
+            self._rows.extend(rows)
+            full = len(self._rows) >= settings.quiz_response_batch
+        self._start()
+        if full:
+            self._wake.set()
+
+    def flush(self) -> int:
+        with self._flush_lock:
+            with self._lock:
+                rows, self._rows = self._rows, []
+            if not rows:
+                return 0
+            try:
+                self._write(rows)
+            except Exception:
+                with self._lock:
+                    # Put them back for the next flush
+                    self._rows[:0] = rows[-MAX_PENDING:]
+                raise
+            return len(rows)
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._rows)
+
+    @staticmethod
+    def _write(rows: List[Dict]) -> None:
+        if not rows:
+            return
+        ensure_schema()
+        with engine.begin() as conn:
+            conn.execute(insert(QuizResponse), rows)
+            # Item-analysis counters move with the responses, one update per question per batch
+            apply_response_batch(conn, rows)
+
+    def _start(self) -> None:
+        if self._thread and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._thread and self._thread.is_alive():
+                return
+            self._thread = threading.Thread(target=self._loop, name="quiz-responses", daemon=True)
+            self._thread.start()
+            atexit.register(self._flush_quietly)
+
+    def _loop(self) -> None:
+        while True:
+            self._wake.wait(get_settings().quiz_response_flush_seconds)
+            self._wake.clear()
+            self._flush_quietly()
+
+    def _flush_quietly(self) -> None:
+        try:
+            self.flush()
+        except Exception as exc:
+            logger.warning("Quiz response flush failed (%d rows pending): %s", self.pending(), exc)
+
+
+_writer = _ResponseWriter()
+
+
+def queue_responses(result_id: int, user_id: int, test_id: int, picks: Sequence[int], oks: Sequence[bool]) -> None:
+    """Queue one row per question of a graded submission (picks in stored option order)."""
+    _writer.add([
+        {"result_id": result_id, "user_id": user_id, "test_id": test_id, "question": i, "chosen": c, "ok": ok}
+        for i, (c, ok) in enumerate(zip(picks, oks))
+    ])
+
+
+def flush_responses() -> int:
+    return _writer.flush()
+
+
+def latest_responses(session: Session, user_id: int, test_id: int) -> Optional[Dict[int, int]]:
+    """{question: chosen} of the user's most recent submission of a quiz, or None."""
+    ensure_schema()
+    flush_responses()
+    last = session.exec(
+        select(func.max(QuizResponse.result_id)).where(QuizResponse.user_id == user_id, QuizResponse.test_id == test_id)
+    ).one()
+    if last is None:
+        return None
+    rows = session.exec(
+        select(QuizResponse.question, QuizResponse.chosen).where(
+            QuizResponse.user_id == user_id, QuizResponse.test_id == test_id, QuizResponse.result_id == last
+        )
+    ).all()
+    return {q: c for q, c in rows}
+
+
+def drop_quiz_responses(session: Session, test_id: int) -> None:
+    """Forget a deleted quiz's responses and item counters (SQLite may hand its id to the next quiz)."""
+    ensure_schema()
+    flush_responses()
+    session.exec(delete(QuizResponse).where(QuizResponse.test_id == test_id))
+    session.exec(delete(QuestionStats).where(QuestionStats.test_id == test_id))
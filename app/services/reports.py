@@ -1,9 +1,8 @@
 from datetime import date, timedelta
-import json
 from typing import Dict, List
-from sqlmodel import Session, select
-from ..models.content import Capsule
-from ..models.user import TestResult, User
+from sqlmodel import Session
+from .capsule_store import load_capsule_items
+from .user_stats import score_totals
 
 
 def _date_strs(days: int = 7) -> List[str]:
@@ -13,20 +12,13 @@ def _date_strs(days: int = 7) -> List[str]:
 
 def build_weekly_report(session: Session) -> Dict:
     days = _date_strs(7)
-    # Fetch capsules for last 7 days
-    caps = (
-        session.exec(select(Capsule).where(Capsule.date.in_(days))).all()
-        or []
-    )
+    # Top 3 items per day of the last 7 days
+    by_day = load_capsule_items(session, days, per_day_limit=3)
     highlights: List[Dict] = []
-    for c in caps:
-        try:
-            items = json.loads(c.items_json)
-        except Exception:
-            items = []
-        for it in items[:3]:  # take top 3 per day
+    for day, items in by_day.items():
+        for it in items:
             highlights.append({
-                "date": c.date,
+                "date": day,
                 "title": it.get("title"),
                 "url": it.get("url"),
                 "summary": it.get("summary"),
@@ -35,18 +27,15 @@ def build_weekly_report(session: Session) -> Dict:
             })
 
     # Simple progress summary across users (avg score last week)
-    tests = session.exec(select(TestResult)).all() or []
-    if tests:
-        avg = sum(t.score for t in tests) / max(1, len(tests))
-    else:
-        avg = 0.0
+    tests_recorded, score_sum = score_totals(session)
+    avg = score_sum / tests_recorded if tests_recorded else 0.0
 
     report = {
         "week_end": str(date.today()),
         "week_start": str(date.today() - timedelta(days=6)),
         "highlights": highlights[:30],  # cap
         "progress": {
-            "tests_recorded": len(tests),
+            "tests_recorded": tests_recorded,
             "average_score": round(avg, 2),
         },
     }
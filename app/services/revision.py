@@ -0,0 +1,210 @@
+import json
+from datetime import date, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from sqlalchemy import func
+from sqlmodel import Session, select
+from ..core.db import ensure_schema
+from ..models.content import SyllabusTopic
+from ..models.tests import GeneratedTest
+from ..models.user import RevisionCard
+from .keywords import syllabus_matcher
+
+MIN_EASE = 130  # SM-2 floor for the easiness factor (x100)
+PASS_QUALITY = 3  # answers graded below this reset the card
+
+
+def sm2(ease: int, interval: int, reps: int, quality: int) -> Tuple[int, int, int]:
+    """Next (ease x100, interval days, reps) after a review graded 0-5."""
+    quality = max(0, min(5, int(quality)))
+    if quality < PASS_QUALITY:
+        reps, interval = 0, 1
+    else:
+        reps += 1
+        interval = 1 if reps == 1 else 6 if reps == 2 else max(1, round(interval * ease / 100))
+    miss = 5 - quality
+    ease = max(MIN_EASE, ease + 10 - miss * (8 + miss * 2))
+    return ease, interval, reps
+
+
+def quality_from_score(score: float) -> int:
+    """Map a 0-100 test score to an SM-2 grade."""
+    if score >= 90:
+        return 5
+    if score >= 75:
+        return 4
+    if score >= 60:
+        return 3
+    if score >= 40:
+        return 2
+    return 1
+
+
+def _today(day: Optional[str]) -> date:
+    return date.fromisoformat(day) if day else date.today()
+
+
+def _review(card: RevisionCard, quality: int, today: date) -> None:
+    if quality < PASS_QUALITY and card.reps:
+        card.lapses += 1
+    card.ease, card.interval, card.reps = sm2(card.ease, card.interval, card.reps, quality)
+    card.due = (today + timedelta(days=card.interval)).isoformat()
+    card.last_review = today.isoformat()
+
+
+def _cards(session: Session, user_id: int, kind: str, refs: Iterable[str]) -> Dict[str, RevisionCard]:
+    refs = list(refs)
+    if not refs:
+        return {}
+    rows = session.exec(
+        select(RevisionCard).where(RevisionCard.user_id == user_id, RevisionCard.kind == kind, RevisionCard.ref.in_(refs))
+    ).all()
+    return {c.ref: c for c in rows}
+
+
+def grade_items(
+    session: Session, user_id: int, kind: str, grades: Dict[str, Tuple[str, int]], day: Optional[str] = None
+) -> int:
+    """Review (or create and review) cards given {ref: (label, quality)}; the caller commits."""
+    if not grades:
+        return 0
+    ensure_schema()
+    today = _today(day)
+    existing = _cards(session, user_id, kind, grades)
+    for ref, (label, quality) in grades.items():
+        card = existing.get(ref) or RevisionCard(user_id=user_id, kind=kind, ref=ref, label=label[:200], due=today.isoformat())
+        _review(card, quality, today)
+        session.add(card)
+    return len(grades)
+
+
+def ensure_topic_cards(session: Session, user_id: int, topics: Iterable[str], day: Optional[str] = None) -> int:
+    """Create cards due today for topics the user has none for yet; the caller commits."""
+    topics = list(dict.fromkeys(t for t in topics if t))
+    if not topics:
+        return 0
+    ensure_schema()
+    due = _today(day).isoformat()
+    existing = _cards(session, user_id, "topic", topics)
+    missing = [t for t in topics if t not in existing]
+    for topic in missing:
+        session.add(RevisionCard(user_id=user_id, kind="topic", ref=topic, label=topic, due=due))
+    return len(missing)
+
+
+def track_test_topics(session: Session, user_id: int, test_name: str, score: float, day: Optional[str] = None) -> int:
+    """Grade the topic cards a test covers (matched from its name) by the score; the caller commits."""
+    ensure_schema()
+    topics = syllabus_matcher(session.exec(select(SyllabusTopic)).all()).labels(test_name or "")
+    quality = quality_from_score(score)
+    return grade_items(session, user_id, "topic", {t: (t, quality) for t in topics}, day)
+
+
+def track_quiz_answers(
+    session: Session, user_id: int, test_id: int, questions: List[Dict[str, Any]], answers: List[int], day: Optional[str] = None
+) -> int:
+    """Missed questions become (or lapse) question cards; correct answers advance existing ones. The caller commits."""
+    ensure_schema()
+    missed: Dict[str, Tuple[str, int]] = {}
+    correct: List[str] = []
+    for i, q in enumerate(questions):
+        chosen = answers[i] if i < len(answers) else -1
+        ref = f"{test_id}:{i}"
+        if chosen == int(q.get("answer_index", 0)):
+            correct.append(ref)
+        else:
+            missed[ref] = (str(q.get("q") or ""), 1)
+    seen = {ref: (card.label, 4) for ref, card in _cards(session, user_id, "question", correct).items()}
+    return grade_items(session, user_id, "question", {**missed, **seen}, day)
+
+
+def _card_dict(card: RevisionCard) -> Dict[str, Any]:
+    return {
+        "id": card.id,
+        "kind": card.kind,
+        "ref": card.ref,
+        "label": card.label,
+        "due": card.due,
+        "interval": card.interval,
+        "reps": card.reps,
+        "lapses": card.lapses,
+        "ease": card.ease / 100,
+    }
+
+
+def due_cards(session: Session, user_id: int, day: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """Cards due on or before `day`, most overdue first (served by the (user_id, due) index)."""
+    ensure_schema()
+    today = _today(day).isoformat()
+    rows = session.exec(
+        select(RevisionCard)
+        .where(RevisionCard.user_id == user_id, RevisionCard.due <= today)
+        .order_by(RevisionCard.due, RevisionCard.id)
+        .limit(max(0, limit))
+    ).all()
+    out = [_card_dict(c) for c in rows]
+    # Question cards carry the quiz item itself; one lookup per distinct test
+    test_ids = {int(c["ref"].split(":")[0]) for c in out if c["kind"] == "question"}
+    if test_ids:
+        tests = session.exec(select(GeneratedTest).where(GeneratedTest.id.in_(test_ids))).all()
+        questions = {t.id: json.loads(t.questions_json or "[]") for t in tests}
+        for c in out:
+            if c["kind"] != "question":
+                continue
+            test_id, index = (int(x) for x in c["ref"].split(":"))
+            qs = questions.get(test_id) or []
+            if index < len(qs):
+                c["question"] = qs[index]
+    return out
+
+
+def review_card(
+    session: Session, user_id: int, card_id: int, quality: int, day: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """Record a self-graded review (0-5) of one of the user's cards; commits."""
+    ensure_schema()
+    card = session.get(RevisionCard, card_id)
+    if not card or card.user_id != user_id:
+        return None
+    _review(card, quality, _today(day))
+    session.add(card)
+    session.commit()
+    session.refresh(card)
+    return _card_dict(card)
+
+
+def revision_summary(session: Session, user_id: int, day: Optional[str] = None) -> Dict[str, Any]:
+    ensure_schema()
+    today = _today(day).isoformat()
+    total = session.exec(select(func.count()).where(RevisionCard.user_id == user_id)).one()
+    due_now = session.exec(
+        select(func.count()).where(RevisionCard.user_id == user_id, RevisionCard.due <= today)
+    ).one()
+    next_due = session.exec(
+        select(func.min(RevisionCard.due)).where(RevisionCard.user_id == user_id, RevisionCard.due > today)
+    ).one()
+    return {"cards": total, "due_today": due_now, "next_due": next_due}
+
+
+def topics_due_by_week(session: Session, user_id: int, weeks: int, day: Optional[str] = None) -> Dict[int, List[str]]:
+    """Topic cards falling due in each of the next `weeks` plan weeks (week 1 includes overdue cards)."""
+    ensure_schema()
+    start = _today(day)
+    end = (start + timedelta(days=7 * weeks)).isoformat()
+    rows = session.exec(
+        select(RevisionCard.ref, RevisionCard.due)
+        .where(RevisionCard.user_id == user_id, RevisionCard.due < end, RevisionCard.kind == "topic")
+        .order_by(RevisionCard.due)
+    ).all()
+    out: Dict[int, List[str]] = {}
+    for ref, due in rows:
+        week = max(0, (date.fromisoformat(due) - start).days) // 7 + 1
+        out.setdefault(week, []).append(ref)
+    return out
+
+
+def topic_card_refs(session: Session, user_id: int) -> Set[str]:
+    """Topics the user has a revision card for (their revision follows the card, not the plan)."""
+    ensure_schema()
+    return set(
+        session.exec(select(RevisionCard.ref).where(RevisionCard.user_id == user_id, RevisionCard.kind == "topic")).all()
+    )
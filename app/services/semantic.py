@@ -1,21 +1,177 @@
-from typing import List, Tuple
+import heapq
+import math
+import threading
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+from .textnorm import token_ids, token_set
 
+# idf of a term found in only one of two documents (smooth_idf: ln(3/2) + 1)
+_PAIR_IDF = math.log(1.5) + 1.0
 
-def tfidf_similarity(query: str, corpus: List[str]) -> List[Tuple[int, float]]:
-    try:
-        from sklearn.feature_extraction.text import TfidfVectorizer
-        from sklearn.metrics.pairwise import cosine_similarity
-        vec = TfidfVectorizer(stop_words="english")
-        mat = vec.fit_transform([query] + corpus)
-        sims = cosine_similarity(mat[0:1], mat[1:]).flatten()
-        return sorted(list(enumerate(sims)), key=lambda x: x[1], reverse=True)
-    except Exception:
+
+class SimilarityIndex:
+    """Corpus side of tf-idf scoring, built once and queried many times.
+
+    Holds each document's cached token ids, its distinct-token set for the
+    overlap fallback, and flattened term/count/owner arrays with corpus
+    document frequencies, so a query only pays for its own tokens. Term ids
+    are remapped to the index's own sorted vocabulary, so array sizes follow
+    the corpus rather than the ever-growing process-wide VOCAB.
+    """
+
+    def __init__(self, corpus: Sequence[str], ids: Optional[Sequence[object]] = None):
+        self.size = len(corpus)
+        # Optional caller ids of the documents, in corpus order
+        self.ids = tuple(ids) if ids is not None else tuple(range(self.size))
+        self.positions = {doc_id: i for i, doc_id in enumerate(self.ids)}
+        self._sets = [token_set(doc) for doc in corpus]
+        self._np = None
+        try:
+            import numpy as np
+        except ImportError:
+            return
+        terms, counts, owner = [], [], []
+        for d, doc in enumerate(corpus):
+            ids = token_ids(doc)
+            if not len(ids):
+                continue
+            u, c = np.unique(np.frombuffer(ids, dtype=np.uint32), return_counts=True)
+            terms.append(u)
+            counts.append(c)
+            owner.append(np.full(len(u), d, dtype=np.int64))
+        if terms:
+            self._vocab, local = np.unique(np.concatenate(terms).astype(np.int64), return_inverse=True)
+            self._terms = local.astype(np.int64)
+            self._counts = np.concatenate(counts).astype(np.float64)
+            self._owner = np.concatenate(owner)
+        else:
+            self._vocab = np.zeros(0, dtype=np.int64)
+            self._terms = np.zeros(0, dtype=np.int64)
+            self._counts = np.zeros(0, dtype=np.float64)
+            self._owner = np.zeros(0, dtype=np.int64)
+        self._df = np.bincount(self._terms, minlength=len(self._vocab))
+        self._entry_df = self._df[self._terms]
+        self._np = np
+
+    def _query(self, query: str):
+        """Query term counts, which of them the index knows (and their local ids), and a dense count vector."""
+        np = self._np
+        ids = token_ids(query)
+        if not len(ids):
+            return None, None, None, None
+        q_terms, q_counts = np.unique(np.frombuffer(ids, dtype=np.uint32), return_counts=True)
+        pos = np.searchsorted(self._vocab, q_terms.astype(np.int64))
+        known = pos < len(self._vocab)
+        known[known] = self._vocab[pos[known]] == q_terms[known]
+        q_counts = q_counts.astype(np.float64)
+        # Dense over the index's own terms; query-only terms just add to the query norm
+        dense = np.zeros(len(self._vocab), dtype=np.float64)
+        dense[pos[known]] = q_counts[known]
+        return q_counts, known, pos[known], dense
+
+    def scores(self, query: str):
+        """Same scores as tfidf_similarity(query, corpus), in corpus order."""
+        if self._np is None:
+            return self._overlap(query)
+        np = self._np
+        q_counts, known, q_local, dense = self._query(query)
+        if q_counts is None or not self.size:
+            return np.zeros(self.size)
+        n_docs = self.size + 1
+        in_query = dense[self._terms] > 0
+        idf = np.log((1.0 + n_docs) / (1.0 + self._entry_df + in_query)) + 1.0
+        weights = self._counts * idf
+        norms = np.sqrt(np.bincount(self._owner, weights=weights * weights, minlength=self.size))
+        q_df = np.ones(len(q_counts))
+        q_df[known] += self._df[q_local]
+        q_weights = q_counts * (np.log((1.0 + n_docs) / (1.0 + q_df)) + 1.0)
+        q_dense = np.zeros(len(dense), dtype=np.float64)
+        q_dense[q_local] = q_weights[known]
+        dots = np.bincount(self._owner, weights=weights * q_dense[self._terms], minlength=self.size)
+        denom = norms * math.sqrt(float(q_weights @ q_weights))
+        return np.divide(dots, denom, out=np.zeros(self.size), where=denom > 0)
+
+    def pair_scores(self, query: str):
+        """Each document scored on its own against the query, as tfidf_similarity(query, [doc]) would."""
+        if self._np is None:
+            return self._overlap(query)
+        np = self._np
+        q_counts, _, _, dense = self._query(query)
+        if q_counts is None or not self.size:
+            return np.zeros(self.size)
+        shared = dense[self._terms]
+        in_query = shared > 0
+        weights = self._counts * np.where(in_query, 1.0, _PAIR_IDF)
+        norms = np.sqrt(np.bincount(self._owner, weights=weights * weights, minlength=self.size))
+        dots = np.bincount(self._owner, weights=shared * self._counts, minlength=self.size)
+        # Query norm per pair: shared terms have idf 1, the rest _PAIR_IDF
+        q_full = float(q_counts @ q_counts) * _PAIR_IDF * _PAIR_IDF
+        q_shared = np.bincount(self._owner, weights=shared * shared, minlength=self.size)
+        q_norms = np.sqrt(np.maximum(q_full - q_shared * (_PAIR_IDF * _PAIR_IDF - 1.0), 0.0))
+        denom = norms * q_norms
+        return np.divide(dots, denom, out=np.zeros(self.size), where=denom > 0)
+
+    def _overlap(self, query: str) -> List[float]:
+        q = token_set(query)
         scores = []
-        q = set(query.lower().split())
-        for i, doc in enumerate(corpus):
-            d = set(doc.lower().split())
+        for d in self._sets:
             inter = len(q & d)
             denom = len(q) + len(d) - inter or 1
-            scores.append((i, inter / denom))
-        return sorted(scores, key=lambda x: x[1], reverse=True)
+            scores.append(inter / denom)
+        return scores
+
+
+_cache: Dict[str, Tuple[object, SimilarityIndex]] = {}
+_cache_lock = threading.Lock()
 
+
+def cached_index(
+    name: str, key: object, docs_factory: Callable[[], Tuple[Sequence[object], Sequence[str]]]
+) -> SimilarityIndex:
+    """Index for `name`, rebuilt only when `key` (a hashable snapshot of its corpus) changes.
+
+    docs_factory returns the (ids, texts) to index.
+    """
+    with _cache_lock:
+        entry = _cache.get(name)
+        if entry and entry[0] == key:
+            return entry[1]
+    ids, texts = docs_factory()
+    index = SimilarityIndex(texts, ids)
+    with _cache_lock:
+        _cache[name] = (key, index)
+    return index
+
+
+def rank_top_k(scores, k: int, min_score: Optional[float] = None) -> List[Tuple[int, float]]:
+    """The k best (index, score) pairs above min_score, best first, ties by index."""
+    if k <= 0:
+        return []
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+    if np is None:
+        pairs = ((-float(s), i) for i, s in enumerate(scores) if min_score is None or s > min_score)
+        return [(i, -s) for s, i in heapq.nsmallest(k, pairs)]
+    s = np.asarray(scores, dtype=np.float64)
+    cand = np.arange(len(s)) if min_score is None else np.flatnonzero(s > min_score)
+    if k < len(cand):
+        vals = s[cand]
+        kth = vals[np.argpartition(-vals, k - 1)[k - 1]]
+        above = cand[vals > kth]
+        cand = np.concatenate([above, cand[vals == kth][: k - len(above)]])
+    order = np.lexsort((cand, -s[cand]))
+    return [(int(cand[j]), float(s[cand[j]])) for j in order]
+
+
+def top_k_similar(
+    query: str, index: Union[SimilarityIndex, Sequence[str]], k: int, min_score: Optional[float] = None
+) -> List[Tuple[int, float]]:
+    """Top-k corpus documents for `query` without sorting the whole corpus."""
+    if not isinstance(index, SimilarityIndex):
+        index = SimilarityIndex(index)
+    return rank_top_k(index.scores(query), k, min_score)
+
+
+def tfidf_similarity(query: str, corpus: List[str]) -> List[Tuple[int, float]]:
+    return rank_top_k(SimilarityIndex(corpus).scores(query), len(corpus))
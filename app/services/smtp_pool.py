@@ -0,0 +1,228 @@
+import logging
+import queue
+import smtplib
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from email.message import Message
+from typing import Dict, Iterable, List, Optional
+from ..core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+# Errors after which the connection is unusable and must be reopened
+_RECONNECT_ERRORS = (smtplib.SMTPServerDisconnected, TimeoutError, ConnectionError)
+
+
+@dataclass
+class PoolStats:
+    connections_opened: int = 0
+    reconnects: int = 0
+    sent: int = 0
+    failed: int = 0
+    latencies: List[float] = field(default_factory=list)
+
+
+@dataclass
+class SendResult:
+    """Outcome of one send; falsy when the message was not delivered."""
+
+    ok: bool
+    code: Optional[int] = None  # SMTP reply code of the failure; None for connection errors
+    error: str = ""  # server reply (or exception) behind the failure
+
+    @property
+    def permanent(self) -> bool:
+        """5xx replies (unknown mailbox, policy rejection): retrying will not help."""
+        return self.code is not None and 500 <= self.code < 600
+
+    def __bool__(self) -> bool:
+        return self.ok
+
+
+def _reply_text(code: int, message) -> str:
+    if isinstance(message, bytes):
+        message = message.decode("utf-8", "replace")
+    return f"{code} {message}".strip()
+
+
+@dataclass
+class _Connection:
+    server: smtplib.SMTP
+    used: int = 0
+
+
+class SMTPConnectionPool:
+    """A small pool of authenticated SMTP connections reused for many messages.
+
+    Connections are opened lazily (up to `size`), recycled after
+    `max_messages_per_connection` messages, and reopened transparently when
+    the server drops them (421, timeouts, disconnects).
+    """
+
+    def __init__(
+        self,
+        host: str,
+        port: int,
+        username: str = "",
+        password: str = "",
+        size: int = 4,
+        timeout: float = 30.0,
+        max_messages_per_connection: int = 100,
+        use_starttls: bool = True,
+    ):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.size = max(1, size)
+        self.timeout = timeout
+        self.max_messages_per_connection = max(1, max_messages_per_connection)
+        self.use_starttls = use_starttls
+        self.stats = PoolStats()
+        self._idle: "queue.LifoQueue[_Connection]" = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls, size: Optional[int] = None) -> Optional["SMTPConnectionPool"]:
+        """Build a pool from SMTP settings; None when SMTP is not configured."""
+        settings = get_settings()
+        if not all([settings.smtp_server, settings.smtp_port, settings.smtp_username, settings.smtp_password]):
+            return None
+        return cls(
+            settings.smtp_server,
+            settings.smtp_port,
+            settings.smtp_username,
+            settings.smtp_password,
+            size=size or settings.smtp_pool_size,
+            timeout=settings.smtp_timeout,
+            max_messages_per_connection=settings.smtp_max_messages_per_connection,
+            use_starttls=settings.smtp_starttls,
+        )
+
+    def _connect(self) -> _Connection:
+        server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        server.ehlo()
+        if self.use_starttls:
+            server.starttls()
+            server.ehlo()
+        if self.username:
+            server.login(self.username, self.password)
+        with self._lock:
+            self.stats.connections_opened += 1
+        return _Connection(server)
+
+    def _discard(self, conn: Optional[_Connection]) -> None:
+        if conn is None:
+            return
+        try:
+            conn.server.quit()
+        except Exception:
+            try:
+                conn.server.close()
+            except Exception:
+                pass
+
+    def _acquire(self) -> Optional[_Connection]:
+        self._slots.acquire()
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            return None
+
+    def _release(self, conn: Optional[_Connection]) -> None:
+        if conn is not None:
+            if conn.used >= self.max_messages_per_connection:
+                self._discard(conn)
+            else:
+                self._idle.put(conn)
+        self._slots.release()
+
+    def send(self, msg: Message, retries: int = 1) -> SendResult:
+        """Send one message on a pooled connection, reconnecting on 421/timeouts.
+
+        A failed result carries the server's reply code and text, so callers
+        can tell permanent (5xx) rejections from transient ones.
+        """
+        conn = self._acquire()
+        failure = SendResult(False)
+        try:
+            for attempt in range(retries + 1):
+                try:
+                    if conn is None:
+                        conn = self._connect()
+                    start = time.perf_counter()
+                    conn.server.send_message(msg)
+                    conn.used += 1
+                    with self._lock:
+                        self.stats.sent += 1
+                        self.stats.latencies.append(time.perf_counter() - start)
+                    return SendResult(True)
+                except _RECONNECT_ERRORS as exc:
+                    reason = exc
+                    failure = SendResult(False, None, str(exc) or type(exc).__name__)
+                except smtplib.SMTPResponseException as exc:
+                    failure = SendResult(False, exc.smtp_code, _reply_text(exc.smtp_code, exc.smtp_error))
+                    if exc.smtp_code != 421:
+                        # Recipient/content rejected; the session itself is still usable
+                        logger.warning("SMTP rejected message to %s: %s", msg.get("To"), failure.error)
+                        self._reset(conn)
+                        break
+                    reason = exc
+                except smtplib.SMTPRecipientsRefused as exc:
+                    code, message = next(iter(exc.recipients.values()), (None, str(exc)))
+                    failure = SendResult(False, code, _reply_text(code, message) if code else str(message))
+                    logger.warning("SMTP refused recipients %s: %s", list(exc.recipients), failure.error)
+                    self._reset(conn)
+                    break
+                except Exception as exc:
+                    failure = SendResult(False, None, str(exc) or type(exc).__name__)
+                    logger.warning("SMTP send to %s failed: %s", msg.get("To"), exc)
+                    self._discard(conn)
+                    conn = None
+                    break
+                self._discard(conn)
+                conn = None
+                if attempt < retries:
+                    with self._lock:
+                        self.stats.reconnects += 1
+                    logger.info("Reconnecting SMTP after: %s", reason)
+                else:
+                    logger.warning("SMTP send to %s failed after reconnect: %s", msg.get("To"), reason)
+            with self._lock:
+                self.stats.failed += 1
+            return failure
+        finally:
+            self._release(conn)
+
+    def _reset(self, conn: Optional[_Connection]) -> None:
+        if conn is None:
+            return
+        try:
+            conn.server.rset()
+        except Exception:
+            pass
+
+    def send_many(self, messages: Iterable[Message]) -> Dict[str, int]:
+        """Send messages concurrently over at most `size` connections."""
+        results = {"sent": 0, "failed": 0}
+        with ThreadPoolExecutor(max_workers=self.size) as ex:
+            for ok in ex.map(self.send, messages):
+                results["sent" if ok else "failed"] += 1
+        return results
+
+    def close(self) -> None:
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def __enter__(self) -> "SMTPConnectionPool":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
@@ -75,7 +75,7 @@ def _textrank(text: str, max_sentences: int = 7) -> str:
     return lead
 
 
-def _hf_generate(prompt: str, model_url: Optional[str] = None, max_new_tokens: int = 320) -> Optional[str]:
+def _hf_generate(prompt: str, model_url: Optional[str] = None, max_new_tokens: int = 320, timeout: float = 20.0) -> Optional[str]:
     # Default to a summarization-specialized model
     url = model_url or os.getenv(
         "HF_SUMMARY_MODEL_URL",
@@ -86,7 +86,7 @@ def _hf_generate(prompt: str, model_url: Optional[str] = None, max_new_tokens: i
     if token:
         headers["Authorization"] = f"Bearer {token}"
     try:
-        with httpx.Client(timeout=20.0) as client:
+        with httpx.Client(timeout=timeout) as client:
             r = client.post(url, headers=headers, json={"inputs": prompt, "parameters": {"max_new_tokens": max_new_tokens}})
             if r.status_code == 200:
                 data = r.json()
@@ -121,10 +121,19 @@ def summarize_text(text: str, max_sentences: int = 7) -> str:
     return _textrank(text, max_sentences=max_sentences)
 
 
-def summarize_news_article(title: str, text: str, url: Optional[str] = None) -> str:
-    """News-specific summary in the requested format (title + key points)."""
-    backend = os.getenv("SUMMARIZER_BACKEND", "textrank").lower()
-    if backend == "hf":
+def uses_llm() -> bool:
+    return os.getenv("SUMMARIZER_BACKEND", "textrank").lower() == "hf"
+
+
+def summarize_news_article(
+    title: str, text: str, url: Optional[str] = None, allow_llm: bool = True, timeout: float = 20.0
+) -> str:
+    """News-specific summary in the requested format (title + key points).
+
+    allow_llm=False forces the local TextRank path (used when a build is
+    short on time); timeout caps the HF request.
+    """
+    if allow_llm and uses_llm():
         prompt = (
             f"Title: {title}\nURL: {url or ''}\n\n"
             "Summarize into 5-8 concise bullets with a short title.\n"
@@ -132,7 +141,7 @@ def summarize_news_article(title: str, text: str, url: Optional[str] = None) ->
             "Each bullet must be a complete, fact-based sentence ending with a period. Avoid repetition.\n\n"
             f"Article:\n{text[:6000]}"
         )
-        resp = _hf_generate(prompt, max_new_tokens=360)
+        resp = _hf_generate(prompt, max_new_tokens=360, timeout=timeout)
         if resp:
             return _to_bullets(resp, None)
     # Fallback: TextRank → bulletize
@@ -1,15 +1,27 @@
+import hashlib
 import json
 import os
 import logging
+import threading
+import uuid
+from collections import OrderedDict
+from dataclasses import dataclass
 from datetime import date
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 import random
 import httpx
 from sqlmodel import Session, select
-from ..models.content import Capsule, SyllabusTopic
+from ..models.content import SyllabusTopic
 from ..models.tests import GeneratedTest
 from ..models.user import TestResult
 from ..core.config import get_settings
+from ..core.db import ensure_schema
+from .capsule_store import load_capsule_items
+from .distractors import DistractorPools, distractor_pools, refresh_distractor_pools, seeded_rng, topic_option
+from .item_stats import distractor_rates, item_analysis
+from .quiz_responses import drop_quiz_responses, latest_responses, queue_responses
+from .revision import track_quiz_answers
+from .user_stats import get_user_stats, history_from_stats, record_result
 
 
 logger = logging.getLogger(__name__)
@@ -20,24 +32,21 @@ def _default_quiz_name(d: date | None = None) -> str:
     return f"Daily Quiz - {today.isoformat()}"
 
 
-def _build_questions_from_capsule(capsule: Dict[str, Any], all_topics: List[Dict[str, str]]) -> List[Dict[str, Any]]:
+def _build_questions_from_capsule(
+    capsule: Dict[str, Any],
+    all_topics: List[Dict[str, str]],
+    distractor_rates: Optional[Dict[str, float]] = None,
+    pools: Optional[DistractorPools] = None,
+) -> List[Dict[str, Any]]:
     """Deterministic MCQs from capsule with sensible syllabus options.
 
     - Correct option = top-mapped syllabus topic from the item
-    - Distractors = other plausible topics (different papers or related areas)
+    - Distractors = sampled from the correct topic's precomputed neighbour pool
+      (similar topics, same paper preferred), weighted towards options learners
+      pick when `distractor_rates` is given; seeded per capsule item
     """
     questions: List[Dict[str, Any]] = []
-
-    def _topic_str(paper: str, topic: str) -> str:
-        p = (paper or "GS").strip()
-        t = (topic or "Syllabus").strip()
-        return f"{p}: {t}"
-
-    # Pre-build a pool of topic strings for distractors
-    pool: List[str] = []
-    for t in all_topics:
-        pool.append(_topic_str(t.get("paper", "GS"), t.get("topic", "")))
-    pool = list(dict.fromkeys(pool))  # unique
+    pools = pools or distractor_pools(all_topics)
 
     for item in capsule.get("items", [])[:10]:
         title = item.get("title") or "Current Affairs"
@@ -46,19 +55,13 @@ def _build_questions_from_capsule(capsule: Dict[str, Any], all_topics: List[Dict
         if mapped:
             # pick highest score mapping as correct
             best = sorted(mapped, key=lambda x: float(x.get("score", 0.0)), reverse=True)[0]
-            correct_text = _topic_str(best.get("paper", "GS"), best.get("topic", ""))
+            correct_text = topic_option(best.get("paper", "GS"), best.get("topic", ""))
         else:
             correct_text = "GS2: Polity & Governance"
-        # pick 3 distractors different from correct
-        distractors: List[str] = []
-        for cand in pool:
-            if cand != correct_text and cand not in distractors:
-                distractors.append(cand)
-            if len(distractors) >= 3:
-                break
-        options = [correct_text] + distractors
+        rng = seeded_rng(capsule.get("date", ""), item.get("url") or title, correct_text)
+        options = [correct_text] + pools.pick(correct_text, rng, 3, distractor_rates)
         # shuffle and compute correct index
-        random.shuffle(options)
+        rng.shuffle(options)
         ans_index = options.index(correct_text)
         stem = f"Which syllabus mapping best fits: {title}?"
         questions.append({
@@ -166,91 +169,262 @@ def _generate_questions_with_llm(capsule: Dict[str, Any]) -> List[Dict[str, Any]
         return []
 
 
-def generate_daily_quiz(session: Session, force: bool = False) -> Dict[str, Any]:
-    today_str = date.today().isoformat()
-    existing = session.exec(
-        select(GeneratedTest).where(GeneratedTest.date == today_str, GeneratedTest.name == _default_quiz_name())
+def _syllabus_topics(session: Session) -> List[Dict[str, str]]:
+    return [
+        {"paper": t.paper, "topic": t.topic, "keywords": t.keywords or ""}
+        for t in (session.exec(select(SyllabusTopic)).all() or [])
+    ]
+
+
+def warm_distractor_pools(session: Session) -> DistractorPools:
+    """Rebuild the distractor pools if the syllabus changed (startup and scheduler jobs only)."""
+    return refresh_distractor_pools(_syllabus_topics(session))
+
+
+def _find_quiz(session: Session, day: str) -> Optional[GeneratedTest]:
+    ensure_schema()
+    return session.exec(
+        select(GeneratedTest).where(GeneratedTest.date == day, GeneratedTest.name == _default_quiz_name(date.fromisoformat(day)))
     ).first()
+
+
+def _quiz_payload(test: GeneratedTest) -> Dict[str, Any]:
+    return {"id": test.id, "date": test.date, "name": test.name, "questions": json.loads(test.questions_json)}
+
+
+def generate_daily_quiz(
+    session: Session, force: bool = False, day: Optional[str] = None, use_llm: bool = True
+) -> Dict[str, Any]:
+    today_str = day or date.today().isoformat()
+    existing = _find_quiz(session, today_str)
     if existing and not force:
-        return {"date": existing.date, "name": existing.name, "questions": json.loads(existing.questions_json)}
+        return _quiz_payload(existing)
     if existing and force:
+        drop_quiz_responses(session, existing.id)
         session.delete(existing)
         session.commit()
 
-    cap = session.exec(select(Capsule).where(Capsule.date == today_str)).first()
-    capsule_obj: Dict[str, Any]
-    if cap:
-        try:
-            capsule_obj = {"date": cap.date, "items": json.loads(cap.items_json)}
-        except Exception:
-            capsule_obj = {"date": cap.date, "items": []}
-    else:
-        capsule_obj = {"date": today_str, "items": []}
+    items = load_capsule_items(session, [today_str]).get(today_str, [])
+    capsule_obj: Dict[str, Any] = {"date": today_str, "items": items}
 
     # Try LLM-based first, fallback to rule-based mapping-driven MCQs
-    questions = _generate_questions_with_llm(capsule_obj)
+    questions = _generate_questions_with_llm(capsule_obj) if use_llm else []
     if not questions:
-        all_topics: List[Dict[str, str]] = [
-            {"paper": t.paper, "topic": t.topic} for t in (session.exec(select(SyllabusTopic)).all() or [])
-        ]
-        questions = _build_questions_from_capsule(capsule_obj, all_topics)
-    payload = {"date": today_str, "name": _default_quiz_name(), "questions": questions}
-    record = GeneratedTest(date=today_str, name=payload["name"], questions_json=json.dumps(questions))
+        all_topics = _syllabus_topics(session)
+        rates = distractor_rates(session, (topic_option(t["paper"], t["topic"]) for t in all_topics))
+        questions = _build_questions_from_capsule(capsule_obj, all_topics, rates)
+    name = _default_quiz_name(date.fromisoformat(today_str))
+    record = GeneratedTest(date=today_str, name=name, questions_json=json.dumps(questions), version=uuid.uuid4().hex)
     session.add(record)
     session.commit()
     session.refresh(record)
-    return payload
+    return {"id": record.id, "date": today_str, "name": name, "questions": questions}
 
 
-def record_test_result(session: Session, user_id: int, test_name: str, answers: List[int]) -> Dict[str, Any]:
-    today_str = date.today().isoformat()
-    test = session.exec(
-        select(GeneratedTest).where(GeneratedTest.date == today_str, GeneratedTest.name == test_name)
-    ).first()
-    if not test:
-        return {"success": False, "detail": "Test not found"}
-    try:
-        questions = json.loads(test.questions_json)
-    except Exception:
-        questions = []
-    total = len(questions)
-    correct = 0
+def pregenerate_daily_quiz(session: Session, day: Optional[str] = None) -> Dict[str, Any]:
+    """Build the day's quiz ahead of its first request; run by the scheduler after the capsule build.
+
+    A quiz that already has questions is kept (users may be answering it);
+    an empty one, stored before the capsule existed, is rebuilt.
+    """
+    today_str = day or date.today().isoformat()
+    warm_distractor_pools(session)
+    existing = _find_quiz(session, today_str)
+    if existing and json.loads(existing.questions_json or "[]"):
+        return _quiz_payload(existing)
+    return generate_daily_quiz(session, force=bool(existing), day=today_str)
+
+
+def _order_key() -> bytes:
+    # blake2b keys are at most 64 bytes; hash the secret down to 32
+    return hashlib.sha256(get_settings().secret_key.encode()).digest()
+
+
+def option_order(user_id: int, quiz_id: int, index: int, n: int) -> List[int]:
+    """Original option indexes in the order a user sees them, derived from (user_id, quiz_id).
+
+    Keyed with the server secret so the order cannot be recomputed from public ids.
+    """
+    seed = hashlib.blake2b(f"{quiz_id}:{user_id}:{index}".encode(), digest_size=8, key=_order_key()).digest()
+    order = list(range(n))
+    random.Random(int.from_bytes(seed, "big")).shuffle(order)
+    return order
+
+
+def quiz_for_user(session: Session, user_id: Optional[int]) -> Dict[str, Any]:
+    """Today's quiz with options in the user's own order and no answer key.
+
+    Never calls the LLM: if the scheduler has not built the quiz yet, the
+    rule-based questions are used.
+    """
+    quiz = generate_daily_quiz(session, use_llm=False)
+    questions = []
+    for i, q in enumerate(quiz["questions"]):
+        options = q.get("options", [])
+        order = option_order(user_id, quiz["id"], i, len(options)) if user_id else list(range(len(options)))
+        questions.append({
+            "q": q.get("q"),
+            "context": q.get("context", ""),
+            "options": [options[j] for j in order],
+            "source": q.get("source"),
+        })
+    return {"date": quiz["date"], "name": quiz["name"], "questions": questions}
+
+
+@dataclass(frozen=True)
+class AnswerKey:
+    """Parsed questions and correct options of one quiz version (shared; do not mutate)."""
+
+    test_id: int
+    answers: Tuple[int, ...]
+    questions: Tuple[Dict[str, Any], ...]
+
+
+class _AnswerKeyCache:
+    def __init__(self, maxsize: int = 16):
+        self._maxsize = maxsize
+        self._keys: "OrderedDict[Tuple[int, Optional[str]], AnswerKey]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, session: Session, day: str, name: str) -> Optional[AnswerKey]:
+        ensure_schema()
+        # Only the id and version are read per call; questions_json is parsed once per version
+        row = session.exec(
+            select(GeneratedTest.id, GeneratedTest.version).where(GeneratedTest.date == day, GeneratedTest.name == name)
+        ).first()
+        if not row:
+            return None
+        cache_key = (row[0], row[1])
+        with self._lock:
+            key = self._keys.get(cache_key)
+            if key is not None:
+                self._keys.move_to_end(cache_key)
+                return key
+        test = session.get(GeneratedTest, row[0])
+        try:
+            questions = tuple(json.loads(test.questions_json))
+        except Exception:
+            questions = ()
+        key = AnswerKey(row[0], tuple(int(q.get("answer_index", 0)) for q in questions), questions)
+        with self._lock:
+            self._keys[cache_key] = key
+            while len(self._keys) > self._maxsize:
+                self._keys.popitem(last=False)
+        return key
+
+    def clear(self) -> None:
+        with self._lock:
+            self._keys.clear()
+
+
+_answer_keys = _AnswerKeyCache()
+
+
+def _user_order(key: AnswerKey, user_id: Optional[int], index: int) -> List[int]:
+    n = len(key.questions[index].get("options", []))
+    # Answers index the user's own option order (see quiz_for_user)
+    return option_order(user_id, key.test_id, index, n) if user_id else list(range(n))
+
+
+def _build_review(key: AnswerKey, user_id: Optional[int], picks: List[int]) -> List[Dict[str, Any]]:
     review: List[Dict[str, Any]] = []
-    for i, q in enumerate(questions):
-        ai = int(q.get("answer_index", 0))
-        chosen = answers[i] if i < len(answers) else -1
-        ok = (chosen == ai)
-        if ok:
-            correct += 1
+    for i, q in enumerate(key.questions):
+        order = _user_order(key, user_id, i)
+        options = q.get("options", [])
+        ai = key.answers[i]
+        picked = picks[i] if i < len(picks) else -1
         review.append({
             "index": i,
-            "chosen": chosen,
-            "correct": ai,
-            "ok": ok,
+            "chosen": order.index(picked) if picked in order else -1,
+            "correct": order.index(ai) if ai in order else ai,
+            "ok": picked == ai,
             "explanation": q.get("explanation"),
             "source": q.get("source"),
             "question": q.get("q"),
-            "options": q.get("options", []),
+            "options": [options[j] for j in order],
         })
+    return review
+
+
+def record_test_result(
+    session: Session, user_id: int, test_name: str, answers: List[int], review: bool = True
+) -> Dict[str, Any]:
+    """Grade a submission against the cached answer key.
+
+    Per-question responses are queued for a batched write; with review=False
+    only the score comes back and get_test_review serves the review later.
+    """
+    today_str = date.today().isoformat()
+    key = _answer_keys.get(session, today_str, test_name)
+    if not key:
+        return {"success": False, "detail": "Test not found"}
+    picks: List[int] = []  # answers mapped back to the stored option order
+    for i in range(len(key.questions)):
+        order = _user_order(key, user_id, i)
+        chosen = answers[i] if i < len(answers) else -1
+        picks.append(order[chosen] if 0 <= chosen < len(order) else -1)
+    oks = [p == a for p, a in zip(picks, key.answers)]
+    total = len(key.questions)
+    correct = sum(oks)
     score = round((correct / max(1, total)) * 100, 2)
-    tr = TestResult(user_id=user_id, test_name=test_name, score=score, date=today_str)
-    session.add(tr)
+    result = record_result(session, user_id, test_name, score, today_str)
+    track_quiz_answers(session, user_id, key.test_id, list(key.questions), picks, today_str)
+    session.flush()
+    result_id = result.id
     session.commit()
-    return {"success": True, "score": score, "total": total, "correct": correct, "review": review}
+    queue_responses(result_id, user_id, key.test_id, picks, oks)
+    out: Dict[str, Any] = {"success": True, "score": score, "total": total, "correct": correct, "result_id": result_id}
+    if review:
+        out["review"] = _build_review(key, user_id, picks)
+    return out
+
+
+def get_test_review(session: Session, user_id: int, test_name: str, day: Optional[str] = None) -> Dict[str, Any]:
+    """Review of the user's latest submission of a quiz, rebuilt from the stored responses."""
+    key = _answer_keys.get(session, day or date.today().isoformat(), test_name)
+    if not key:
+        return {"success": False, "detail": "Test not found"}
+    responses = latest_responses(session, user_id, key.test_id)
+    if responses is None:
+        return {"success": False, "detail": "No submission found"}
+    picks = [responses.get(i, -1) for i in range(len(key.questions))]
+    review = _build_review(key, user_id, picks)
+    correct = sum(1 for r in review if r["ok"])
+    total = len(review)
+    return {
+        "success": True,
+        "score": round((correct / max(1, total)) * 100, 2),
+        "total": total,
+        "correct": correct,
+        "review": review,
+    }
+
+
+def get_item_analysis(session: Session, test_name: str, day: Optional[str] = None) -> Dict[str, Any]:
+    """Per-question difficulty and discrimination of a quiz, read from the running counters."""
+    key = _answer_keys.get(session, day or date.today().isoformat(), test_name)
+    if not key:
+        return {"success": False, "detail": "Test not found"}
+    return {"success": True, "name": test_name, "questions": item_analysis(session, key.test_id)}
 
 
 def get_progress_summary(session: Session, user_id: int) -> Dict[str, Any]:
-    tests = session.exec(select(TestResult).where(TestResult.user_id == user_id)).all() or []
-    if not tests:
+    stats = get_user_stats(session, user_id)
+    if not stats.tests_count:
         return {"tests": 0, "average": 0.0}
-    avg = sum(t.score for t in tests) / len(tests)
-    return {"tests": len(tests), "average": round(avg, 2)}
+    avg = stats.score_sum / stats.tests_count
+    return {"tests": stats.tests_count, "average": round(avg, 2)}
 
 
 def get_test_history(session: Session, user_id: int, limit: int = 20) -> List[Dict[str, Any]]:
-    rows = session.exec(select(TestResult).where(TestResult.user_id == user_id)).all() or []
-    rows = rows[-limit:]
+    rows = history_from_stats(get_user_stats(session, user_id), limit)
+    if rows is not None:
+        return rows
+    # Longer than the inline window: newest rows by id, returned oldest first
+    recent = session.exec(
+        select(TestResult).where(TestResult.user_id == user_id).order_by(TestResult.id.desc()).limit(limit)
+    ).all()
     return [
         {"date": r.date, "score": r.score, "test_name": r.test_name}
-        for r in rows
+        for r in reversed(recent)
     ]
@@ -0,0 +1,118 @@
+import hashlib
+import re
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, FrozenSet, List
+
+try:
+    from sklearn.feature_extraction.text import ENGLISH_STOP_WORDS as STOP_WORDS  # type: ignore
+except Exception:  # pragma: no cover - sklearn is a listed dependency
+    STOP_WORDS = frozenset(
+        "a about after all also an and any are as at be been but by can could for from had has have he her his i"
+        " if in into is it its may more most no not of on or our she so such than that the their them then there"
+        " these they this to was we were what when which who will with would you your".split()
+    )
+
+# Same token rule as TfidfVectorizer's default, so scores keep their old shape
+_TOKEN_RE = re.compile(r"(?u)\b\w\w+\b")
+
+
+class Vocabulary:
+    """Process-wide token <-> integer id table shared by every scorer."""
+
+    def __init__(self):
+        self._ids: Dict[str, int] = {}
+        self._tokens: List[str] = []
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+    def ids(self, tokens: List[str]) -> array:
+        out = array("I")
+        with self._lock:
+            for tok in tokens:
+                i = self._ids.get(tok)
+                if i is None:
+                    i = self._ids[tok] = len(self._tokens)
+                    self._tokens.append(tok)
+                out.append(i)
+        return out
+
+    def token(self, token_id: int) -> str:
+        return self._tokens[token_id]
+
+
+VOCAB = Vocabulary()
+
+
+def normalize_tokens(text: str) -> List[str]:
+    """Lowercased word tokens with English stop words removed."""
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOP_WORDS]
+
+
+class _DocCache:
+    """Bounded LRU of token ids keyed by a content hash, i.e. per document version."""
+
+    def __init__(self, maxsize: int = 20000):
+        self._maxsize = maxsize
+        self._ids: "OrderedDict[bytes, array]" = OrderedDict()
+        self._sets: Dict[bytes, FrozenSet[int]] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def key(text: str) -> bytes:
+        return hashlib.sha1((text or "").encode("utf-8")).digest()
+
+    def get(self, key: bytes):
+        with self._lock:
+            ids = self._ids.get(key)
+            if ids is not None:
+                self._ids.move_to_end(key)
+            return ids
+
+    def put(self, key: bytes, ids: array) -> None:
+        with self._lock:
+            self._ids[key] = ids
+            self._ids.move_to_end(key)
+            while len(self._ids) > self._maxsize:
+                old, _ = self._ids.popitem(last=False)
+                self._sets.pop(old, None)
+
+    def token_set(self, key: bytes, ids: array) -> FrozenSet[int]:
+        with self._lock:
+            s = self._sets.get(key)
+            if s is None and key in self._ids:
+                s = self._sets[key] = frozenset(ids)
+        return s if s is not None else frozenset(ids)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._ids.clear()
+            self._sets.clear()
+
+
+_docs = _DocCache()
+
+
+def token_ids(text: str) -> array:
+    """Token ids of `text`, tokenized once per distinct content and shared afterwards.
+
+    The returned array is shared; callers must not mutate it.
+    """
+    key = _DocCache.key(text)
+    ids = _docs.get(key)
+    if ids is None:
+        ids = VOCAB.ids(normalize_tokens(text))
+        _docs.put(key, ids)
+    return ids
+
+
+def token_set(text: str) -> FrozenSet[int]:
+    """Distinct token ids of `text` (for overlap scores), cached alongside token_ids."""
+    return _docs.token_set(_DocCache.key(text), token_ids(text))
+
+
+def clear_token_cache() -> None:
+    _docs.clear()
@@ -0,0 +1,109 @@
+import json
+from collections import Counter
+from datetime import datetime
+from typing import Dict, List, Optional, Tuple
+from sqlalchemy import func
+from sqlmodel import Session, select
+from ..core.db import ensure_schema
+from ..models.content import SyllabusTopic
+from ..models.user import TestResult, UserStats
+from .keywords import syllabus_matcher
+
+RECENT_LIMIT = 20  # results kept inline for history reads
+WEAK_WINDOW = 8  # results that feed the weak-topic weights
+
+
+def _weight(score: float) -> float:
+    return 1.5 if score < 50 else (1.0 if score < 70 else 0.5)
+
+
+def _infer_weak_topics(test_name: str, syllabus: List[SyllabusTopic]) -> List[str]:
+    # Topic names and their comma-separated keywords, compiled once per syllabus version
+    return syllabus_matcher(syllabus).labels(test_name or "")
+
+
+def _weak_topics(recent: List[Dict], syllabus: List[SyllabusTopic]) -> Dict[str, float]:
+    counts: Counter = Counter()
+    for r in recent[-WEAK_WINDOW:]:
+        for topic in _infer_weak_topics(r.get("test_name") or "", syllabus):
+            counts[topic] += _weight(float(r.get("score") or 0.0))
+    return dict(counts)
+
+
+def recent_results(stats: UserStats) -> List[Dict]:
+    """Latest results, oldest first, as {"date", "score", "test_name"}."""
+    return json.loads(stats.recent_json or "[]")
+
+
+def weak_topic_weights(stats: UserStats) -> Counter:
+    return Counter(json.loads(stats.weak_json or "{}"))
+
+
+def _apply(session: Session, stats: UserStats, results: List[TestResult]) -> None:
+    recent = recent_results(stats)
+    for r in results:
+        stats.tests_count += 1
+        stats.score_sum += float(r.score)
+        recent.append({"date": r.date, "score": r.score, "test_name": r.test_name})
+    recent = recent[-RECENT_LIMIT:]
+    stats.recent_json = json.dumps(recent)
+    stats.weak_json = json.dumps(_weak_topics(recent, session.exec(select(SyllabusTopic)).all()))
+    stats.updated_at = datetime.now().isoformat(timespec="seconds")
+    session.add(stats)
+
+
+def record_result(session: Session, user_id: int, test_name: str, score: float, day: str) -> TestResult:
+    """Add a TestResult and fold it into the user's aggregates; the caller commits both together."""
+    ensure_schema()
+    stats = get_user_stats(session, user_id)
+    tr = TestResult(user_id=user_id, test_name=test_name, score=score, date=day)
+    session.add(tr)
+    _apply(session, stats, [tr])
+    return tr
+
+
+def rebuild_user_stats(session: Session, user_id: int) -> UserStats:
+    """Recompute a user's aggregates from their TestResult rows; the caller commits."""
+    stats = session.get(UserStats, user_id) or UserStats(user_id=user_id)
+    stats.tests_count, stats.score_sum, stats.recent_json = 0, 0.0, "[]"
+    results = session.exec(select(TestResult).where(TestResult.user_id == user_id).order_by(TestResult.id)).all()
+    _apply(session, stats, list(results))
+    return stats
+
+
+def get_user_stats(session: Session, user_id: int) -> UserStats:
+    """The user's aggregate row, built from TestResult the first time it is needed."""
+    ensure_schema()
+    stats = session.get(UserStats, user_id)
+    if stats is None:
+        stats = rebuild_user_stats(session, user_id)
+        session.commit()
+    return stats
+
+
+def score_totals(session: Session) -> Tuple[int, float]:
+    """(tests recorded, sum of scores) across all users."""
+    ensure_schema()
+    count, total = session.exec(select(func.sum(UserStats.tests_count), func.sum(UserStats.score_sum))).one()
+    return int(count or 0), float(total or 0.0)
+
+
+def backfill_user_stats(session: Session) -> int:
+    """Aggregate users whose results predate UserStats; returns how many."""
+    ensure_schema()
+    done = select(UserStats.user_id)
+    pending = session.exec(select(TestResult.user_id).where(TestResult.user_id.not_in(done)).distinct()).all()
+    for user_id in pending:
+        rebuild_user_stats(session, user_id)
+    session.commit()
+    return len(pending)
+
+
+def history_from_stats(stats: Optional[UserStats], limit: int) -> Optional[List[Dict]]:
+    """History served from the inline results, or None when more rows are needed."""
+    if stats is None:
+        return []
+    recent = recent_results(stats)
+    if limit <= len(recent) or len(recent) >= stats.tests_count:
+        return recent[-limit:] if limit > 0 else []
+    return None
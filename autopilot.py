@@ -27,8 +27,8 @@ from apscheduler.triggers.cron import CronTrigger
 sys.path.append(os.path.dirname(os.path.abspath(__file__)))
 
 from app.core.config import get_settings
-from app.core.db import engine
-from sqlmodel import SQLModel, Session, select
+from app.core.db import engine, ensure_schema
+from sqlmodel import Session, select
 
 
 logger = logging.getLogger("autopilot")
@@ -43,13 +43,25 @@ def _configure_logging() -> None:
 
 
 def _init_db() -> None:
-    from app.services.bootstrap import seed_basics
+    from app.services.bootstrap import (
+        aggregate_user_stats,
+        ensure_precomputed_links,
+        ensure_unique_capsule_dates,
+        normalize_stored_capsules,
+        seed_basics,
+    )
     # Import models to register with SQLModel
     from app.models import user as _mu  # noqa: F401
     from app.models import content as _mc  # noqa: F401
     from app.models import tests as _mt  # noqa: F401
-    SQLModel.metadata.create_all(engine)
+    from app.models import outbox as _mo  # noqa: F401
+    from app.models import lease as _ml  # noqa: F401
+    ensure_schema()
+    ensure_unique_capsule_dates()
+    normalize_stored_capsules()
     seed_basics()
+    ensure_precomputed_links()
+    aggregate_user_stats()
     logger.info("Database initialized and seeded")
 
 
@@ -76,9 +88,10 @@ def _start_server() -> subprocess.Popen:
 
 def _schedule_jobs(sched: BackgroundScheduler) -> None:
     from app.agents.orchestrator import run_full_agentic_pipeline
-    from app.services.tests import generate_daily_quiz
+    from app.services.tests import pregenerate_daily_quiz
+    from app.services.notifier import generate_weekly_report_html
     from app.services.reports import build_weekly_report
-    from app.services.notifier import send_bulk_html_emails
+    from app.services.outbox import drain_outbox, enqueue_campaign
     from app.models.user import User
 
     settings = get_settings()
@@ -86,10 +99,24 @@ def _schedule_jobs(sched: BackgroundScheduler) -> None:
     def job_pipeline():
         run_full_agentic_pipeline()
 
+    def job_capsule_refresh():
+        from app.agents.mapping_agent import MappingAgent
+        from app.agents.news_agent import NewsAgent
+        from app.services.capsules import build_daily_capsule
+
+        for agent in (NewsAgent(), MappingAgent()):
+            result = agent.run()
+            logger.info("[%s] %s: %s", "OK" if result.success else "FAIL", result.name, result.detail)
+        with Session(engine) as session:
+            capsule = build_daily_capsule(session, refresh=True)
+            # Fills in the quiz if it was still empty; a quiz with questions is kept
+            pregenerate_daily_quiz(session, capsule.get("date"))
+        logger.info("Capsule refreshed: %d items", len(capsule.get("items", [])))
+
     def job_quiz():
         # ensure a quiz exists for today
         with Session(engine) as session:
-            payload = generate_daily_quiz(session)
+            payload = pregenerate_daily_quiz(session)
             logger.info("Daily quiz prepared: %s with %d questions", payload.get("name"), len(payload.get("questions", [])))
 
     def job_weekly_report():
@@ -99,24 +126,17 @@ def _schedule_jobs(sched: BackgroundScheduler) -> None:
                 select(User.email).where(User.weekly_report_subscribed == True, User.is_active == True)  # type: ignore
             ).all()
             recipients = [e for (e,) in subs] if subs and isinstance(subs[0], tuple) else list(subs)
-            items = "".join(
-                [
-                    f"<li><a href='{h.get('url')}'>{h.get('title')}</a> <small>({h.get('date')})</small></li>"
-                    for h in report.get("highlights", [])
-                ]
-            )
-            html = (
-                f"<h2>Weekly UPSC Highlights ({report['week_start']} to {report['week_end']})</h2>"
-                f"<p><strong>Tests recorded:</strong> {report['progress']['tests_recorded']} | "
-                f"<strong>Average score:</strong> {report['progress']['average_score']}</p>"
-                f"<ol>{items}</ol>"
-                f"<p>— CivicBriefs.ai</p>"
+            html = generate_weekly_report_html(report)
+            queued = enqueue_campaign(
+                session, f"weekly:{report['week_end']}", f"Weekly UPSC Report ({report['week_end']})", html, recipients
             )
-            res = send_bulk_html_emails(recipients, f"Weekly UPSC Report ({report['week_end']})", html)
-            logger.info("Weekly report sent: %s", res)
+            logger.info("Weekly report queued: %s", queued)
+        logger.info("Weekly report delivery: %s", drain_outbox())
 
     # Pipeline daily
     sched.add_job(job_pipeline, CronTrigger.from_crontab(settings.schedule_cron_daily), id="daily_pipeline", replace_existing=True)
+    if settings.schedule_cron_capsule_refresh:
+        sched.add_job(job_capsule_refresh, CronTrigger.from_crontab(settings.schedule_cron_capsule_refresh), id="capsule_refresh", replace_existing=True)
     # Daily quiz
     sched.add_job(job_quiz, CronTrigger.from_crontab(settings.schedule_cron_quiz), id="daily_quiz", replace_existing=True)
     # Weekly report
@@ -109,10 +109,26 @@ window.addEventListener('DOMContentLoaded', ()=>{
     const {ok,data} = await api('/capsule/daily');
     if(ok){ renderCapsule(cap, data); toast('Loaded capsule'); }
   };
+  // Live updates instead of polling: re-render an open capsule when a new version is published
+  if(window.EventSource && cap){
+    const stream = new EventSource('/capsule/stream');
+    const refresh = async (msg)=>{
+      if(!cap.querySelector('.card')) return;
+      const {ok,data} = await api('/capsule/daily', {cache:'no-cache'});
+      if(ok){ renderCapsule(cap, data); toast(msg); }
+    };
+    stream.addEventListener('capsule-version', (ev)=>{
+      let info = {};
+      try{ info = JSON.parse(ev.data); }catch(e){}
+      const n = (info.added||[]).length;
+      refresh(n ? `${n} new capsule item${n>1?'s':''}` : 'Capsule updated');
+    });
+    stream.addEventListener('reset', ()=>refresh('Capsule updated'));
+  }
   $('btnPipeline').onclick = async ()=>{
     const {ok,data} = await api('/pipeline/run',{method:'POST', headers: {'Content-Type':'application/json', ...headersAuth}});
     $('utilOut').textContent = JSON.stringify(data,null,2);
-    if(ok){ const capRes = await api('/capsule/daily'); if(capRes.ok){ renderCapsule(cap, capRes.data); toast('Pipeline completed'); } }
+    if(ok){ const capRes = await api('/capsule/daily', {cache:'no-cache'}); if(capRes.ok){ renderCapsule(cap, capRes.data); toast('Pipeline completed'); } }
   };
   $('btnSubDaily').onclick = async ()=>{
     const email = $('email').value.trim();
@@ -176,9 +192,9 @@ window.addEventListener('DOMContentLoaded', ()=>{
   if(btnQuizLoad){
     btnQuizLoad.onclick = async ()=>{
       try{
-        // Force regenerate to ensure latest logic and LLM output
-        await api('/tests/generate/daily?force=1',{method:'POST'});
-        const {ok, data} = await api('/tests/today');
+        // The scheduler prepares the quiz; send the token to get this user's option order
+        const token = localStorage.getItem('token');
+        const {ok, data} = await api('/tests/today', token ? {headers:{'Authorization':'Bearer '+token}} : {});
         if(ok){ renderQuiz(quizContainer, data); toast('Quiz loaded'); }
         else { $('quizOut').textContent = JSON.stringify(data,null,2); toast('Unable to load quiz'); }
       }catch(e){
@@ -229,7 +229,7 @@ class CivicBriefsApp {
             logsContainer.innerHTML += `✓ Pipeline completed!\n`;
             logsContainer.innerHTML += `✓ News items: ${result.news_items}\n`;
             logsContainer.innerHTML += `✓ Capsule items: ${result.capsule_items}\n`;
-            logsContainer.innerHTML += `✓ Emails sent: ${result.emails_sent || 0}\n`;
+            logsContainer.innerHTML += `✓ Emails queued: ${result.emails_queued || 0}\n`;
 
             logsContainer.innerHTML += '\n✓ Pipeline completed successfully!\n';
             this.showNotification('Pipeline completed successfully!', 'success');
@@ -0,0 +1,126 @@
+#!/usr/bin/env python3
+"""
+Email delivery benchmark against the local SMTP sink (no real provider needed).
+
+Pushes N synthetic subscribers through one of the delivery paths and reports
+messages/second, SMTP connections opened and per-message tail latency.
+
+Usage:
+  python scripts/bench_email.py -n 2000 --mode bulk --latency-ms 20
+  python scripts/bench_email.py -n 2000 --mode outbox --workers 8 --fail-rate 0.01
+  python scripts/bench_email.py -n 200 --mode single      # one connection per message (baseline)
+"""
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from scripts.smtp_sink import SMTPSink
+
+
+def _synthetic_capsule(items: int = 12) -> dict:
+    return {
+        "date": "2025-01-01",
+        "items": [
+            {
+                "title": f"Synthetic news item {i}",
+                "url": f"https://example.com/news/{i}",
+                "summary": "- " + " ".join(["Key development in governance and economy."] * 6),
+                "topics": [{"paper": "GS2", "topic": "Governance & Social Justice", "score": 0.42}],
+                "pyqs": [{"question": "Discuss the role of civil services in a democracy.", "year": 2019}],
+            }
+            for i in range(items)
+        ],
+    }
+
+
+def _percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    k = max(0, math.ceil(p / 100.0 * len(ordered)) - 1)
+    return ordered[k]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark email delivery against a local SMTP sink")
+    parser.add_argument("-n", "--subscribers", type=int, default=1000)
+    parser.add_argument("--mode", choices=["bulk", "outbox", "single"], default="bulk")
+    parser.add_argument("--pool-size", type=int, default=4, help="SMTP connections (bulk) / sender workers (outbox)")
+    parser.add_argument("--workers", type=int, default=None, help="alias for --pool-size in outbox mode")
+    parser.add_argument("--max-per-connection", type=int, default=100)
+    parser.add_argument("--rate", type=float, default=0.0, help="outbox rate limit in msgs/sec (0 = unlimited)")
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--fail-rate", type=float, default=0.0)
+    parser.add_argument("--drop-rate", type=float, default=0.0)
+    args = parser.parse_args()
+
+    with SMTPSink(latency_ms=args.latency_ms, fail_rate=args.fail_rate, drop_rate=args.drop_rate, seed=7) as sink:
+        size = args.workers or args.pool_size
+        # Settings are read from the environment on first use, so configure before importing the app
+        db_dir = tempfile.mkdtemp(prefix="civicbriefs-bench-")
+        os.environ.update(
+            {
+                "SMTP_SERVER": "127.0.0.1",
+                "SMTP_PORT": str(sink.port),
+                "SMTP_USERNAME": "bench@localhost",
+                "SMTP_PASSWORD": "bench",
+                "SMTP_STARTTLS": "0",
+                "SMTP_POOL_SIZE": str(size),
+                "SMTP_MAX_MESSAGES_PER_CONNECTION": str(args.max_per_connection),
+                "OUTBOX_WORKERS": str(size),
+                "OUTBOX_RATE_PER_SECOND": str(args.rate),
+                "DATABASE_URL": f"sqlite:///{os.path.join(db_dir, 'bench.sqlite3')}",
+            }
+        )
+        from app.services.notifier import send_bulk_capsule_emails, send_daily_capsule_email
+
+        capsule = _synthetic_capsule()
+        recipients = [f"user{i}@bench.local" for i in range(args.subscribers)]
+
+        start = time.perf_counter()
+        if args.mode == "bulk":
+            result = send_bulk_capsule_emails(recipients, capsule)
+        elif args.mode == "single":
+            result = {"sent": 0, "failed": 0}
+            for r in recipients:
+                result["sent" if send_daily_capsule_email(r, capsule) else "failed"] += 1
+        else:
+            from sqlmodel import SQLModel, Session
+            from app.core.db import engine
+            from app.models import outbox as _mo  # noqa: F401
+            from app.services.outbox import drain_outbox, enqueue_capsule
+
+            SQLModel.metadata.create_all(engine)
+            with Session(engine) as session:
+                enqueue_capsule(session, capsule, recipients)
+            result = drain_outbox()
+        elapsed = time.perf_counter() - start
+
+        stats = sink.stats
+        lat_ms = [x * 1000.0 for x in stats.latencies]
+        print(f"mode={args.mode} subscribers={args.subscribers} connections/workers={1 if args.mode == 'single' else size}")
+        print(f"result: {result}")
+        print(f"elapsed: {elapsed:.2f}s  throughput: {result['sent'] / elapsed if elapsed else 0.0:.1f} msgs/s")
+        print(
+            f"sink: connections={stats.connections} accepted={stats.messages} "
+            f"failures={stats.failures} disconnects={stats.disconnects}"
+        )
+        print(
+            "latency ms: p50={:.1f} p95={:.1f} p99={:.1f} max={:.1f}".format(
+                _percentile(lat_ms, 50), _percentile(lat_ms, 95), _percentile(lat_ms, 99), max(lat_ms, default=0.0)
+            )
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+"What should I revise today" benchmark over a synthetic card table.
+
+Fills a throwaway SQLite database with N spaced-repetition cards spread over
+U users and due dates across the next months, then times the per-user due
+query and prints the query plan SQLite picks for it.
+
+Usage:
+  python scripts/bench_revision.py -n 300000 --users 3000
+  python scripts/bench_revision.py -n 50000 --users 100 --queries 500 --limit 50
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the revision due-card query")
+    parser.add_argument("-n", "--cards", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--seed", type=int, default=7)
+    args = parser.parse_args()
+
+    # Settings are read from the environment on first use, so configure before importing the app
+    db_dir = tempfile.mkdtemp(prefix="civicbriefs-bench-")
+    os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(db_dir, 'bench.sqlite3')}"
+
+    from sqlalchemy import insert, text
+    from sqlmodel import Session
+    from app.core.db import engine, ensure_schema
+    from app.models import content as _mc  # noqa: F401
+    from app.models import tests as _mt  # noqa: F401
+    from app.models.user import RevisionCard
+    from app.services.revision import due_cards
+
+    ensure_schema()
+    rng = random.Random(args.seed)
+    today = date.today()
+    rows = [
+        {
+            "user_id": 1 + i % args.users,
+            "kind": "topic",
+            "ref": f"Topic {i}",
+            "label": f"Topic {i}",
+            "interval": 6,
+            "due": (today + timedelta(days=rng.randint(-10, 120))).isoformat(),
+        }
+        for i in range(args.cards)
+    ]
+    start = time.perf_counter()
+    with engine.begin() as conn:
+        for i in range(0, len(rows), 5000):
+            conn.execute(insert(RevisionCard), rows[i : i + 5000])
+    print(f"cards={args.cards} users={args.users} loaded in {time.perf_counter() - start:.1f}s")
+
+    timings = []
+    returned = 0
+    with Session(engine) as session:
+        for q in range(args.queries):
+            user_id = rng.randint(1, args.users)
+            t0 = time.perf_counter()
+            returned += len(due_cards(session, user_id, limit=args.limit))
+            timings.append((time.perf_counter() - t0) * 1000.0)
+        plan = session.exec(
+            text(
+                "EXPLAIN QUERY PLAN SELECT * FROM revisioncard WHERE user_id = 1 AND due <= :d ORDER BY due, id LIMIT 20"
+            ).bindparams(d=today.isoformat())
+        ).all()
+    timings.sort()
+    print(
+        "due query: median {:.2f} ms  p95 {:.2f} ms  max {:.2f} ms  ({} queries, {:.1f} cards/query)".format(
+            statistics.median(timings), timings[int(len(timings) * 0.95) - 1], timings[-1], len(timings), returned / max(1, len(timings))
+        )
+    )
+    for row in plan:
+        print("plan:", row[-1])
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,184 @@
+#!/usr/bin/env python3
+"""
+Local SMTP sink: accepts and discards mail so delivery can be measured offline.
+
+Speaks enough ESMTP for smtplib (EHLO, AUTH PLAIN/LOGIN, MAIL, RCPT, DATA,
+RSET, NOOP, QUIT) and can inject per-message latency, transient 451
+failures and 421 disconnects. Recipients whose address starts with
+"unknown" are refused with a permanent 550.
+
+Usage:
+  python scripts/smtp_sink.py --port 2525 --latency-ms 50 --fail-rate 0.01 --drop-rate 0.005
+  # then run the app with SMTP_SERVER=127.0.0.1 SMTP_PORT=2525 SMTP_STARTTLS=0
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import List
+
+
+@dataclass
+class SinkStats:
+    connections: int = 0
+    messages: int = 0
+    failures: int = 0
+    disconnects: int = 0
+    latencies: List[float] = field(default_factory=list)  # seconds from MAIL FROM to final DATA reply
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    server: "SMTPSink"
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write((line + "\r\n").encode("ascii"))
+        self.wfile.flush()
+
+    def _read_data(self) -> int:
+        size = 0
+        while True:
+            raw = self.rfile.readline()
+            if not raw or raw in (b".\r\n", b".\n"):
+                return size
+            size += len(raw)
+
+    def handle(self) -> None:
+        sink = self.server
+        sink.record(connections=1)
+        self._reply("220 civicbriefs-sink ESMTP ready")
+        started = None
+        while True:
+            raw = self.rfile.readline()
+            if not raw:
+                return
+            line = raw.decode("utf-8", "replace").strip()
+            verb = line.split(" ", 1)[0].upper()
+            if verb == "EHLO":
+                self._reply("250-civicbriefs-sink")
+                self._reply("250-AUTH PLAIN LOGIN")
+                self._reply("250-8BITMIME")
+                self._reply("250 SIZE 26214400")
+            elif verb == "HELO":
+                self._reply("250 civicbriefs-sink")
+            elif verb == "AUTH":
+                parts = line.split()
+                if len(parts) >= 2 and parts[1].upper() == "LOGIN":
+                    self._reply("334 VXNlcm5hbWU6")
+                    self.rfile.readline()
+                    self._reply("334 UGFzc3dvcmQ6")
+                    self.rfile.readline()
+                elif len(parts) == 2:
+                    # PLAIN without initial response
+                    self._reply("334 ")
+                    self.rfile.readline()
+                self._reply("235 2.7.0 Authentication successful")
+            elif verb == "MAIL":
+                started = time.perf_counter()
+                self._reply("250 2.1.0 OK")
+            elif verb == "RCPT":
+                if line.split(":", 1)[-1].strip().strip("<>").lower().startswith("unknown"):
+                    self._reply("550 5.1.1 Unknown mailbox")
+                else:
+                    self._reply("250 2.1.5 OK")
+            elif verb == "DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                self._read_data()
+                if sink.latency > 0:
+                    time.sleep(sink.latency)
+                roll = sink.rng.random()
+                if roll < sink.drop_rate:
+                    sink.record(disconnects=1)
+                    self._reply("421 4.3.2 Injected disconnect, closing channel")
+                    return
+                if roll < sink.drop_rate + sink.fail_rate:
+                    sink.record(failures=1)
+                    self._reply("451 4.3.0 Injected transient failure")
+                else:
+                    sink.record(messages=1, latency=time.perf_counter() - (started or time.perf_counter()))
+                    self._reply("250 2.0.0 Queued")
+                started = None
+            elif verb in ("RSET", "NOOP"):
+                started = None
+                self._reply("250 2.0.0 OK")
+            elif verb == "QUIT":
+                self._reply("221 2.0.0 Bye")
+                return
+            else:
+                self._reply("502 5.5.2 Command not recognized")
+
+
+class SMTPSink(socketserver.ThreadingTCPServer):
+    """Threaded SMTP stand-in; use as a context manager to run in the background."""
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(
+        self,
+        host: str = "127.0.0.1",
+        port: int = 0,
+        latency_ms: float = 0.0,
+        fail_rate: float = 0.0,
+        drop_rate: float = 0.0,
+        seed: int | None = None,
+    ):
+        super().__init__((host, port), _Handler)
+        self.latency = latency_ms / 1000.0
+        self.fail_rate = fail_rate
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.stats = SinkStats()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    @property
+    def port(self) -> int:
+        return self.server_address[1]
+
+    def record(self, connections: int = 0, messages: int = 0, failures: int = 0, disconnects: int = 0, latency: float | None = None) -> None:
+        with self._lock:
+            self.stats.connections += connections
+            self.stats.messages += messages
+            self.stats.failures += failures
+            self.stats.disconnects += disconnects
+            if latency is not None:
+                self.stats.latencies.append(latency)
+
+    def __enter__(self) -> "SMTPSink":
+        self._thread = threading.Thread(target=self.serve_forever, name="smtp-sink", daemon=True)
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.shutdown()
+        self.server_close()
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Local SMTP sink with latency and failure injection")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=2525)
+    parser.add_argument("--latency-ms", type=float, default=0.0, help="delay before acknowledging each message")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="fraction of messages answered with 451")
+    parser.add_argument("--drop-rate", type=float, default=0.0, help="fraction of messages answered with 421 + disconnect")
+    args = parser.parse_args()
+
+    sink = SMTPSink(args.host, args.port, args.latency_ms, args.fail_rate, args.drop_rate)
+    print(f"SMTP sink listening on {args.host}:{sink.port} (Ctrl+C to stop)")
+    try:
+        sink.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        sink.server_close()
+        s = sink.stats
+        print(f"connections={s.connections} messages={s.messages} failures={s.failures} disconnects={s.disconnects}")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
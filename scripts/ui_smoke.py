@@ -49,8 +49,8 @@ def main() -> int:
 
     # Quiz generate and fetch
     r = client.post("/tests/generate/daily")
-    assert r.status_code == 200
-    r = client.get("/tests/today")
+    assert r.status_code in (401, 403)  # admin only: the payload carries the answer key
+    r = client.get("/tests/today", headers=headers)
     assert r.status_code == 200
     quiz = r.json()
     assert "name" in quiz and isinstance(quiz.get("questions", []), list)
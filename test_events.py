@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Last-Event-ID resume for the in-memory capsule event broker
+"""
+import asyncio
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.events import CAPSULE_CHANNEL, InMemoryBroker
+
+
+def _publish(broker, n):
+    return [broker.publish(CAPSULE_CHANNEL, "capsule-version", {"n": i}) for i in range(n)]
+
+
+def test_resume_within_buffer():
+    broker = InMemoryBroker()
+    ids = _publish(broker, 3)
+    assert [e.id for e in broker.since(CAPSULE_CHANNEL, ids[0])] == ids[1:]
+    assert broker.since(CAPSULE_CHANNEL, ids[-1]) == []
+
+
+def test_resume_after_restart():
+    before = InMemoryBroker()
+    old_ids = _publish(before, 57)
+    # A restarted process starts a fresh buffer and sequence
+    after = InMemoryBroker()
+    assert after.since(CAPSULE_CHANNEL, old_ids[-1]) is None
+    new_ids = _publish(after, 2)
+    assert after.since(CAPSULE_CHANNEL, old_ids[-1]) is None
+    assert asyncio.run(after.wait(CAPSULE_CHANNEL, old_ids[-1], 0.1)) is None
+    # Re-basing on the newest id resumes normally
+    assert asyncio.run(after.wait(CAPSULE_CHANNEL, after.latest_id(CAPSULE_CHANNEL), 0.1)) == []
+    assert [e.id for e in after.since(CAPSULE_CHANNEL, "0")] == new_ids
+
+
+def test_id_fell_out_of_buffer():
+    broker = InMemoryBroker(buffer_size=4)
+    ids = _publish(broker, 10)
+    assert broker.since(CAPSULE_CHANNEL, ids[0]) is None
+    assert asyncio.run(broker.wait(CAPSULE_CHANNEL, ids[0], 0.1)) is None
+    assert [e.id for e in broker.since(CAPSULE_CHANNEL, ids[5])] == ids[6:]
+
+
+def test_id_ahead_of_newest():
+    broker = InMemoryBroker()
+    ids = _publish(broker, 2)
+    boot = ids[0].rsplit("-", 1)[0]
+    assert broker.since(CAPSULE_CHANNEL, f"{boot}-99") is None
+    assert broker.since(CAPSULE_CHANNEL, "57") is None
+
+
+if __name__ == "__main__":
+    test_resume_within_buffer()
+    test_resume_after_restart()
+    test_id_fell_out_of_buffer()
+    test_id_ahead_of_newest()
+    print("Event resume tests passed.")
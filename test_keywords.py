@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+"""
+Keyword tagging: word boundaries, plurals, nested and overlapping keywords
+"""
+import sys
+import os
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from app.services.keywords import KeywordMatcher
+
+
+def test_word_boundaries_and_plurals():
+    m = KeywordMatcher({"trade": ["trade"], "rights": ["right"]})
+    assert m.labels("New trademark rules") == []
+    assert m.labels("Trade and human rights") == ["trade", "rights"]
+
+
+def test_nested_keywords():
+    m = KeywordMatcher({"fr": ["fundamental rights"], "rights": ["rights"], "fund": ["fund"]})
+    assert m.labels("Fundamental Rights under Part III") == ["fr", "rights"]
+
+
+def test_overlapping_keywords():
+    m = KeywordMatcher({"climate": ["climate change"], "policy": ["change policy"]})
+    assert m.labels("A climate change policy for 2030") == ["climate", "policy"]
+    assert m.labels("Climate   change policy.") == ["climate", "policy"]
+
+
+if __name__ == "__main__":
+    test_word_boundaries_and_plurals()
+    test_nested_keywords()
+    test_overlapping_keywords()
+    print("Keyword matcher tests passed.")